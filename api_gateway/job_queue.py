@@ -0,0 +1,431 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+FINISHED_STATUSES = ("succeeded", "failed")
+
+# Window over which per-stage throughput is reported
+THROUGHPUT_WINDOW_SECONDS = 60.0
+
+
+class JobQueueFullError(Exception):
+    """Raised when a submission would exceed the queue's capacity."""
+
+
+class MemoryJobStore:
+    """Jobs and their uploaded files kept in process memory; lost on restart."""
+
+    # Calls are cheap and not thread-safe, so they run on the event loop
+    blocking = False
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+        self._files: Dict[str, bytes] = {}
+
+    def add(self, job: Dict, file_bytes: bytes) -> None:
+        self._jobs[job["job_id"]] = job
+        self._files[job["job_id"]] = file_bytes
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def batch(self, batch_id: str) -> List[Dict]:
+        return [dict(job) for job in self._jobs.values() if job["batch_id"] == batch_id]
+
+    def update(self, job_id: str, **fields) -> None:
+        self._jobs[job_id].update(fields)
+
+    def file(self, job_id: str) -> bytes:
+        return self._files[job_id]
+
+    def drop_file(self, job_id: str) -> None:
+        self._files.pop(job_id, None)
+
+    def recover(self) -> List[str]:
+        """Nothing survives a restart in memory."""
+        return []
+
+    def prune(self, finished_before: float) -> int:
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["status"] in FINISHED_STATUSES and job["finished_at"] < finished_before
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._files.pop(job_id, None)
+        return len(expired)
+
+
+class SQLiteJobStore:
+    """
+    Jobs and their uploaded files in a local SQLite database, so queued and
+    interrupted jobs are picked up again after a restart. An upload is kept
+    only until its job finishes.
+    """
+
+    # Calls do disk I/O, so JobQueue runs them on worker threads
+    blocking = True
+
+    def __init__(self, path: str = "./jobs.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                batch_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                finished_at REAL,
+                data TEXT NOT NULL,
+                file BLOB
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id)")
+        self._conn.commit()
+
+    def add(self, job: Dict, file_bytes: bytes) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, batch_id, status, created_at, data, file) VALUES (?, ?, ?, ?, ?, ?)",
+                (job["job_id"], job["batch_id"], job["status"], job["created_at"], json.dumps(job), file_bytes),
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def batch(self, batch_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM jobs WHERE batch_id = ? ORDER BY created_at", (batch_id,)
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            job = {**json.loads(row[0]), **fields}
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, data = ? WHERE job_id = ?",
+                (job["status"], job.get("finished_at"), json.dumps(job), job_id),
+            )
+            self._conn.commit()
+
+    def file(self, job_id: str) -> bytes:
+        with self._lock:
+            return self._conn.execute("SELECT file FROM jobs WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+    def drop_file(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET file = NULL WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+
+    def recover(self) -> List[str]:
+        """Requeues jobs interrupted by a restart and returns every queued job id, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        job_ids = [job_id for job_id, in rows]
+        for job_id in job_ids:
+            self.update(job_id, status="queued", stage=None, started_at=None)
+        return job_ids
+
+    def prune(self, finished_before: float) -> int:
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?", (finished_before,)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+
+class _StageStats:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+        self.finished_at: Deque[float] = deque()
+
+
+StageContext = Callable[[str], AsyncContextManager[None]]
+
+
+class JobQueue:
+    """
+    Bounded queue of document jobs run by a fixed pool of asyncio workers.
+
+    `submit` stores the uploads and returns job ids at once; `workers` jobs
+    run concurrently, and inside a job each pipeline stage (entered with the
+    `stage` context passed to `run_job`) additionally holds one of that
+    stage's `stage_limits` slots, so e.g. only a few jobs OCR at a time while
+    others retrieve. Submissions beyond `max_queue` unfinished jobs are
+    rejected with JobQueueFullError. Finished jobs are kept for
+    `retention_seconds` for polling.
+    """
+
+    def __init__(
+        self,
+        run_job: Callable[[Dict, bytes, StageContext], Awaitable[Dict]],
+        store=None,
+        workers: int = 4,
+        max_queue: int = 100,
+        stage_limits: Optional[Dict[str, int]] = None,
+        retention_seconds: float = 3600.0,
+    ):
+        self.run_job = run_job
+        self.store = store if store is not None else MemoryJobStore()
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.retention_seconds = retention_seconds
+        self.stages = {name: _StageStats(max(1, limit)) for name, limit in (stage_limits or {}).items()}
+        self.succeeded = 0
+        self.failed = 0
+        self._unfinished = 0
+        self._running = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._done_events: Dict[str, asyncio.Event] = {}
+
+    async def start(self) -> None:
+        """Creates the queue on the running loop, requeues recovered jobs and starts the workers."""
+        self._queue = asyncio.Queue()
+        for stats in self.stages.values():
+            stats.semaphore = asyncio.Semaphore(stats.limit)
+
+        recovered = await self._call_store(self.store.recover)
+        for job_id in recovered:
+            self._enqueue(job_id)
+        if recovered:
+            logger.info(f"♻️ Requeued {len(recovered)} unfinished jobs")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        """Stops the workers; with a SQLite store, unfinished jobs resume on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _call_store(self, method: Callable[..., Any], *args, **fields) -> Any:
+        """Runs a store call, on a worker thread if the store blocks (see `blocking`)."""
+        if getattr(self.store, "blocking", False):
+            return await asyncio.to_thread(method, *args, **fields)
+        return method(*args, **fields)
+
+    async def submit(self, files: List[Tuple[str, str, bytes]], clauses: List[str]) -> Dict:
+        """
+        Queues one job per (filename, content_type, bytes) upload, all sharing
+        the clause list and a batch id.
+
+        Returns:
+            Dict: The batch id and the queued jobs.
+        """
+        if self._unfinished + len(files) > self.max_queue:
+            raise JobQueueFullError(f"{self._unfinished} unfinished jobs, limit {self.max_queue}")
+        # Capacity is reserved before the store writes yield to other submissions
+        self._unfinished += len(files)
+        try:
+            await self._call_store(self.store.prune, time.time() - self.retention_seconds)
+            batch_id = uuid.uuid4().hex
+            jobs = []
+            for filename, content_type, file_bytes in files:
+                job = {
+                    "job_id": uuid.uuid4().hex,
+                    "batch_id": batch_id,
+                    "filename": filename,
+                    "content_type": content_type,
+                    "clauses": clauses,
+                    "status": "queued",
+                    "stage": None,
+                    "created_at": time.time(),
+                    "started_at": None,
+                    "finished_at": None,
+                    "result": None,
+                    "error": None,
+                }
+                await self._call_store(self.store.add, job, file_bytes)
+                jobs.append(job)
+        except BaseException:
+            self._unfinished -= len(files)
+            raise
+
+        for job in jobs:
+            self._queue.put_nowait(job["job_id"])
+        return {"batch_id": batch_id, "jobs": jobs}
+
+    def _enqueue(self, job_id: str) -> None:
+        self._unfinished += 1
+        self._queue.put_nowait(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await self._call_store(self.store.get, job_id)
+
+    async def batch(self, batch_id: str) -> List[Dict]:
+        return await self._call_store(self.store.batch, batch_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """The job once it has finished, or its current state after `timeout` seconds."""
+        # Registered before the store read, so a job finishing meanwhile still sets it
+        event = self._done_events.setdefault(job_id, asyncio.Event())
+        job = await self.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            self._done_events.pop(job_id, None)
+            return job
+        if timeout <= 0:
+            return job
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return await self.get(job_id)
+
+    async def wait_batch(self, batch_id: str, timeout: float) -> List[Dict]:
+        """The batch's jobs once all have finished, or their current state after `timeout` seconds."""
+        jobs = await self.batch(batch_id)
+        pending = [job["job_id"] for job in jobs if job["status"] not in FINISHED_STATUSES]
+        if pending and timeout > 0:
+            deadline = time.monotonic() + timeout
+            for job_id in pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                await self.wait(job_id, remaining)
+            jobs = await self.batch(batch_id)
+        return jobs
+
+    @asynccontextmanager
+    async def _stage(self, job_id: str, name: str) -> AsyncIterator[None]:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = _StageStats(self.workers)
+            stats.semaphore = asyncio.Semaphore(stats.limit)
+
+        stats.waiting += 1
+        try:
+            await stats.semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+        stats.active += 1
+        await self._call_store(self.store.update, job_id, stage=name)
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            stats.failed += 1
+            raise
+        else:
+            stats.completed += 1
+            stats.total_seconds += time.perf_counter() - start
+            stats.finished_at.append(time.monotonic())
+        finally:
+            stats.active -= 1
+            stats.semaphore.release()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The store failed around the job (e.g. a locked or full database); keep the worker alive
+                logger.error(f"❌ Job {job_id} could not be run or recorded: {e}")
+                await self._mark_failed(job_id, e)
+            finally:
+                self._unfinished -= 1
+                self._queue.task_done()
+                event = self._done_events.pop(job_id, None)
+                if event is not None:
+                    event.set()
+
+    async def _mark_failed(self, job_id: str, error: Exception) -> None:
+        """Best-effort: records the job as failed, logging if the store refuses that too."""
+        self.failed += 1
+        try:
+            await self._call_store(
+                self.store.update,
+                job_id,
+                status="failed",
+                stage=None,
+                finished_at=time.time(),
+                error=str(error) or type(error).__name__,
+            )
+        except Exception as e:
+            logger.error(f"❌ Could not mark job {job_id} as failed: {e}")
+
+    async def _run(self, job_id: str) -> None:
+        job = await self.get(job_id)
+        await self._call_store(self.store.update, job_id, status="running", started_at=time.time())
+        self._running += 1
+        try:
+            file_bytes = await self._call_store(self.store.file, job_id)
+            result = await self.run_job(job, file_bytes, lambda name: self._stage(job_id, name))
+        except asyncio.CancelledError:
+            # Shutdown: the job stays running in the store and is requeued by recover()
+            raise
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} ({job['filename']}) failed: {e}")
+            await self._mark_failed(job_id, e)
+        else:
+            await self._call_store(
+                self.store.update, job_id, status="succeeded", stage=None, finished_at=time.time(), result=result
+            )
+            self.succeeded += 1
+        finally:
+            self._running -= 1
+
+        try:
+            await self._call_store(self.store.drop_file, job_id)
+        except Exception as e:
+            # The job's outcome is already recorded; the upload is left behind
+            logger.warning(f"⚠️ Could not drop the upload of job {job_id}: {e}")
+
+    def stats(self) -> Dict:
+        """Queue depth, job counters and per-stage load and throughput."""
+        now = time.monotonic()
+        stages = {}
+        for name, stats in self.stages.items():
+            while stats.finished_at and now - stats.finished_at[0] > THROUGHPUT_WINDOW_SECONDS:
+                stats.finished_at.popleft()
+            stages[name] = {
+                "limit": stats.limit,
+                "active": stats.active,
+                "waiting": stats.waiting,
+                "completed": stats.completed,
+                "failed": stats.failed,
+                "mean_seconds": stats.total_seconds / stats.completed if stats.completed else 0.0,
+                "per_minute": len(stats.finished_at) * 60.0 / THROUGHPUT_WINDOW_SECONDS,
+            }
+        return {
+            "queued": self._unfinished - self._running,
+            "running": self._running,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "stages": stages,
+        }
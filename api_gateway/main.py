@@ -1,35 +1,337 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Body, Query
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-import requests
+import httpx
+import asyncio
 import logging
 import os
-import json
-from typing import List, Dict
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Tuple
+
+from job_queue import FINISHED_STATUSES, JobQueue, JobQueueFullError, MemoryJobStore, SQLiteJobStore
+from common.instrumentation import METRICS, collect_downstream_timings, instrument, propagate_request_id, request_context
+from common.readiness import Readiness
+from common.wire_format import (
+    MSGPACK_MEDIA_TYPE,
+    accept_headers,
+    column,
+    decode_response,
+    encode_request,
+    loads_json,
+    pack_columns,
+    stream_unpacker,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the HTTP client and start the job workers; on shutdown stop both (hooks defined below)."""
+    await open_http_client()
+    await start_job_queue()
+    yield
+    await close_http_client()
+
+app = FastAPI(lifespan=lifespan)
+
+# Request ids, Server-Timing headers and /metrics; PROFILING_ENABLED lets
+# requests sent with "X-Profile: 1" be profiled into PROFILE_DIR
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+instrument(app, profiling_enabled=PROFILING_ENABLED, profile_dir=PROFILE_DIR)
 
 # Microservice URLs
-OCR_SERVICE_URL = os.getenv("OCR_SERVICE_URL", "http://ocr_service:8001/extract-text")
+OCR_STREAM_URL = os.getenv("OCR_STREAM_URL", "http://ocr_service:8001/extract-text-stream")
 CHROMA_STORE_URL = os.getenv("CHROMA_STORE_URL", "http://vector_database_service:8002/store-text")
-CHROMA_RETRIEVAL_URL = os.getenv("CHROMA_RETRIEVAL_URL", "http://vector_database_service:8002/retrieve-text")
+CHROMA_FINALIZE_URL = os.getenv("CHROMA_FINALIZE_URL", "http://vector_database_service:8002/finalize-ingest")
+CHROMA_BATCH_RETRIEVAL_URL = os.getenv("CHROMA_BATCH_RETRIEVAL_URL", "http://vector_database_service:8002/retrieve-text-batch")
 CLAUSE_VALIDATOR_URL = os.getenv("CLAUSE_VALIDATOR_URL", "http://clause_validator:8003/validate")
 
+# Downstream readiness probes, aggregated by the gateway's /readyz. Only the
+# services the gateway calls are probed: the validation step is disabled, so the
+# validator is left out unless CLAUSE_VALIDATOR_READY_URL is set
+# (e.g. http://legal_clause_validator:8003/readyz)
+OCR_READY_URL = os.getenv("OCR_READY_URL", "http://ocr_service:8001/readyz")
+CHROMA_READY_URL = os.getenv("CHROMA_READY_URL", "http://vector_database_service:8002/readyz")
+CLAUSE_VALIDATOR_READY_URL = os.getenv("CLAUSE_VALIDATOR_READY_URL", "")
+READY_CHECK_TIMEOUT = float(os.getenv("READY_CHECK_TIMEOUT", "2"))
+
+# Number of paragraphs sent to the vector store per /store-text call
+STORE_BATCH_SIZE = int(os.getenv("STORE_BATCH_SIZE", "64"))
+
+# Per-service timeouts (seconds)
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "600"))
+STORE_TIMEOUT = float(os.getenv("STORE_TIMEOUT", "60"))
+RETRIEVAL_TIMEOUT = float(os.getenv("RETRIEVAL_TIMEOUT", "30"))
+VALIDATOR_TIMEOUT = float(os.getenv("VALIDATOR_TIMEOUT", "120"))
+
+# Shared HTTP client connection pool and clause retrieval fan-out
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+RETRIEVAL_CONCURRENCY = int(os.getenv("RETRIEVAL_CONCURRENCY", "8"))
+
+# Clauses sent per /retrieve-text-batch call; a typical clause list fits in one call
+RETRIEVAL_BATCH_SIZE = int(os.getenv("RETRIEVAL_BATCH_SIZE", "32"))
+
+# Asynchronous jobs (/jobs): worker pool size, per-stage concurrency, queue bound,
+# how long finished jobs stay pollable and the long-poll cap. JOB_QUEUE_BACKEND
+# "sqlite" keeps queued jobs and their uploads on disk so they survive restarts.
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "memory")  # "memory" or "sqlite"
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "./jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_OCR_CONCURRENCY = int(os.getenv("JOB_OCR_CONCURRENCY", "2"))
+JOB_RETRIEVAL_CONCURRENCY = int(os.getenv("JOB_RETRIEVAL_CONCURRENCY", "4"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "100"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+JOB_MAX_WAIT_SECONDS = float(os.getenv("JOB_MAX_WAIT_SECONDS", "60"))
+JOB_RETRY_AFTER_SECONDS = os.getenv("JOB_RETRY_AFTER_SECONDS", "10")
+
+# Wire format to the OCR and vector services: "json" (any service version) or
+# "msgpack" (columnar paragraphs, filename sent once); store bodies of at least
+# COMPRESS_MIN_BYTES are compressed with REQUEST_COMPRESSION ("gzip", "zstd" or empty)
+WIRE_FORMAT = os.getenv("WIRE_FORMAT", "json")
+REQUEST_COMPRESSION = os.getenv("REQUEST_COMPRESSION", "") or None
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "16384"))
+
+# Keep-alive client shared by all requests, opened on startup
+http_client: httpx.AsyncClient = None
+
+# The gateway has nothing heavy to load: it is ready once the client is open
+readiness = Readiness("API Gateway")
+
+async def open_http_client():
+    """Open the shared keep-alive HTTP client."""
+    global http_client
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        # Downstream calls carry the request id and report their Server-Timing back
+        event_hooks={"request": [propagate_request_id], "response": [collect_downstream_timings]},
+    )
+    readiness.start([])
+
+async def close_http_client():
+    """Stop the job workers, then close the shared HTTP client they use."""
+    await job_queue.close()
+    await http_client.aclose()
+
+PIPELINE_STAGE_SECONDS = METRICS.histogram(
+    "pipeline_stage_seconds", "Gateway pipeline time per document by stage.", labelnames=("stage",)
+)
+
 # Define a Pydantic model for clauses
 class ClauseRequest(BaseModel):
     clauses: List[str]
 
-@app.post("/extract-clauses")
-async def extract_clauses(file: UploadFile = File(...),   clauses_list: List[str] = Query(...)
-):
+def document_batch(pdf_name: str, rows: List[Tuple[int, int, str]]):
+    """
+    /store-text documents for (page, para, text) rows: DocumentItem dicts in
+    JSON, or a columnar table with the filename sent once in msgpack.
+    """
+    if WIRE_FORMAT != "msgpack":
+        return [
+            {"text": text, "filename": pdf_name, "page_number": page_number, "para_number": para_number}
+            for page_number, para_number, text in rows
+        ]
+    page_numbers, para_numbers, texts = (list(values) for values in zip(*rows))
+    table = pack_columns({"text": texts, "page_number": page_numbers, "para_number": para_numbers}, len(rows))
+    table["constants"]["filename"] = pdf_name
+    return table
+
+async def store_documents(pdf_name: str, rows: List[Tuple[int, int, str]], ingest_id: str) -> Dict[str, int]:
+    """Sends one batch of paragraphs to the vector store and returns its ingestion summary."""
+    body, headers = encode_request(
+        {"documents": document_batch(pdf_name, rows), "ingest_id": ingest_id},
+        WIRE_FORMAT,
+        REQUEST_COMPRESSION,
+        COMPRESS_MIN_BYTES,
+    )
+    store_response = await http_client.post(CHROMA_STORE_URL, content=body, headers=headers, timeout=STORE_TIMEOUT)
+    if store_response.status_code != 200:
+        raise HTTPException(status_code=store_response.status_code, detail="ChromaDB Storage Failed")
+    return store_response.json()
+
+async def finalize_ingest(pdf_name: str, ingest_id: str) -> int:
+    """Deletes stored paragraphs of the file that this upload no longer contains."""
+    finalize_response = await http_client.post(
+        CHROMA_FINALIZE_URL, json={"filename": pdf_name, "ingest_id": ingest_id}, timeout=STORE_TIMEOUT
+    )
+    if finalize_response.status_code != 200:
+        raise HTTPException(status_code=finalize_response.status_code, detail="ChromaDB Storage Failed")
+    return finalize_response.json().get("deleted", 0)
+
+async def ocr_paragraphs(ocr_response: httpx.Response) -> AsyncIterator[Tuple[int, int, str]]:
+    """
+    (page, para, text) rows of a streamed OCR response: NDJSON lines, or
+    one columnar msgpack object per page if the OCR service sent msgpack.
+    """
+    if ocr_response.headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE):
+        unpacker = stream_unpacker()
+        async for chunk in ocr_response.aiter_bytes():
+            unpacker.feed(chunk)
+            for record in unpacker:
+                if "error" in record:
+                    raise HTTPException(status_code=502, detail="OCR Service Error")
+                for para_number, text in enumerate(record["text"]):
+                    yield record["page"], para_number, text
+        return
+
+    async for line in ocr_response.aiter_lines():
+        if not line:
+            continue
+        record = loads_json(line)
+        if "error" in record:
+            raise HTTPException(status_code=502, detail="OCR Service Error")
+        yield record["page"], record["para"], record["text"]
+
+async def stream_ocr_to_store(pdf_name: str, file_bytes: bytes, content_type: str) -> int:
+    """
+    Streams OCR results and stores them in batches while OCR is still running.
+    Paragraphs the vector store already holds unchanged are not re-embedded,
+    and paragraphs from an earlier version of the file are removed at the end.
+
+    Returns:
+        int: Number of paragraphs stored.
+    """
+    ingest_id = uuid.uuid4().hex
+    summary = {"added": 0, "updated": 0, "unchanged": 0}
+    stored = 0
+    batch = []
+
+    async def _store_batch() -> None:
+        batch_summary = await store_documents(pdf_name, batch, ingest_id)
+        for key in summary:
+            summary[key] += batch_summary.get(key, 0)
+
+    async with http_client.stream(
+        "POST",
+        OCR_STREAM_URL,
+        files={"file": (pdf_name, file_bytes, content_type)},
+        headers=accept_headers(WIRE_FORMAT),
+        timeout=OCR_TIMEOUT,
+    ) as ocr_response:
+        if ocr_response.status_code != 200:
+            raise HTTPException(status_code=ocr_response.status_code, detail="OCR Service Error")
+
+        async for row in ocr_paragraphs(ocr_response):
+            batch.append(row)
+            if len(batch) >= STORE_BATCH_SIZE:
+                await _store_batch()
+                stored += len(batch)
+                batch = []
+
+    if batch:
+        await _store_batch()
+        stored += len(batch)
+    if stored:
+        summary["deleted"] = await finalize_ingest(pdf_name, ingest_id)
+    logger.info(f"💾 Ingestion summary for {pdf_name}: {summary}")
+    return stored
+
+async def retrieve_clause_paragraphs(clauses_list: List[str], pdf_name: str) -> Dict[str, List[str]]:
+    """
+    Retrieves paragraphs for every clause with batched retrieval calls of up
+    to RETRIEVAL_BATCH_SIZE clauses, at most RETRIEVAL_CONCURRENCY at a time.
+
+    Returns:
+        Dict[str, List[str]]: Clause → retrieved paragraphs (clauses with no match are left out).
+    """
+    semaphore = asyncio.Semaphore(RETRIEVAL_CONCURRENCY)
+
+    async def _retrieve(clauses: List[str]) -> Dict:
+        chroma_retrieval_payload = {"queries": clauses, "top_k": 10, "metadata_filter": {"filename": pdf_name}}
+        async with semaphore:
+            retrieval_response = await http_client.post(
+                CHROMA_BATCH_RETRIEVAL_URL,
+                json=chroma_retrieval_payload,
+                headers=accept_headers(WIRE_FORMAT),
+                timeout=RETRIEVAL_TIMEOUT,
+            )
+
+        if retrieval_response.status_code != 200:
+            raise HTTPException(status_code=retrieval_response.status_code, detail="ChromaDB Retrieval Failed")
+        content_type = retrieval_response.headers.get("content-type", "")
+        return decode_response(content_type, retrieval_response.content).get("results", {})
+
+    batches = [
+        clauses_list[i:i + RETRIEVAL_BATCH_SIZE]
+        for i in range(0, len(clauses_list), RETRIEVAL_BATCH_SIZE)
+    ]
+    clause_paragraph_map = {}
+    for results in await asyncio.gather(*(_retrieve(batch) for batch in batches)):
+        for clause, matches in results.items():
+            if isinstance(matches, dict):  # Columnar table (msgpack)
+                texts = column(matches, "text") if matches["rows"] else []
+            else:
+                texts = [match["text"] for match in matches]
+            if texts:
+                clause_paragraph_map[clause] = texts
+    return clause_paragraph_map
+
+@asynccontextmanager
+async def untracked_stage(name: str):
+    """Stage context for pipelines run outside the job queue."""
+    yield
+
+async def process_document(pdf_name: str, file_bytes: bytes, content_type: str, clauses_list: List[str], stage=untracked_stage) -> Dict:
     """
     1️⃣ Extract text using OCR (with page numbers)
     2️⃣ Store extracted text in ChromaDB
     3️⃣ Retrieve stored text from ChromaDB
     4️⃣ Validate extracted text against given clauses
+
+    `stage(name)` wraps each step, letting the job queue limit and time it.
+    """
+    # Step 1 & 2: Stream OCR results and store them in ChromaDB batch by batch
+    logger.info(f"📄 Processing OCR for file: {pdf_name}")
+    stage_start = time.perf_counter()
+    async with stage("ocr_store"):
+        with PIPELINE_STAGE_SECONDS.time("ocr_store", stage="ocr_store"):
+            stored = await stream_ocr_to_store(pdf_name, file_bytes, content_type)
+    ocr_store_seconds = time.perf_counter() - stage_start
+    if not stored:
+        raise HTTPException(status_code=400, detail="OCR service returned no text.")
+    logger.info(f"💾 Stored {stored} paragraphs for file: {pdf_name}")
+
+    # Step 3: Retrieve text from ChromaDB
+    logger.info(f"🔍 Retrieving stored text from ChromaDB for file: {pdf_name}")
+    stage_start = time.perf_counter()
+    async with stage("retrieval"):
+        with PIPELINE_STAGE_SECONDS.time("retrieval", stage="retrieval"):
+            clause_paragraph_map = await retrieve_clause_paragraphs(clauses_list, pdf_name)
+    retrieval_seconds = time.perf_counter() - stage_start
+    logger.info(
+        f"⏱️ {pdf_name}: ocr+store {ocr_store_seconds:.2f}s, "
+        f"retrieval of {len(clauses_list)} clauses {retrieval_seconds:.2f}s"
+    )
+
+    if not clause_paragraph_map:
+        return {"message": "No relevant clauses found in the document."}
+
+    return clause_paragraph_map
+
+    # Step 4: Validate extracted clauses
+    # logger.info(f"✅ Validating extracted clauses against: {clauses_list}")
+    # clause_response = await http_client.post(CLAUSE_VALIDATOR_URL, json=clause_paragraph_map, timeout=VALIDATOR_TIMEOUT)
+
+    # if clause_response.status_code != 200:
+    #     raise HTTPException(status_code=clause_response.status_code, detail="Clause validation failed")
+
+    # validated_clauses = clause_response.json()
+    # return {"message": "📜 Document processed successfully.", "validated_clauses": validated_clauses}
+
+@app.post("/extract-clauses")
+async def extract_clauses(file: UploadFile = File(...),   clauses_list: List[str] = Query(...)
+):
+    """
+    Runs the whole pipeline on one PDF within the request.
+    Large documents are better submitted to /jobs.
     """
     try:
         # clauses_list = clause_data.clauses
@@ -37,60 +339,118 @@ async def extract_clauses(file: UploadFile = File(...),   clauses_list: List[str
             raise HTTPException(status_code=400, detail="Clauses list cannot be empty")
 
         file_bytes = await file.read()
-        pdf_name = file.filename
-        
-        # Step 1: OCR Service Call
-        logger.info(f"📄 Processing OCR for file: {pdf_name}")
-        ocr_response = requests.post(OCR_SERVICE_URL, files={"file": (pdf_name, file_bytes, file.content_type)})
+        return await process_document(file.filename, file_bytes, file.content_type, clauses_list)
 
-        if ocr_response.status_code != 200:
-            raise HTTPException(status_code=ocr_response.status_code, detail="OCR Service Error")
-
-        page_para_text = ocr_response.json().get("ocr_text", [])
-        if not page_para_text:
-            raise HTTPException(status_code=400, detail="OCR service returned no text.")
+    except HTTPException:
+        raise
+    except httpx.TimeoutException as e:
+        logger.error(f"❌ Downstream service timed out: {str(e)}")
+        raise HTTPException(status_code=504, detail="Downstream service timed out")
+    except Exception as e:
+        logger.error(f"❌ Error processing document: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
 
-        # Step 2: Store extracted text in ChromaDB (Batch Insert)
-        documents = [
-            {"text": text, "filename": pdf_name, "page_number": page, "para_number": para}
-            for page, para, text in page_para_text
-        ]
-        requests.post(CHROMA_STORE_URL, json={"documents": documents})
+async def run_job(job: Dict, file_bytes: bytes, stage) -> Dict:
+    """
+    Runs the pipeline for one queued job, reporting failures by their HTTP
+    detail. The job id is the request id sent to the downstream services.
+    """
+    try:
+        with request_context(job["job_id"]):
+            return await process_document(job["filename"], file_bytes, job["content_type"], job["clauses"], stage)
+    except HTTPException as e:
+        raise RuntimeError(f"{e.status_code}: {e.detail}") from e
+    except httpx.TimeoutException as e:
+        raise RuntimeError("504: Downstream service timed out") from e
 
-        # Step 3: Retrieve text from ChromaDB
-        logger.info(f"🔍 Retrieving stored text from ChromaDB for file: {pdf_name}")
-        clause_paragraph_map = {}
-        print(clauses_list)
+job_queue = JobQueue(
+    run_job,
+    store=SQLiteJobStore(JOB_QUEUE_PATH) if JOB_QUEUE_BACKEND == "sqlite" else MemoryJobStore(),
+    workers=JOB_WORKERS,
+    max_queue=JOB_MAX_QUEUE,
+    stage_limits={"ocr_store": JOB_OCR_CONCURRENCY, "retrieval": JOB_RETRIEVAL_CONCURRENCY},
+    retention_seconds=JOB_RETENTION_SECONDS,
+)
 
-        for clause in clauses_list:
-            chroma_retrieval_payload = {"query": clause, "top_k": 10, "metadata_filter": {"filename": pdf_name}}
-            retrieval_response = requests.post(CHROMA_RETRIEVAL_URL, json=chroma_retrieval_payload)
+async def start_job_queue():
+    """Start the job workers, resuming unfinished jobs from a SQLite queue."""
+    await job_queue.start()
 
-            if retrieval_response.status_code != 200:
-                raise HTTPException(status_code=retrieval_response.status_code, detail="ChromaDB Retrieval Failed")
+@app.post("/jobs", status_code=202)
+async def submit_jobs(files: List[UploadFile] = File(...), clauses_list: List[str] = Query(...)):
+    """
+    Queues one extraction job per uploaded PDF and returns their ids at once.
+    Poll /jobs/{job_id} or /batches/{batch_id} for status and results.
+    """
+    if not clauses_list:
+        raise HTTPException(status_code=400, detail="Clauses list cannot be empty")
 
-            retrieved_paragraphs = retrieval_response.json().get("documents", [])
-            if retrieved_paragraphs:
-                clause_paragraph_map[clause] = retrieved_paragraphs
+    uploads = [(file.filename, file.content_type, await file.read()) for file in files]
+    try:
+        submission = await job_queue.submit(uploads, clauses_list)
+    except JobQueueFullError:
+        logger.warning(f"⚠️ Rejecting {len(uploads)} jobs, queue at capacity: {job_queue.stats()}")
+        raise HTTPException(
+            status_code=503, detail="Job queue is full, retry later.", headers={"Retry-After": JOB_RETRY_AFTER_SECONDS}
+        )
 
-        if not clause_paragraph_map:
-            return {"message": "No relevant clauses found in the document."}
-        
-        return clause_paragraph_map
+    logger.info(f"📥 Queued {len(uploads)} jobs in batch {submission['batch_id']}")
+    return {
+        "batch_id": submission["batch_id"],
+        "jobs": [{"job_id": job["job_id"], "filename": job["filename"]} for job in submission["jobs"]],
+    }
 
-        # Step 4: Validate extracted clauses
-        # logger.info(f"✅ Validating extracted clauses against: {clauses_list}")
-        # clause_response = requests.post(CLAUSE_VALIDATOR_URL, json=clause_paragraph_map)
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0, ge=0)):
+    """Job status and, once succeeded, its result. `wait` long-polls up to that many seconds for completion."""
+    job = await job_queue.wait(job_id, min(wait, JOB_MAX_WAIT_SECONDS))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-        # if clause_response.status_code != 200:
-        #     raise HTTPException(status_code=clause_response.status_code, detail="Clause validation failed")
+@app.get("/batches/{batch_id}")
+async def get_batch(batch_id: str, wait: float = Query(0, ge=0)):
+    """Status and results of every job in a batch. `wait` long-polls until all have finished."""
+    jobs = await job_queue.wait_batch(batch_id, min(wait, JOB_MAX_WAIT_SECONDS))
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return {
+        "batch_id": batch_id,
+        "finished": all(job["status"] in FINISHED_STATUSES for job in jobs),
+        "jobs": jobs,
+    }
 
-        # validated_clauses = clause_response.json()
-        # return {"message": "📜 Document processed successfully.", "validated_clauses": validated_clauses}
+@app.get("/job-stats")
+async def job_stats():
+    """Job queue depth, outcomes and per-stage concurrency and throughput."""
+    return job_queue.stats()
 
+async def downstream_status(url: str) -> Dict:
+    """Readiness report of one downstream service, or why it could not be fetched."""
+    try:
+        response = await http_client.get(url, timeout=READY_CHECK_TIMEOUT)
+        return {"ready": response.status_code == 200, **response.json()}
     except Exception as e:
-        logger.error(f"❌ Error processing document: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+        return {"ready": False, "error": str(e)}
+
+@app.get("/livez")
+async def liveness_check():
+    """Liveness: the gateway process is up."""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_check():
+    """Readiness: 200 once the gateway and every downstream service are ready, 503 before."""
+    report = readiness.report()
+    if readiness.ready:
+        services = {"ocr_service": OCR_READY_URL, "vector_database_service": CHROMA_READY_URL}
+        if CLAUSE_VALIDATOR_READY_URL:
+            services["legal_clause_validator"] = CLAUSE_VALIDATOR_READY_URL
+        statuses = await asyncio.gather(*(downstream_status(url) for url in services.values()))
+        report["downstream"] = dict(zip(services, statuses))
+    if not readiness.ready or not all(status["ready"] for status in report["downstream"].values()):
+        return JSONResponse(status_code=503, content=report)
+    return report
 
 @app.get("/")
 def health_check():
@@ -0,0 +1,244 @@
+"""
+Gateway benchmarks: the whole /extract-clauses and /jobs flow against
+in-process stand-ins for the OCR and vector services.
+
+The stand-ins speak the real services' HTTP contracts but do no real work:
+OCR streams the manifest's paragraphs (optionally sleeping per page to
+imitate OCR latency), and the vector store keeps paragraphs in a dict and
+ranks them by keyword overlap. Both negotiate JSON or msgpack as the real
+services do, and the flow is timed once per wire format. The gateway's
+HTTP client is swapped for one that routes each service host to its
+stand-in over ASGI, so the numbers cover the gateway's own streaming,
+batching, encoding and job scheduling without sockets or models.
+"""
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import httpx
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import services
+from corpus import CLAUSE_TYPES
+from common.wire_format import (
+    MSGPACK_MEDIA_TYPE,
+    WIRE_FORMATS,
+    accepts_msgpack,
+    column,
+    msgpack,
+    negotiated_response,
+    read_payload,
+    stream_record,
+    to_columns,
+)
+
+
+def ocr_stand_in(manifest: List[Dict], page_delay: float) -> FastAPI:
+    """Streams each uploaded file's manifest paragraphs as /extract-text-stream does."""
+    documents = {document["filename"]: document for document in manifest}
+    app = FastAPI()
+
+    @app.post("/extract-text-stream")
+    async def extract_text_stream(request: Request, file: UploadFile = File(...)):
+        await file.read()
+        document = documents[file.filename]
+        binary = accepts_msgpack(request)
+
+        async def _records():
+            for page_number, paragraphs in enumerate(document["pages"], 1):
+                if page_delay:
+                    await asyncio.sleep(page_delay)
+                if binary:
+                    yield stream_record({"page": page_number, "text": paragraphs, "bbox": []}, binary)
+                    continue
+                for para_number, text in enumerate(paragraphs):
+                    yield stream_record({"page": page_number, "para": para_number, "text": text}, binary)
+
+        return StreamingResponse(_records(), media_type=MSGPACK_MEDIA_TYPE if binary else "application/x-ndjson")
+
+    @app.get("/readyz")
+    async def readiness_check():
+        return {"status": "ready"}
+
+    return app
+
+
+def _keywords(text: str) -> set:
+    return {word.strip(".,;()").lower() for word in text.split()} - {"clause", "of", "the"}
+
+
+def vector_stand_in() -> FastAPI:
+    """In-memory /store-text, /finalize-ingest and /retrieve-text-batch with keyword-overlap ranking."""
+    paragraphs: Dict[str, Dict] = {}  # id -> {text, metadata, ingest_id}
+    app = FastAPI()
+
+    @app.post("/store-text")
+    async def store_text(http_request: Request):
+        request = await read_payload(http_request)
+        documents = request["documents"]
+        if isinstance(documents, dict):  # Columnar table (msgpack)
+            documents = [
+                dict(zip(("text", "filename", "page_number", "para_number"), fields))
+                for fields in zip(*(column(documents, key) for key in ("text", "filename", "page_number", "para_number")))
+            ]
+        added = 0
+        for document in documents:
+            doc_id = f"{document['filename']}_{document['page_number']}_{document['para_number']}"
+            added += doc_id not in paragraphs
+            paragraphs[doc_id] = {
+                "text": document["text"],
+                "metadata": {key: document[key] for key in ("filename", "page_number", "para_number")},
+                "ingest_id": request.get("ingest_id"),
+            }
+        return {"added": added, "updated": len(documents) - added, "unchanged": 0}
+
+    @app.post("/finalize-ingest")
+    async def finalize_ingest(request: Dict):
+        stale = [
+            doc_id
+            for doc_id, paragraph in paragraphs.items()
+            if paragraph["metadata"]["filename"] == request["filename"] and paragraph["ingest_id"] != request["ingest_id"]
+        ]
+        for doc_id in stale:
+            del paragraphs[doc_id]
+        return {"deleted": len(stale)}
+
+    @app.post("/retrieve-text-batch")
+    async def retrieve_text_batch(request: Dict, http_request: Request):
+        metadata_filter = request.get("metadata_filter") or {}
+        candidates = [
+            (doc_id, paragraph)
+            for doc_id, paragraph in paragraphs.items()
+            if all(paragraph["metadata"].get(key) == value for key, value in metadata_filter.items())
+        ]
+        results = {}
+        for query in request["queries"]:
+            keywords = _keywords(query)
+            ranked = sorted(
+                candidates, key=lambda candidate: len(keywords & _keywords(candidate[1]["text"])), reverse=True
+            )
+            results[query] = [
+                {"id": doc_id, "text": paragraph["text"], "distance": 0.0, "metadata": paragraph["metadata"]}
+                for doc_id, paragraph in ranked[: request.get("top_k", 5)]
+            ]
+        return negotiated_response(
+            http_request,
+            {"results": results},
+            lambda: {"results": {query: to_columns(matches) for query, matches in results.items()}},
+        )
+
+    @app.get("/readyz")
+    async def readiness_check():
+        return {"status": "ready"}
+
+    return app
+
+
+class HostRoutingTransport(httpx.AsyncBaseTransport):
+    """Sends each request to the ASGI app registered for its host."""
+
+    def __init__(self, apps: Dict[str, FastAPI]):
+        self.transports = {host: httpx.ASGITransport(app=app) for host, app in apps.items()}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.transports[request.url.host].handle_async_request(request)
+
+
+def _upload(corpus_dir: str, filename: str):
+    with open(os.path.join(corpus_dir, filename), "rb") as f:
+        return (filename, f.read(), "application/pdf")
+
+
+def _bench_flow(client: TestClient, uploads: List, pages: int, concurrency: int) -> Dict:
+    params = {"clauses_list": CLAUSE_TYPES}
+
+    def _extract(upload) -> float:
+        start = time.perf_counter()
+        response = client.post("/extract-clauses", params=params, files={"file": upload})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    _extract(uploads[0])  # Untimed: first-request setup
+    latencies = sorted(_extract(upload) for upload in uploads)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(_extract, uploads))
+    concurrent_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response = client.post("/jobs", params=params, files=[("files", upload) for upload in uploads])
+    response.raise_for_status()
+    batch_id = response.json()["batch_id"]
+    while True:
+        batch = client.get(f"/batches/{batch_id}", params={"wait": 30}).json()
+        if batch["finished"]:
+            break
+    jobs_seconds = time.perf_counter() - start
+
+    return {
+        "extract_clauses": {
+            "sequential": {
+                "p50_ms": 1000 * latencies[len(latencies) // 2],
+                "p95_ms": 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "mean_ms": 1000 * statistics.mean(latencies),
+            },
+            "concurrent": {
+                "concurrency": concurrency,
+                "documents_per_second": len(uploads) / concurrent_seconds,
+                "pages_per_second": pages / concurrent_seconds,
+            },
+        },
+        "jobs": {
+            "succeeded": sum(job["status"] == "succeeded" for job in batch["jobs"]),
+            "documents_per_second": len(uploads) / jobs_seconds,
+            "pages_per_second": pages / jobs_seconds,
+        },
+    }
+
+
+def run(corpus_dir: str, manifest: List[Dict], page_delay: float = 0.01, concurrency: int = 4, job_workers: int = 4) -> Dict:
+    """
+    Per wire format: per-document /extract-clauses latency (one at a time),
+    its throughput with `concurrency` requests in flight, and /jobs
+    throughput for the whole corpus submitted as one batch.
+    """
+    # Read by the gateway at import time
+    os.environ["JOB_WORKERS"] = str(job_workers)
+    os.environ["JOB_MAX_QUEUE"] = str(max(len(manifest), 1))
+    gateway = services.load_service_main("api_gateway")
+    hosts = {
+        httpx.URL(gateway.OCR_STREAM_URL).host: ocr_stand_in(manifest, page_delay),
+        httpx.URL(gateway.CHROMA_STORE_URL).host: vector_stand_in(),
+    }
+    uploads = [_upload(corpus_dir, document["filename"]) for document in manifest]
+    pages = sum(len(document["pages"]) for document in manifest)
+    # msgpack is only benchmarked when installed
+    wire_formats = [wire_format for wire_format in WIRE_FORMATS if wire_format != "msgpack" or msgpack is not None]
+
+    results = {}
+    with TestClient(gateway.app) as client:
+        # Swap in the stand-in transport, keeping the gateway's hooks and limits
+        original = gateway.http_client
+        gateway.http_client = httpx.AsyncClient(transport=HostRoutingTransport(hosts), event_hooks=original.event_hooks)
+        client.portal.call(original.aclose)
+
+        for wire_format in wire_formats:
+            gateway.WIRE_FORMAT = wire_format
+            results[wire_format] = _bench_flow(client, uploads, pages, concurrency)
+        job_stats = client.get("/job-stats").json()
+
+    return {
+        "documents": len(manifest),
+        "pages": pages,
+        "clauses": len(CLAUSE_TYPES),
+        "ocr_page_delay_ms": 1000 * page_delay,
+        "job_workers": job_workers,
+        "wire_formats": results,
+        "job_stages": job_stats["stages"],
+    }
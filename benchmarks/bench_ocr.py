@@ -0,0 +1,118 @@
+"""
+OCR benchmarks: OCRProcessor.process_pdf on the synthetic corpus (born-digital
+and scanned-style documents reported separately), and the layout functions
+on synthetic tesseract output so they can be timed without tesseract.
+"""
+import difflib
+import os
+import shutil
+import statistics
+import time
+from typing import Dict, List
+
+# Imported for its side effect: puts the service directories and common/ on sys.path
+import services  # noqa: F401
+from corpus import LEADING, MARGIN, page_lines
+from ocr import LAYOUT_ENGINES, OCRProcessor
+
+# Layout input is laid out as the text would be rasterized at this resolution
+LAYOUT_DPI = 200
+# Average glyph width of the body font, as a fraction of the font size
+CHAR_WIDTH_RATIO = 0.5
+FONT_SIZE = 11
+
+
+def synthetic_ocr_data(paragraphs: List[str]) -> Dict[str, List]:
+    """pytesseract-style word data for a page, positioned like the rendered text."""
+    scale = LAYOUT_DPI / 72
+    char_width = FONT_SIZE * CHAR_WIDTH_RATIO * scale
+    height = round(FONT_SIZE * scale)
+    ocr_data = {"left": [], "top": [], "width": [], "height": [], "text": [], "conf": []}
+    for line_number, line in enumerate(page_lines(paragraphs)):
+        x = MARGIN * scale
+        y = round((MARGIN + line_number * LEADING) * scale)
+        for word in line.split():
+            width = round(len(word) * char_width)
+            ocr_data["left"].append(round(x))
+            ocr_data["top"].append(y)
+            ocr_data["width"].append(width)
+            ocr_data["height"].append(height)
+            ocr_data["text"].append(word)
+            ocr_data["conf"].append(95.0)
+            x += width + char_width
+    return ocr_data
+
+
+def bench_layout(manifest: List[Dict], repeat: int) -> Dict:
+    """Per-page layout time for each layout engine, and whether the engines agree."""
+    pages = [synthetic_ocr_data(paragraphs) for document in manifest for paragraphs in document["pages"]]
+    results, outputs = {}, {}
+    for engine in LAYOUT_ENGINES:
+        processor = OCRProcessor(layout_engine=engine)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs[engine] = [processor.layout_ocr_data(ocr_data) for ocr_data in pages]
+            timings.append((time.perf_counter() - start) / len(pages))
+        results[engine] = {"pages": len(pages), "ms_per_page": 1000 * min(timings)}
+
+    expected = len([p for document in manifest for paragraphs in document["pages"] for p in paragraphs])
+    reference = outputs[LAYOUT_ENGINES[0]]
+    return {
+        "engines": results,
+        "engines_agree": all(outputs[engine] == reference for engine in LAYOUT_ENGINES),
+        "paragraphs_expected": expected,
+        "paragraphs_found": sum(len(texts) for texts, _ in reference),
+    }
+
+
+def _clause_similarity(pages: Dict[int, List[str]], clauses: List[Dict]) -> List[float]:
+    """Best text similarity between each known clause paragraph and the paragraphs extracted from its page."""
+    return [
+        max((difflib.SequenceMatcher(a=clause["text"], b=text).ratio() for text in pages.get(clause["page"], [])), default=0.0)
+        for clause in clauses
+    ]
+
+
+def bench_process_pdf(corpus_dir: str, manifest: List[Dict], max_workers: int) -> Dict:
+    """Pages per second and clause text fidelity of process_pdf, per document kind."""
+    missing = [tool for tool in ("pdfinfo", "pdftoppm", "pdftotext", "tesseract") if shutil.which(tool) is None]
+    if missing:
+        return {"skipped": f"missing tools: {', '.join(missing)}"}
+
+    processor = OCRProcessor(max_workers=max_workers)
+    processor.warmup()
+    by_kind = {}
+    try:
+        for document in manifest:
+            start = time.perf_counter()
+            rows = processor.process_pdf(os.path.join(corpus_dir, document["filename"]))
+            elapsed = time.perf_counter() - start
+
+            pages: Dict[int, List[str]] = {}
+            for page_number, _, text in rows:
+                pages.setdefault(page_number, []).append(text)
+            stats = by_kind.setdefault(document["kind"], {"documents": 0, "pages": 0, "seconds": 0.0, "similarity": []})
+            stats["documents"] += 1
+            stats["pages"] += len(document["pages"])
+            stats["seconds"] += elapsed
+            stats["similarity"].extend(_clause_similarity(pages, document["clauses"]))
+    finally:
+        processor.close()
+
+    return {
+        kind: {
+            "documents": stats["documents"],
+            "pages": stats["pages"],
+            "pages_per_second": stats["pages"] / stats["seconds"] if stats["seconds"] else 0.0,
+            "mean_clause_similarity": statistics.mean(stats["similarity"]) if stats["similarity"] else 0.0,
+        }
+        for kind, stats in by_kind.items()
+    }
+
+
+def run(corpus_dir: str, manifest: List[Dict], repeat: int = 3, max_workers: int = 1) -> Dict:
+    return {
+        "layout": bench_layout(manifest, repeat),
+        "process_pdf": bench_process_pdf(corpus_dir, manifest, max_workers),
+    }
@@ -0,0 +1,127 @@
+"""
+Validator benchmarks: LegalClauseValidator on a tiny local T5 checkpoint.
+
+The checkpoint is built on the fly: a sentencepiece vocabulary trained on
+the corpus text and a small randomly initialised T5 with a fixed seed, so
+the numbers measure the validator's batching, tokenization and model
+plumbing rather than FLAN-T5 itself (its verdicts are meaningless). Each
+document of the corpus is one request asking every clause type about
+`top_k` of its paragraphs, as the gateway sends them, run one at a time and
+then concurrently, in both validation modes and with no verdict cache.
+"""
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# Imported for its side effect: puts the service directories and common/ on sys.path
+import services  # noqa: F401
+from corpus import CLAUSE_TYPES
+
+try:
+    import sentencepiece as spm
+    import torch
+    from transformers import T5Config, T5ForConditionalGeneration, T5Tokenizer
+except ImportError:  # Optional: the suite is skipped without the model dependencies
+    spm = None
+
+# Tiny T5 shape; the vocabulary size is set by the trained tokenizer
+TINY_T5 = {"d_model": 64, "d_ff": 128, "d_kv": 16, "num_heads": 4, "num_layers": 2, "num_decoder_layers": 2}
+TOKENIZER_VOCAB_SIZE = 800
+MODEL_SEED = 0
+
+
+def build_tiny_checkpoint(manifest: List[Dict], path: str) -> str:
+    """Trains a tokenizer on the corpus and saves it with a seeded tiny T5 to `path`."""
+    os.makedirs(path, exist_ok=True)
+    # The prompt wording and the yes/no answers need pieces of their own too
+    lines = [text for document in manifest for paragraphs in document["pages"] for text in paragraphs]
+    lines += CLAUSE_TYPES + ["Does the following paragraph contain this clause? Answer yes or no. Yes No"]
+    spm.SentencePieceTrainer.train(
+        sentence_iterator=iter(lines),
+        model_prefix=os.path.join(path, "spiece"),
+        vocab_size=TOKENIZER_VOCAB_SIZE,
+        hard_vocab_limit=False,
+        pad_id=0,
+        eos_id=1,
+        unk_id=2,
+        bos_id=-1,
+    )
+    tokenizer = T5Tokenizer(os.path.join(path, "spiece.model"), extra_ids=0)
+    tokenizer.save_pretrained(path)
+
+    torch.manual_seed(MODEL_SEED)
+    config = T5Config(
+        vocab_size=len(tokenizer), pad_token_id=0, eos_token_id=1, decoder_start_token_id=0, **TINY_T5
+    )
+    T5ForConditionalGeneration(config).save_pretrained(path)
+    return path
+
+
+def _requests(manifest: List[Dict], top_k: int) -> List[Dict[str, List[str]]]:
+    """One clause query map per document: each clause type with `top_k` of its paragraphs, clause first if present."""
+    requests = []
+    for document in manifest:
+        paragraphs = [text for page in document["pages"] for text in page]
+        clauses = {clause["clause_type"]: clause["text"] for clause in document["clauses"]}
+        queries = {}
+        for clause_type in CLAUSE_TYPES:
+            known = [clauses[clause_type]] if clause_type in clauses else []
+            queries[clause_type] = (known + [text for text in paragraphs if text not in known])[:top_k]
+        requests.append(queries)
+    return requests
+
+
+def _bench_mode(model_path: str, mode: str, requests: List[Dict[str, List[str]]], concurrency: int) -> Dict:
+    from legal_clause_validator import LegalClauseValidator
+
+    validator = LegalClauseValidator(model_path, validation_mode=mode, verdict_cache=None)
+    try:
+        validator.warmup()
+        prompts = sum(len(paragraphs) for queries in requests for paragraphs in queries.values())
+
+        latencies = []
+        start = time.perf_counter()
+        for queries in requests:
+            request_start = time.perf_counter()
+            validator.validate_clauses(queries)
+            latencies.append(time.perf_counter() - request_start)
+        sequential_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(validator.validate_clauses, requests))
+        concurrent_seconds = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            "requests": len(requests),
+            "prompts_per_request": prompts / len(requests),
+            "sequential": {
+                "p50_ms": 1000 * latencies[len(latencies) // 2],
+                "p95_ms": 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "mean_ms": 1000 * statistics.mean(latencies),
+                "prompts_per_second": prompts / sequential_seconds,
+            },
+            "concurrent": {"concurrency": concurrency, "prompts_per_second": prompts / concurrent_seconds},
+            # Cumulative over the warmup and both runs
+            "scheduler": validator.scheduler.stats(),
+        }
+    finally:
+        validator.close()
+
+
+def run(manifest: List[Dict], top_k: int = 5, concurrency: int = 4) -> Dict:
+    if spm is None:
+        return {"skipped": "sentencepiece, torch or transformers is not installed"}
+
+    requests = _requests(manifest, top_k)
+    with tempfile.TemporaryDirectory(prefix="bench_validator_") as directory:
+        model_path = build_tiny_checkpoint(manifest, os.path.join(directory, "tiny-t5"))
+        return {
+            "model": {"vocab_size": T5Tokenizer.from_pretrained(model_path).vocab_size, **TINY_T5},
+            "top_k": top_k,
+            "modes": {mode: _bench_mode(model_path, mode, requests, concurrency) for mode in ("score", "generate")},
+        }
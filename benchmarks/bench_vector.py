@@ -0,0 +1,105 @@
+"""
+Vector store benchmarks: ChromaService ingestion and retrieval as the
+collection grows.
+
+The corpus is ingested again under new filenames ("copy-N/<filename>") until
+the collection holds each requested number of copies. After each step,
+every clause type is queried once per document of the first copy, both
+restricted to that document and across the whole collection, and recall@k
+is the fraction of the document's known clause paragraphs found among the
+results (matched by text, so any copy's paragraph counts for global
+queries). The collection lives in a temporary directory, since ChromaService
+always opens ./chroma_db.
+"""
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence
+
+# Imported for its side effect: puts the service directories and common/ on sys.path
+import services  # noqa: F401
+from bulk_ingest import Paragraph
+from chroma_service import ChromaService
+from corpus import CLAUSE_TYPES, corpus_paragraphs
+
+COLLECTION_NAME = "benchmark_docs"
+
+
+@contextmanager
+def _working_directory(path: str) -> Iterator[None]:
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _percentiles(timings: List[float]) -> Dict[str, float]:
+    timings = sorted(timings)
+    return {
+        "p50_ms": 1000 * timings[len(timings) // 2],
+        "p95_ms": 1000 * timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def _copy_paragraphs(manifest: List[Dict], copy: int) -> Dict[str, List[Paragraph]]:
+    documents: Dict[str, List[Paragraph]] = {}
+    for filename, page_number, para_number, text in corpus_paragraphs(manifest):
+        name = f"copy-{copy}/{filename}"
+        documents.setdefault(name, []).append(Paragraph(text, name, page_number, para_number))
+    return documents
+
+
+def _bench_queries(service: ChromaService, manifest: List[Dict], top_k: int, global_search: bool) -> Dict:
+    timings, recalls = [], []
+    for document in manifest:
+        metadata_filter = None if global_search else {"filename": f"copy-0/{document['filename']}"}
+        expected = {clause["clause_type"]: clause["text"] for clause in document["clauses"]}
+        for clause_type in CLAUSE_TYPES:
+            start = time.perf_counter()
+            texts = service.retrieve_documents(clause_type, top_k=top_k, metadata_filter=metadata_filter)
+            timings.append(time.perf_counter() - start)
+            if clause_type in expected:
+                recalls.append(1.0 if expected[clause_type] in texts else 0.0)
+    return {"queries": len(timings), **_percentiles(timings), f"recall@{top_k}": statistics.mean(recalls)}
+
+
+def run(manifest: List[Dict], corpus_copies: Sequence[int] = (1, 4, 16), top_k: int = 5, embedding_backend: str = "torch") -> Dict:
+    """
+    Ingestion throughput and filtered/global query latency and recall at
+    each collection size in `corpus_copies` (number of corpus copies stored).
+    """
+    steps = []
+    with tempfile.TemporaryDirectory(prefix="bench_vector_") as directory, _working_directory(directory):
+        # No query cache, so every query includes its embedding
+        service = ChromaService(
+            collection_name=COLLECTION_NAME, query_cache_size=0, embedding_backend=embedding_backend
+        )
+        service.warmup()
+        stored = 0
+        for copies in sorted(corpus_copies):
+            paragraphs, seconds = 0, 0.0
+            for copy in range(stored, copies):
+                for document in _copy_paragraphs(manifest, copy).values():
+                    start = time.perf_counter()
+                    service.add_documents(document)
+                    seconds += time.perf_counter() - start
+                    paragraphs += len(document)
+            stored = max(stored, copies)
+
+            steps.append(
+                {
+                    "copies": copies,
+                    "collection_size": service.collection.count(),
+                    "ingest": {
+                        "paragraphs": paragraphs,
+                        "paragraphs_per_second": paragraphs / seconds if seconds else 0.0,
+                    },
+                    "filtered_query": _bench_queries(service, manifest, top_k, global_search=False),
+                    "global_query": _bench_queries(service, manifest, top_k, global_search=True),
+                }
+            )
+    return {"embedding_backend": embedding_backend, "top_k": top_k, "steps": steps}
@@ -0,0 +1,93 @@
+"""
+Compares two run_benchmarks.py result files metric by metric.
+
+Usage:
+    python compare_benchmarks.py results/baseline.json results/candidate.json
+    python compare_benchmarks.py baseline.json candidate.json --threshold 10 --fail-on-regression
+
+Every numeric result present in both files is listed with its relative
+change. Metrics are judged by name: latencies and durations (`_ms`,
+`_seconds`) should go down, rates and quality (`per_second`, `per_minute`,
+`recall`, `similarity`) should go up; changes beyond --threshold percent in
+the wrong direction are flagged as regressions. Configuration differences
+between the runs are printed first, since they make the numbers
+incomparable.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Optional
+
+LOWER_IS_BETTER = ("_ms", "_seconds")
+HIGHER_IS_BETTER = ("per_second", "per_minute", "recall", "similarity")
+
+
+def numeric_leaves(value, prefix: str = "") -> Dict[str, float]:
+    """Numeric values of a nested result, keyed by their dotted path (lists by index)."""
+    if isinstance(value, bool):
+        return {}
+    if isinstance(value, (int, float)):
+        return {prefix: value}
+    items = value.items() if isinstance(value, dict) else enumerate(value) if isinstance(value, list) else []
+    leaves = {}
+    for key, child in items:
+        leaves.update(numeric_leaves(child, f"{prefix}.{key}" if prefix else str(key)))
+    return leaves
+
+
+def direction(metric: str) -> Optional[int]:
+    """-1 if lower is better, 1 if higher is better, None if the name doesn't say."""
+    name = metric.rsplit(".", 1)[-1]
+    if any(marker in name for marker in HIGHER_IS_BETTER):
+        return 1
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=5.0, help="Percent change flagged as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if any metric regressed")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    for key in sorted(set(baseline.get("config", {})) | set(candidate.get("config", {}))):
+        before, after = baseline["config"].get(key), candidate["config"].get(key)
+        if before != after:
+            print(f"⚠️ config {key}: {before} -> {after}")
+    print(f"baseline:  {baseline['meta'].get('git_commit')} ({baseline['meta'].get('timestamp')})")
+    print(f"candidate: {candidate['meta'].get('git_commit')} ({candidate['meta'].get('timestamp')})")
+
+    before_leaves = numeric_leaves(baseline["results"])
+    after_leaves = numeric_leaves(candidate["results"])
+    regressions = []
+    for metric in sorted(set(before_leaves) & set(after_leaves)):
+        before, after = before_leaves[metric], after_leaves[metric]
+        change = 100 * (after - before) / abs(before) if before else 0.0
+        sign = direction(metric)
+        flag = ""
+        if sign is not None and change * sign < -args.threshold:
+            flag = "  ❌ regression"
+            regressions.append(metric)
+        elif sign is not None and change * sign > args.threshold:
+            flag = "  ✅ improvement"
+        print(f"{metric:<70} {before:>14.4g} {after:>14.4g} {change:>+8.1f}%{flag}")
+
+    for metric in sorted(set(before_leaves) ^ set(after_leaves)):
+        print(f"{metric:<70} only in {'baseline' if metric in before_leaves else 'candidate'}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regressions beyond {args.threshold}%")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
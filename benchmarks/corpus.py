@@ -0,0 +1,243 @@
+"""
+Synthetic contract corpus for the benchmarks.
+
+Documents are multi-page contracts of filler paragraphs with one paragraph
+of several clause types mixed in, all drawn from a seeded RNG so the same
+seed always gives the same corpus. Each document is written either as a
+born-digital PDF (a real text layer, written directly with no PDF library)
+or as a scanned-style PDF (pages rendered to slightly skewed grayscale
+images, no text layer). The manifest records which paragraph of which page
+holds each clause, for retrieval recall.
+"""
+import json
+import os
+import random
+import textwrap
+from typing import Dict, List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+CLAUSE_PARAGRAPHS: Dict[str, List[str]] = {
+    "Indemnification Clause": [
+        "The {supplier} shall indemnify, defend and hold harmless the {customer} and its officers, directors and "
+        "employees from and against any and all losses, damages, liabilities, costs and expenses arising out of any "
+        "breach of this Agreement by the {supplier}.",
+        "Each party agrees to indemnify the other party against all third-party claims resulting from its gross "
+        "negligence or wilful misconduct in the performance of this Agreement.",
+    ],
+    "Governing Law Clause": [
+        "This Agreement shall be governed by and construed in accordance with the laws of {jurisdiction}, and the "
+        "parties submit to the exclusive jurisdiction of its courts.",
+        "Any dispute arising under or in connection with this Agreement shall be governed by the laws of {jurisdiction}.",
+    ],
+    "Confidentiality Clause": [
+        "The Receiving Party shall hold all Confidential Information in strict confidence, use it solely for the "
+        "purposes of this Agreement and not disclose it to any third party without the prior written consent of "
+        "the Disclosing Party.",
+        "Neither party shall disclose the terms of this Agreement except to its legal and financial advisers who "
+        "are bound by obligations of confidentiality.",
+    ],
+    "Termination Clause": [
+        "Either party may terminate this Agreement with immediate effect by written notice if the other party "
+        "commits a material breach which is not remedied within {days} days of being notified of the breach.",
+        "This Agreement may be terminated by the {customer} for convenience on {days} days prior written notice.",
+    ],
+    "Force Majeure Clause": [
+        "Neither party shall be liable for any delay or failure to perform its obligations where such delay or "
+        "failure results from events beyond its reasonable control, including acts of God, fire, flood, war, "
+        "terrorism, strikes or epidemics.",
+    ],
+    "Limitation of Liability Clause": [
+        "In no event shall either party's aggregate liability under this Agreement exceed the total fees paid by "
+        "the {customer} in the twelve months preceding the claim.",
+        "Neither party shall be liable for any indirect, incidental, special or consequential damages, including "
+        "loss of profits, arising out of this Agreement.",
+    ],
+}
+
+CLAUSE_TYPES = list(CLAUSE_PARAGRAPHS)
+
+_FILLER_SENTENCES = [
+    "The {supplier} shall deliver the Services described in Schedule {schedule} in accordance with the agreed plan.",
+    "All invoices are payable within {days} days of receipt by the {customer}.",
+    "The parties shall meet quarterly to review the performance of the Services.",
+    "Each party shall appoint a representative with authority to make decisions on its behalf.",
+    "Notices shall be in writing and delivered by hand or sent by registered post to the addresses above.",
+    "The {customer} shall provide the {supplier} with reasonable access to its premises during business hours.",
+    "Any change to the scope of the Services shall be agreed in writing through the change control procedure.",
+    "The {supplier} shall maintain accurate records of the time spent and materials used in providing the Services.",
+    "This Agreement constitutes the entire agreement between the parties relating to its subject matter.",
+    "No failure or delay by a party in exercising any right shall operate as a waiver of that right.",
+]
+
+_PARTIES = ["Supplier", "Contractor", "Service Provider", "Vendor", "Licensor"]
+_CUSTOMERS = ["Customer", "Client", "Company", "Purchaser", "Licensee"]
+_JURISDICTIONS = ["England and Wales", "the State of New York", "the State of Delaware", "Ontario", "Singapore"]
+
+# Born-digital layout: US Letter in points, Helvetica, one blank line between paragraphs
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+FONT_SIZE, LEADING, MARGIN = 11, 14, 72
+WRAP_COLUMNS = 90
+# Scanned-style pages are rendered at this resolution
+SCAN_DPI = 150
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        supplier=rng.choice(_PARTIES),
+        customer=rng.choice(_CUSTOMERS),
+        jurisdiction=rng.choice(_JURISDICTIONS),
+        days=rng.choice([14, 30, 60, 90]),
+        schedule=rng.randint(1, 5),
+    )
+
+
+def _filler_paragraph(rng: random.Random) -> str:
+    return " ".join(_fill(rng.choice(_FILLER_SENTENCES), rng) for _ in range(rng.randint(2, 4)))
+
+
+def generate_document(rng: random.Random, pages: int, paragraphs_per_page: int, clauses_per_document: int) -> Dict:
+    """
+    One contract: `pages` pages of paragraphs, with a paragraph of
+    `clauses_per_document` distinct clause types placed at random positions.
+
+    Returns:
+        Dict: {"pages": [[paragraph, ...], ...], "clauses": [{clause_type, page, para, text}, ...]}
+    """
+    page_paragraphs = [[_filler_paragraph(rng) for _ in range(paragraphs_per_page)] for _ in range(pages)]
+    slots = rng.sample(
+        [(page, para) for page in range(pages) for para in range(paragraphs_per_page)],
+        min(clauses_per_document, pages * paragraphs_per_page),
+    )
+    clauses = []
+    for clause_type, (page, para) in zip(rng.sample(CLAUSE_TYPES, len(slots)), slots):
+        text = _fill(rng.choice(CLAUSE_PARAGRAPHS[clause_type]), rng)
+        page_paragraphs[page][para] = text
+        clauses.append({"clause_type": clause_type, "page": page + 1, "para": para, "text": text})
+    return {"pages": page_paragraphs, "clauses": clauses}
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def page_lines(paragraphs: List[str]) -> List[str]:
+    """Wrapped lines of a page, with an empty line between paragraphs."""
+    lines = []
+    for paragraph in paragraphs:
+        if lines:
+            lines.append("")
+        lines.extend(textwrap.wrap(paragraph, WRAP_COLUMNS))
+    return lines
+
+
+def write_text_pdf(path: str, pages: List[List[str]]) -> None:
+    """Writes a born-digital PDF with a Helvetica text layer, one page per paragraph list."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_refs = []
+    for paragraphs in pages:
+        commands = [f"BT /F1 {FONT_SIZE} Tf {LEADING} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td"]
+        for line in page_lines(paragraphs):
+            commands.append(f"({_pdf_escape(line)}) Tj T*" if line else "T*")
+        commands.append("ET")
+        content = "\n".join(commands).encode("latin-1", errors="replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT, len(objects))
+        )
+        page_refs.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(page_refs), len(page_refs))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(output)
+
+
+def _scan_font() -> ImageFont.ImageFont:
+    size = round(FONT_SIZE * SCAN_DPI / 72)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 only has the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def write_scanned_pdf(path: str, pages: List[List[str]], rng: random.Random) -> None:
+    """Writes an image-only PDF: each page rendered in grayscale, slightly rotated like a scan."""
+    scale = SCAN_DPI / 72
+    font = _scan_font()
+    images = []
+    for paragraphs in pages:
+        image = Image.new("L", (round(PAGE_WIDTH * scale), round(PAGE_HEIGHT * scale)), 255)
+        draw = ImageDraw.Draw(image)
+        y = MARGIN * scale
+        for line in page_lines(paragraphs):
+            if line:
+                draw.text((MARGIN * scale, y), line, fill=0, font=font)
+            y += LEADING * scale
+        images.append(image.rotate(rng.uniform(-0.5, 0.5), fillcolor=255))
+    images[0].save(path, "PDF", save_all=True, append_images=images[1:], resolution=SCAN_DPI)
+
+
+def generate_corpus(
+    output_dir: str,
+    documents: int = 10,
+    pages: int = 5,
+    paragraphs_per_page: int = 6,
+    clauses_per_document: int = 4,
+    scanned_ratio: float = 0.3,
+    seed: int = 0,
+) -> List[Dict]:
+    """
+    Writes `documents` PDFs (about `scanned_ratio` of them scanned-style) and
+    manifest.json to `output_dir`.
+
+    Returns:
+        List[Dict]: The manifest; one {filename, kind, pages, clauses} entry per document.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = []
+    for index in range(documents):
+        document = generate_document(rng, pages, paragraphs_per_page, clauses_per_document)
+        scanned = rng.random() < scanned_ratio
+        filename = f"contract_{index:04d}_{'scanned' if scanned else 'digital'}.pdf"
+        path = os.path.join(output_dir, filename)
+        if scanned:
+            write_scanned_pdf(path, document["pages"], rng)
+        else:
+            write_text_pdf(path, document["pages"])
+        manifest.append(
+            {
+                "filename": filename,
+                "kind": "scanned" if scanned else "born_digital",
+                "pages": document["pages"],
+                "clauses": document["clauses"],
+            }
+        )
+
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def corpus_paragraphs(manifest: List[Dict]) -> List[Tuple[str, int, int, str]]:
+    """(filename, page_number, para_number, text) for every paragraph of the corpus, as OCR would number them."""
+    return [
+        (document["filename"], page_number, para_number, text)
+        for document in manifest
+        for page_number, paragraphs in enumerate(document["pages"], 1)
+        for para_number, text in enumerate(paragraphs)
+    ]
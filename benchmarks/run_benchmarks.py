@@ -0,0 +1,132 @@
+"""
+Runs the benchmark suites on a synthetic contract corpus and writes the
+results as JSON.
+
+Usage:
+    python run_benchmarks.py --output results/$(date +%Y%m%d).json
+    python run_benchmarks.py --suites ocr gateway --documents 20 --pages 8
+    python compare_benchmarks.py results/baseline.json results/candidate.json
+
+Suites: ocr (OCRProcessor.process_pdf and the layout engines), vector
+(ChromaService ingestion and retrieval at growing collection sizes),
+validator (LegalClauseValidator on a tiny local T5) and gateway (the
+/extract-clauses and /jobs flow against in-process service stand-ins).
+The corpus is generated from --seed, so runs with the same settings are
+comparable. A suite whose dependencies are missing is recorded as
+{"skipped": reason} instead of failing the run.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict
+
+import services
+from corpus import generate_corpus
+
+# The services log every request at INFO; only this script's progress is shown at that level
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SUITES = ("ocr", "vector", "validator", "gateway")
+
+
+def environment() -> Dict:
+    """Where and on what the benchmarks ran, for telling runs apart."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=services.REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_suite(name: str, corpus_dir: str, manifest, args) -> Dict:
+    # Suites are imported on demand: each pulls in its service's dependencies
+    if name == "ocr":
+        import bench_ocr
+
+        return bench_ocr.run(corpus_dir, manifest, repeat=args.repeat, max_workers=args.ocr_workers)
+    if name == "vector":
+        import bench_vector
+
+        return bench_vector.run(manifest, corpus_copies=args.corpus_copies, top_k=args.top_k, embedding_backend=args.embedding_backend)
+    if name == "validator":
+        import bench_validator
+
+        return bench_validator.run(manifest, top_k=args.top_k, concurrency=args.concurrency)
+    import bench_gateway
+
+    return bench_gateway.run(corpus_dir, manifest, page_delay=args.ocr_page_delay, concurrency=args.concurrency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the benchmark suites and write JSON results.")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--output", help="JSON results file (printed if omitted)")
+    parser.add_argument("--corpus-dir", help="Keep the generated corpus here instead of a temporary directory")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--paragraphs-per-page", type=int, default=6)
+    parser.add_argument("--scanned-ratio", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions of the layout benchmark")
+    parser.add_argument("--ocr-workers", type=int, default=1)
+    parser.add_argument("--corpus-copies", type=int, nargs="+", default=[1, 4, 16], help="Collection sizes, in corpus copies")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--embedding-backend", default="torch", help="torch, onnx or onnx-int8")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight for the concurrent runs")
+    parser.add_argument("--ocr-page-delay", type=float, default=0.01, help="Seconds the gateway's OCR stand-in spends per page")
+    args = parser.parse_args()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "corpus_dir")}
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_corpus_") as directory:
+        corpus_dir = args.corpus_dir or directory
+        manifest = generate_corpus(
+            corpus_dir,
+            documents=args.documents,
+            pages=args.pages,
+            paragraphs_per_page=args.paragraphs_per_page,
+            scanned_ratio=args.scanned_ratio,
+            seed=args.seed,
+        )
+        for name in args.suites:
+            logger.info(f"⏱️ Running the {name} benchmarks")
+            start = time.perf_counter()
+            try:
+                results[name] = run_suite(name, corpus_dir, manifest, args)
+            except ImportError as e:
+                results[name] = {"skipped": f"missing dependency: {e.name or e}"}
+            except Exception as e:
+                logger.error(f"❌ The {name} benchmarks failed: {e}")
+                results[name] = {"skipped": f"failed: {e}"}
+            results[name]["suite_seconds"] = time.perf_counter() - start
+
+    report = json.dumps({"meta": environment(), "config": config, "results": results}, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+        logger.info(f"✅ Results written to {args.output}")
+    else:
+        print(report)
+    if any("skipped" in result for result in results.values()):
+        logger.warning(f"⚠️ Skipped: {[name for name, result in results.items() if 'skipped' in result]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+Puts the service directories on sys.path so the benchmarks can import
+their modules (the services use flat imports within their own directories,
+plus the shared `common` package at the repository root). Imported first by
+every benchmark module.
+"""
+import importlib.util
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICE_DIRS = ("ocr_service", "vector_database_service", "legal_clause_validator", "api_gateway")
+for path in [REPO_ROOT] + [os.path.join(REPO_ROOT, service_dir) for service_dir in SERVICE_DIRS]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def load_service_main(service_dir: str):
+    """A service's main module, loaded under its own name since every service has a main.py."""
+    spec = importlib.util.spec_from_file_location(f"{service_dir}_main", os.path.join(REPO_ROOT, service_dir, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,5 @@
+"""
+Modules shared by the services. Each image copies this package next to its
+service code (the build context is the repository root); to run a service
+from its directory locally, put the root on the path: `PYTHONPATH=.. uvicorn main:app`.
+"""
@@ -0,0 +1,319 @@
+import contextvars
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # Optional: sampling profiler; cProfile is used without it
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+PROFILE_HEADER = "X-Profile"
+
+# Incoming request ids are reused only if they look like ids (they also name profile reports)
+_REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,128}")
+
+# Histogram buckets for durations (seconds) and for sizes/counts
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+# Request id and Server-Timing durations of the request being handled
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("timings", default=None)
+
+# Observations are copied here instead of into this process's histograms
+# while capture_observations() is active (OCR pool workers)
+_capture = threading.local()
+
+
+class Histogram:
+    """Cumulative Prometheus histogram, one series per label combination."""
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...], labelnames: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        captured = getattr(_capture, "observations", None)
+        if captured is not None:
+            captured.append((self.name, value, labels))
+            return
+
+        key = tuple(str(labels.get(label, "")) for label in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (non-cumulative), sum, count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, timing: Optional[str] = None, **labels) -> Iterator[None]:
+        """Observes the block's duration, also adding it to the request's Server-Timing as `timing`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(elapsed, **labels)
+            if timing:
+                record_timing(timing, elapsed)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(labels + [_le(bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(labels + [_le('+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+
+class Metrics:
+    """Registry of this process's histograms, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(
+        self, name: str, documentation: str, buckets: Tuple[float, ...] = TIME_BUCKETS, labelnames: Tuple[str, ...] = ()
+    ) -> Histogram:
+        """The histogram called `name`, registered on first use."""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, documentation, buckets, labelnames)
+            return self._histograms[name]
+
+    def replay(self, captured: Dict) -> None:
+        """Applies observations and Server-Timing durations captured in another process."""
+        for name, value, labels in captured["observations"]:
+            histogram = self._histograms.get(name)
+            if histogram is not None:
+                histogram.observe(value, **labels)
+        for name, seconds in captured["timings"].items():
+            record_timing(name, seconds)
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = list(self._histograms.values())
+        return "\n".join(line for histogram in histograms for line in histogram.render()) + "\n"
+
+
+METRICS = Metrics()
+
+HTTP_REQUEST_SECONDS = METRICS.histogram(
+    "http_request_duration_seconds", "HTTP request latency (time to response headers).", labelnames=("method", "path", "status")
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _le(bound) -> str:
+    return f'le="{bound}"'
+
+
+def _labels(labels: List[str]) -> str:
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+@contextmanager
+def capture_observations() -> Iterator[Dict]:
+    """
+    Collects this thread's histogram observations and Server-Timing
+    durations (for Metrics.replay in the parent process) instead of
+    recording them.
+    """
+    captured = {"observations": [], "timings": {}}
+    _capture.observations = captured["observations"]
+    timings_token = _timings.set(captured["timings"])
+    try:
+        yield captured
+    finally:
+        _timings.reset(timings_token)
+        _capture.observations = None
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """Adds `seconds` to the current request's Server-Timing entry `name` (no-op outside a request)."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None) -> Iterator[str]:
+    """Sets the request id (generated if missing) and a fresh Server-Timing collection for the block."""
+    if not request_id or not _REQUEST_ID_PATTERN.fullmatch(request_id) or request_id.strip(".") == "":
+        request_id = uuid.uuid4().hex
+    id_token = _request_id.set(request_id)
+    timings_token = _timings.set({})
+    try:
+        yield request_id
+    finally:
+        _timings.reset(timings_token)
+        _request_id.reset(id_token)
+
+
+async def propagate_request_id(request) -> None:
+    """httpx request hook: forwards the current request id to downstream services."""
+    request_id = _request_id.get()
+    if request_id:
+        request.headers[REQUEST_ID_HEADER] = request_id
+
+
+async def collect_downstream_timings(response) -> None:
+    """httpx response hook: adds a downstream response's Server-Timing entries, prefixed by its host."""
+    header = response.headers.get("Server-Timing")
+    if header:
+        for name, seconds in parse_server_timing(header).items():
+            record_timing(f"{response.request.url.host}.{name}", seconds)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Durations in seconds from a Server-Timing header."""
+    timings = {}
+    for entry in header.split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        for param in params:
+            key, _, value = param.partition("=")
+            if name and key == "dur":
+                try:
+                    timings[name] = float(value) / 1000
+                except ValueError:
+                    pass
+    return timings
+
+
+# Profiles run one at a time: neither profiler can follow two overlapping
+# requests on the event loop thread
+_profile_lock = threading.Lock()
+
+
+@contextmanager
+def _profile(request_id: str, profile_dir: str) -> Iterator[Dict[str, str]]:
+    """
+    Profiles the block with pyinstrument (sampling) if installed, else cProfile, and writes the report.
+
+    While another request is being profiled the block runs unprofiled and
+    the result has no "path". cProfile only sees the event loop thread, so
+    time spent in worker threads shows up as waiting.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        yield {}
+        return
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        result = {}
+        if Profiler is not None:
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+            try:
+                yield result
+            finally:
+                profiler.stop()
+                result["path"] = os.path.join(profile_dir, f"{request_id}.html")
+                with open(result["path"], "w") as f:
+                    f.write(profiler.output_html())
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(50)
+            result["path"] = os.path.join(profile_dir, f"{request_id}.txt")
+            with open(result["path"], "w") as f:
+                f.write(report.getvalue())
+    finally:
+        _profile_lock.release()
+
+
+def instrument(app: FastAPI, profiling_enabled: bool = False, profile_dir: str = "./profiles") -> None:
+    """
+    Adds request instrumentation and a /metrics endpoint to `app`.
+
+    Every request gets a request id (the incoming X-Request-ID, or a new
+    one) that is echoed back, its latency observed per method, route and
+    status, and a Server-Timing header listing `total` plus every stage
+    recorded with `record_timing` while handling it. With
+    `profiling_enabled`, requests sent with `X-Profile: 1` are profiled and
+    the report path is returned in `X-Profile-Path`, or `X-Profile-Skipped`
+    if another request is being profiled.
+    """
+
+    @app.middleware("http")
+    async def _instrument_request(request: Request, call_next):
+        with request_context(request.headers.get(REQUEST_ID_HEADER)) as request_id:
+            profile = profiling_enabled and request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true")
+            start = time.perf_counter()
+            if profile:
+                with _profile(request_id, profile_dir) as report:
+                    response = await call_next(request)
+            else:
+                response = await call_next(request)
+            elapsed = time.perf_counter() - start
+
+            # Label by route template, not the raw path, to bound the series count
+            route = request.scope.get("route")
+            endpoint = request.scope.get("endpoint")
+            path = getattr(route, "path", None) or getattr(endpoint, "__name__", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, path=path, status=response.status_code)
+
+            timings = {**_timings.get(), "total": elapsed}
+            response.headers["Server-Timing"] = server_timing_header(timings)
+            response.headers[REQUEST_ID_HEADER] = request_id
+            if profile and "path" in report:
+                response.headers["X-Profile-Path"] = report["path"]
+                logger.info(f"🧪 Profiled {request.method} {request.url.path} to {report['path']}")
+            elif profile:
+                response.headers["X-Profile-Skipped"] = "profiler busy"
+                logger.info(f"🧪 Not profiling {request.method} {request.url.path}: another profile is running")
+            return response
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        """Prometheus text exposition of this service's histograms."""
+        return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
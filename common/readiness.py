@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Process start, for cold-start timing (this module is imported with the app)
+PROCESS_START = time.perf_counter()
+
+
+class Readiness:
+    """
+    Background startup of a service's heavy components.
+
+    Startup steps (model loading, warmup, ...) run in order on a background
+    thread so the server answers liveness checks immediately. The service is
+    ready once every step succeeded; until then `require()` rejects requests
+    with a 503 and /readyz reports progress. Step durations and the total
+    cold-start time (from process start) are kept for reporting.
+    """
+
+    def __init__(self, service_name: str, retry_after_seconds: str = "5"):
+        self.service_name = service_name
+        self.retry_after_seconds = retry_after_seconds
+        self.status = "starting"
+        self.current_step: Optional[str] = None
+        self.error: Optional[str] = None
+        self.step_seconds: Dict[str, float] = {}
+        self.cold_start_seconds: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def start(self, steps: List[Tuple[str, Callable[[], None]]]) -> None:
+        """Runs `steps` (name, fn) in order on a background thread."""
+        self._thread = threading.Thread(target=self._run, args=(steps,), name="startup", daemon=True)
+        self._thread.start()
+
+    def _run(self, steps: List[Tuple[str, Callable[[], None]]]) -> None:
+        for name, step in steps:
+            self.current_step = name
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.status = "failed"
+                self.error = f"{name}: {e}"
+                logger.error(f"❌ {self.service_name} startup step '{name}' failed: {e}")
+                return
+            self.step_seconds[name] = time.perf_counter() - start
+            logger.info(f"⏱️ {self.service_name} startup step '{name}' took {self.step_seconds[name]:.2f}s")
+
+        self.current_step = None
+        self.cold_start_seconds = time.perf_counter() - PROCESS_START
+        self.status = "ready"
+        logger.info(f"✅ {self.service_name} ready after a {self.cold_start_seconds:.2f}s cold start")
+
+    def require(self) -> None:
+        """Raises a 503 (with Retry-After) unless startup has finished."""
+        if not self.ready:
+            raise HTTPException(
+                status_code=503,
+                detail=f"{self.service_name} is {self.status}, retry later.",
+                headers={"Retry-After": self.retry_after_seconds},
+            )
+
+    def report(self) -> Dict:
+        """Startup status, per-step timings and cold-start time."""
+        return {
+            "service": self.service_name,
+            "status": self.status,
+            "current_step": self.current_step,
+            "error": self.error,
+            "step_seconds": dict(self.step_seconds),
+            "cold_start_seconds": self.cold_start_seconds,
+            "uptime_seconds": time.perf_counter() - PROCESS_START,
+        }
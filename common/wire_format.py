@@ -0,0 +1,223 @@
+import gzip
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON; the stdlib encoder is used without it
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: binary format; only JSON is offered without it
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd compression; gzip is offered without it
+    zstandard = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# "json" rows as before, or "msgpack" with row lists sent as columns
+WIRE_FORMATS = ("json", "msgpack")
+COMPRESSIONS = ("gzip", "zstd")
+
+# Bodies smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 16 * 1024
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+
+def dumps_json(content: Any) -> bytes:
+    """JSON bytes as FastAPI would produce them (UTF-8, compact), with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(body: bytes) -> Any:
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def _media_ranges(header: str) -> Dict[str, float]:
+    """Accept / Accept-Encoding header entries with their q-values."""
+    ranges = {}
+    for entry in header.split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            ranges[name.lower()] = quality
+    return ranges
+
+
+def accepts_msgpack(request: Request) -> bool:
+    """Whether the client explicitly accepts msgpack (and it is installed); JSON stays the default."""
+    return msgpack is not None and _media_ranges(request.headers.get("accept", "")).get(MSGPACK_MEDIA_TYPE, 0) > 0
+
+
+def response_encoding(request: Request) -> Optional[str]:
+    """Preferred supported compression the client accepts: zstd, then gzip."""
+    accepted = _media_ranges(request.headers.get("accept-encoding", ""))
+    if zstandard is not None and accepted.get("zstd", 0) > 0:
+        return "zstd"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def decompress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "zstd" and zstandard is not None:
+        # Streaming decompression: frames need not record their content size
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding '{encoding}'")
+
+
+def pack_columns(columns: Dict[str, List], rows: int) -> Dict:
+    """
+    Columnar table from equal-length value lists. A column holding the same
+    scalar in every row (e.g. the filename) is sent once, under "constants".
+    """
+    packed = {"rows": rows, "columns": {}, "constants": {}}
+    for key, values in columns.items():
+        # Nested tables (dict) are kept as they are
+        first = values[0] if isinstance(values, list) and values else None
+        if rows > 1 and first is not None and not isinstance(first, (dict, list)) and all(value == first for value in values):
+            packed["constants"][key] = first
+        else:
+            packed["columns"][key] = values
+    return packed
+
+
+def to_columns(rows: List[Dict]) -> Dict:
+    """
+    Columnar form of a list of dicts (see pack_columns); dict-valued fields
+    become nested tables. Keys missing from some rows come back as None.
+    """
+    keys = dict.fromkeys(key for row in rows for key in row)
+    columns = {}
+    for key in keys:
+        values = [row.get(key) for row in rows]
+        columns[key] = to_columns(values) if values and all(isinstance(value, dict) for value in values) else values
+    return pack_columns(columns, len(rows))
+
+
+def column(table: Dict, key: str) -> List:
+    """One column of a columnar table as a full-length list."""
+    if key in table["constants"]:
+        return [table["constants"][key]] * table["rows"]
+    values = table["columns"][key]
+    if isinstance(values, dict):
+        return from_columns(values)
+    if len(values) != table["rows"]:
+        raise ValueError(f"Column '{key}' has {len(values)} values for {table['rows']} rows")
+    return values
+
+
+def from_columns(table: Dict) -> List[Dict]:
+    """Rows of a columnar table, as produced by to_columns."""
+    keys = list(table["columns"]) + list(table["constants"])
+    if not keys:
+        return [{} for _ in range(table["rows"])]
+    return [dict(zip(keys, values)) for values in zip(*(column(table, key) for key in keys))]
+
+
+def negotiated_response(
+    request: Request,
+    content: Any,
+    columnar: Optional[Callable[[], Any]] = None,
+    compress_min_bytes: int = COMPRESS_MIN_BYTES,
+) -> Response:
+    """
+    `content` as JSON, or as msgpack if the client accepts it. `columnar`,
+    when given, builds the msgpack body instead: the same data with row
+    lists packed as columns. Bodies of at least `compress_min_bytes` are
+    compressed with the best encoding the client accepts.
+    """
+    if accepts_msgpack(request):
+        body, media_type = msgpack.packb(content if columnar is None else columnar()), MSGPACK_MEDIA_TYPE
+    else:
+        body, media_type = dumps_json(content), JSON_MEDIA_TYPE
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    encoding = response_encoding(request) if len(body) >= compress_min_bytes else None
+    if encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=media_type, headers=headers)
+
+
+async def read_payload(request: Request) -> Any:
+    """Request body decompressed (Content-Encoding) and decoded as JSON or msgpack (Content-Type)."""
+    body = await request.body()
+    encoding = request.headers.get("content-encoding", "identity").lower()
+    media_type = request.headers.get("content-type", JSON_MEDIA_TYPE).split(";")[0].strip().lower()
+    try:
+        if encoding != "identity":
+            body = decompress(body, encoding)
+        if media_type == MSGPACK_MEDIA_TYPE:
+            if msgpack is None:
+                raise HTTPException(status_code=415, detail="msgpack is not supported by this service")
+            return msgpack.unpackb(body, strict_map_key=False)
+        return loads_json(body)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=400, detail="Malformed request body")
+
+
+def encode_request(
+    content: Any, wire_format: str = "json", compression: Optional[str] = None, compress_min_bytes: int = COMPRESS_MIN_BYTES
+) -> Tuple[bytes, Dict[str, str]]:
+    """Body and headers for sending `content` downstream in `wire_format`, compressed if large enough."""
+    if wire_format == "msgpack" and msgpack is not None:
+        body, headers = msgpack.packb(content), {"Content-Type": MSGPACK_MEDIA_TYPE}
+    else:
+        body, headers = dumps_json(content), {"Content-Type": JSON_MEDIA_TYPE}
+    if compression and len(body) >= compress_min_bytes and (compression != "zstd" or zstandard is not None):
+        body = compress(body, compression)
+        headers["Content-Encoding"] = compression
+    return body, headers
+
+
+def accept_headers(wire_format: str = "json") -> Dict[str, str]:
+    """Accept header asking for msgpack (falling back to JSON) when `wire_format` is msgpack and installed."""
+    if wire_format == "msgpack" and msgpack is not None:
+        return {"Accept": f"{MSGPACK_MEDIA_TYPE}, {JSON_MEDIA_TYPE};q=0.5"}
+    return {"Accept": JSON_MEDIA_TYPE}
+
+
+def decode_response(content_type: str, body: bytes) -> Any:
+    """A downstream response body (already decompressed by the HTTP client) by its Content-Type."""
+    if content_type.split(";")[0].strip().lower() == MSGPACK_MEDIA_TYPE:
+        return msgpack.unpackb(body, strict_map_key=False)
+    return loads_json(body)
+
+
+def stream_record(content: Any, binary: bool) -> bytes:
+    """One record of a streamed response: a msgpack object if `binary`, else a JSON line."""
+    return msgpack.packb(content) if binary else dumps_json(content) + b"\n"
+
+
+def stream_unpacker():
+    """Incremental decoder for a stream of concatenated msgpack objects."""
+    return msgpack.Unpacker(raw=False, strict_map_key=False)
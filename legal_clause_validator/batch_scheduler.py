@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending(NamedTuple):
+    item: Any
+    length: int
+    submitted: float
+    future: Future
+
+
+class BatchScheduler:
+    """
+    Dynamic micro-batching across callers.
+
+    Callers on any thread `submit` single items and get a Future back. A
+    worker thread waits until `max_batch_size` items are queued or the oldest
+    has waited `max_wait_ms`, then takes everything queued, sorts it by
+    length so similar lengths share a batch (less padding), and runs
+    `run_batch` on chunks of at most `max_batch_size`. `run_batch` maps a
+    list of items to a list of results in the same order.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        name: str = "batch-scheduler",
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending: List[_Pending] = []
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._tokens = 0
+        self._padded_tokens = 0
+
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any, length: int = 1) -> Future:
+        """Queues one item of the given length (e.g. token count) for the next batch."""
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Batch scheduler is closed")
+            self._pending.append(_Pending(item, length, time.perf_counter(), future))
+            if len(self._pending) >= self.max_batch_size or len(self._pending) == 1:
+                self._condition.notify()
+        return future
+
+    def _take_pending(self) -> List[_Pending]:
+        """Blocks until a batch is due, then takes every queued item."""
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            deadline = self._pending[0].submitted + self.max_wait if self._pending else 0.0
+            while not self._closed and len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            pending, self._pending = self._pending, []
+            return pending
+
+    def _run(self) -> None:
+        while True:
+            pending = self._take_pending()
+            if not pending:
+                return  # Closed with nothing left to run
+
+            pending.sort(key=lambda entry: entry.length)
+            for start in range(0, len(pending), self.max_batch_size):
+                self._run_chunk(pending[start : start + self.max_batch_size])
+
+    def _run_chunk(self, chunk: List[_Pending]) -> None:
+        started = time.perf_counter()
+        waits = [started - entry.submitted for entry in chunk]
+        try:
+            results = self.run_batch([entry.item for entry in chunk])
+        except Exception as e:
+            logger.error(f"❌ Batch of {len(chunk)} failed: {e}")
+            for entry in chunk:
+                entry.future.set_exception(e)
+        else:
+            for entry, result in zip(chunk, results):
+                entry.future.set_result(result)
+
+        with self._condition:
+            self._batches += 1
+            self._items += len(chunk)
+            self._largest_batch = max(self._largest_batch, len(chunk))
+            self._wait_seconds += sum(waits)
+            self._max_wait_seconds = max(self._max_wait_seconds, max(waits))
+            self._tokens += sum(entry.length for entry in chunk)
+            self._padded_tokens += len(chunk) * max(entry.length for entry in chunk)
+
+    def stats(self) -> Dict:
+        """Queue depth, batch sizes, queueing delay and padding overhead."""
+        with self._condition:
+            return {
+                "queue_depth": len(self._pending),
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "max_batch_size": self.max_batch_size,
+                "mean_wait_ms": 1000 * self._wait_seconds / self._items if self._items else 0.0,
+                "max_wait_ms": 1000 * self._max_wait_seconds,
+                "max_wait_limit_ms": 1000 * self.max_wait,
+                "padding_ratio": 1 - self._tokens / self._padded_tokens if self._padded_tokens else 0.0,
+            }
+
+    def close(self) -> None:
+        """Runs what is already queued, then stops the worker."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
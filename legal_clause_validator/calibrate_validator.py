@@ -0,0 +1,72 @@
+"""
+Fits the score-mode calibration (Platt scaling of the yes/no logit margin)
+on labelled paragraphs.
+
+Usage:
+    python calibrate_validator.py labelled.jsonl --model google/flan-t5-large
+
+Each line of the input is {"clause_type": ..., "paragraph": ..., "label": true|false}.
+Prints VALIDATOR_CALIBRATION_TEMPERATURE / VALIDATOR_CALIBRATION_BIAS values
+for the service, plus the accuracy at the acceptance threshold.
+"""
+import argparse
+import json
+from collections import defaultdict
+
+import torch
+
+from legal_clause_validator import LegalClauseValidator
+
+
+def fit_platt_scaling(margins: torch.Tensor, labels: torch.Tensor, steps: int = 200):
+    """Fits sigmoid(margin / temperature + bias) to the labels by logistic regression."""
+    scale = torch.ones(1, requires_grad=True)
+    bias = torch.zeros(1, requires_grad=True)
+    optimizer = torch.optim.LBFGS([scale, bias], max_iter=steps)
+
+    def closure():
+        optimizer.zero_grad()
+        loss = torch.nn.functional.binary_cross_entropy_with_logits(margins * scale + bias, labels)
+        loss.backward()
+        return loss
+
+    optimizer.step(closure)
+    return 1.0 / scale.item(), bias.item()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("labelled", help="JSONL file of labelled paragraphs")
+    parser.add_argument("--model", default="google/flan-t5-large")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    args = parser.parse_args()
+
+    by_clause = defaultdict(list)
+    with open(args.labelled) as f:
+        for line in f:
+            if line.strip():
+                example = json.loads(line)
+                by_clause[example["clause_type"]].append((example["paragraph"], bool(example["label"])))
+
+    validator = LegalClauseValidator(args.model, validation_mode="score")
+    margins, labels = [], []
+    for clause_type, examples in by_clause.items():
+        margins.append(validator.score_margins(clause_type, [paragraph for paragraph, _ in examples]))
+        labels.extend(label for _, label in examples)
+    margins = torch.cat(margins)
+    labels = torch.tensor(labels, dtype=torch.float32)
+
+    temperature, bias = fit_platt_scaling(margins, labels)
+    probabilities = torch.sigmoid(margins / temperature + bias)
+    accuracy = ((probabilities >= args.threshold).float() == labels).float().mean().item()
+
+    print(json.dumps({
+        "examples": len(labels),
+        "VALIDATOR_CALIBRATION_TEMPERATURE": temperature,
+        "VALIDATOR_CALIBRATION_BIAS": bias,
+        "accuracy_at_threshold": accuracy,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
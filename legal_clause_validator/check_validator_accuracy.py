@@ -0,0 +1,98 @@
+"""
+Checks an optimized inference configuration against the fp32 eager model
+with the service's default 1024-token truncation.
+
+Usage:
+    python check_validator_accuracy.py --quantize --threads 4
+    python check_validator_accuracy.py --max-input-tokens 512 --min-agreement 0.95
+
+Both models score the fixture set (fixtures/validation_fixtures.jsonl by
+default) in score mode. Reports the yes/no verdict agreement rate, the mean
+absolute difference of the logit margins, accuracy against the fixture
+labels and the time per paragraph. Exits non-zero if agreement falls below
+--min-agreement.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+import torch
+
+from legal_clause_validator import LegalClauseValidator
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "validation_fixtures.jsonl")
+
+
+def score_fixtures(validator: LegalClauseValidator, by_clause: dict) -> tuple:
+    """Margins for every fixture (grouped by clause type) and the time taken, after one warm-up clause."""
+    first_clause = next(iter(by_clause))
+    validator.score_margins(first_clause, [paragraph for paragraph, _ in by_clause[first_clause]])
+
+    start = time.perf_counter()
+    margins = torch.cat([
+        validator.score_margins(clause_type, [paragraph for paragraph, _ in examples])
+        for clause_type, examples in by_clause.items()
+    ])
+    return margins, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--model", default="google/flan-t5-large")
+    parser.add_argument("--max-input-tokens", type=int, default=1024, help="Truncation of the optimized model")
+    parser.add_argument("--quantize", action="store_true", help="Dynamic int8 linear layers")
+    parser.add_argument("--compile", action="store_true", help="torch.compile the forward pass")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    by_clause = defaultdict(list)
+    with open(args.fixtures) as f:
+        for line in f:
+            if line.strip():
+                example = json.loads(line)
+                by_clause[example["clause_type"]].append((example["paragraph"], bool(example["label"])))
+    labels = torch.tensor([label for examples in by_clause.values() for _, label in examples])
+
+    baseline = LegalClauseValidator(args.model, validation_mode="score", max_input_length=1024, num_threads=args.threads)
+    baseline_margins, baseline_seconds = score_fixtures(baseline, by_clause)
+    baseline.close()
+    del baseline
+
+    optimized = LegalClauseValidator(
+        args.model,
+        validation_mode="score",
+        max_input_length=args.max_input_tokens,
+        quantize=args.quantize,
+        compile_model=args.compile,
+        num_threads=args.threads,
+    )
+    optimized_margins, optimized_seconds = score_fixtures(optimized, by_clause)
+    optimized.close()
+
+    # Verdicts at the uncalibrated threshold (margin 0, i.e. probability 0.5)
+    baseline_verdicts = baseline_margins > 0
+    optimized_verdicts = optimized_margins > 0
+    agreement = (baseline_verdicts == optimized_verdicts).float().mean().item()
+    report = {
+        "fixtures": len(labels),
+        "agreement": agreement,
+        "mean_abs_margin_diff": (baseline_margins - optimized_margins).abs().mean().item(),
+        "fp32_accuracy": (baseline_verdicts == labels).float().mean().item(),
+        "optimized_accuracy": (optimized_verdicts == labels).float().mean().item(),
+        "fp32_ms_per_paragraph": 1000 * baseline_seconds / len(labels),
+        "optimized_ms_per_paragraph": 1000 * optimized_seconds / len(labels),
+        "speedup": baseline_seconds / optimized_seconds,
+    }
+    print(json.dumps(report, indent=2))
+
+    if agreement < args.min_agreement:
+        sys.exit(f"Agreement {agreement:.3f} is below {args.min_agreement}")
+
+
+if __name__ == "__main__":
+    main()
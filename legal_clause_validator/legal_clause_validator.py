@@ -1,27 +1,106 @@
 import logging
-from typing import Any, Dict, List, Tuple
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
 from transformers import T5Tokenizer, T5ForConditionalGeneration
 import torch
 from langgraph.graph import StateGraph, START, END
+from batch_scheduler import BatchScheduler
+from common.instrumentation import METRICS, SIZE_BUCKETS, record_timing
+from verdict_cache import VerdictCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# "generate": decode a short answer and check that it says yes.
+# "score": one encoder pass and one decoder step, comparing the yes/no logits.
+VALIDATION_MODES = ("generate", "score")
+
+# First-token spellings whose logits are pooled into the yes and no answers
+YES_ANSWERS = ("yes", "Yes")
+NO_ANSWERS = ("no", "No")
+
+# Bump whenever _build_prompts (or anything else shaping the model input) changes,
+# so cached verdicts of the old prompt are not reused
+PROMPT_VERSION = "1"
+
+VALIDATOR_BATCH_SIZE = METRICS.histogram("validator_batch_size", "Prompts per model batch.", SIZE_BUCKETS, ("task",))
+VALIDATOR_BATCH_TOKENS = METRICS.histogram(
+    "validator_batch_tokens", "Input tokens per model batch, padding included.", SIZE_BUCKETS, ("task",)
+)
+VALIDATOR_BATCH_SECONDS = METRICS.histogram("validator_batch_seconds", "Model time per batch.", labelnames=("task",))
+
+# Short and long prompts run once at startup, so the first request doesn't pay
+# for lazy weight paging, allocator growth or torch.compile tracing
+WARMUP_CLAUSE_TYPE = "Governing Law Clause"
+WARMUP_PARAGRAPHS = (
+    "This Agreement shall be governed by the laws of the State of New York.",
+    "Either party may terminate this Agreement upon ninety (90) days written notice to the other party. "
+    "Termination shall not affect any rights or obligations accrued before the date of termination, and the "
+    "provisions on confidentiality, limitation of liability and governing law survive any termination.",
+)
+
 class LegalClauseValidator:
     """
     A class for validating legal clauses using an LLM and LangGraph.
     """
 
-    def __init__(self, llm_model: str) -> None:
+    def __init__(
+        self,
+        llm_model: str,
+        validation_mode: str = "score",
+        acceptance_threshold: float = 0.5,
+        calibration_temperature: float = 1.0,
+        calibration_bias: float = 0.0,
+        max_batch_size: int = 32,
+        max_batch_wait_ms: float = 10.0,
+        verdict_cache: Optional[VerdictCache] = None,
+        max_input_length: int = 1024,
+        quantize: bool = False,
+        compile_model: bool = False,
+        num_threads: int = 0,
+        num_interop_threads: int = 0,
+    ) -> None:
         """
         Initializes the LegalClauseValidator with:
         - The pre-trained LLM model.
+        - The validation mode (see VALIDATION_MODES).
+        - In score mode, the probability a paragraph needs to be accepted and
+          the Platt scaling parameters mapping the yes/no logit margin to a
+          probability: sigmoid(margin / temperature + bias).
+        - A batch scheduler that runs the (clause, paragraph) prompts of all
+          clause types and concurrent requests in shared, length-sorted
+          batches of up to `max_batch_size`, waiting at most
+          `max_batch_wait_ms` to fill one.
+        - An optional verdict cache; only prompts it misses reach the model.
+        - CPU inference settings, each usable on its own: prompts truncated
+          to `max_input_length` tokens (512, what FLAN-T5 was trained on,
+          is faster but may change verdicts on long paragraphs),
+          dynamic int8 quantization of the linear layers, torch.compile, and
+          intra-/inter-op thread counts (0 keeps the torch default).
         """
+        if validation_mode not in VALIDATION_MODES:
+            raise ValueError(f"Unknown validation mode '{validation_mode}', expected one of {VALIDATION_MODES}")
+        self.validation_mode = validation_mode
+        self.acceptance_threshold = acceptance_threshold
+        self.calibration_temperature = calibration_temperature
+        self.calibration_bias = calibration_bias
+        self.model_name = llm_model
+        self.verdict_cache = verdict_cache
+        self.max_input_length = max_input_length
+        self.quantize = quantize
+        self.compile_model = compile_model
+        self._configure_threads(num_threads, num_interop_threads)
         self.tokenizer, self.llm_model = self._load_llm_model(llm_model)
+        self.yes_token_ids = self._first_token_ids(YES_ANSWERS)
+        self.no_token_ids = self._first_token_ids(NO_ANSWERS)
+        self.scheduler = BatchScheduler(
+            self._run_batch, max_batch_size=max_batch_size, max_wait_ms=max_batch_wait_ms, name="validator-batches"
+        )
         self.graph = self._initialize_graph()
 
-    def validate_clauses(self, clause_queries: Dict[str, List[str]]) -> Dict[str, Any]:
+    def validate_clauses(self, clause_queries: Dict[str, List[str]], include_scores: bool = False) -> Dict[str, Any]:
         """
         Validates legal clauses using LangGraph workflow.
 
@@ -29,20 +108,48 @@ class LegalClauseValidator:
             clause_queries (Dict[str, List[str]]): 
                 - Key = Clause Type (e.g., "Indemnification Clause")
                 - Value = List of retrieved paragraphs from ChromaDB
+            include_scores (bool): Return every paragraph with its probability
+                (score mode) instead of only the accepted paragraphs.
 
         Returns:
             Dict[str, Any]: Dictionary containing validated clauses.
         """
+        if not clause_queries:
+            return {}
+
+        # Clause types run concurrently so their prompts land in the same batches
+        clause_types = list(clause_queries)
+        responses = self.graph.batch(
+            [{"query": clause_type, "retrieved_paragraphs": clause_queries[clause_type]} for clause_type in clause_types],
+            config={"max_concurrency": len(clause_types)},
+            return_exceptions=True,
+        )
+
         results = {}
-        for clause_type, paragraphs in clause_queries.items():
-            try:
-                response = self.graph.invoke({"query": clause_type, "retrieved_paragraphs": paragraphs})
-                results[clause_type] = response["validated_paragraphs"]
-            except Exception as e:
-                logger.error(f"Error processing clause '{clause_type}': {e}")
+        for clause_type, response in zip(clause_types, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Error processing clause '{clause_type}': {response}")
                 results[clause_type] = {"error": "Processing failed."}
+            elif include_scores:
+                results[clause_type] = response["paragraph_scores"]
+            else:
+                results[clause_type] = response["validated_paragraphs"]
         return results
 
+    def warmup(self) -> None:
+        """
+        Runs the warmup prompts through the batch scheduler for the configured
+        mode, bypassing the verdict cache so the model itself is exercised.
+        """
+        futures = self._submit_prompts(self.validation_mode, WARMUP_CLAUSE_TYPE, list(WARMUP_PARAGRAPHS))
+        for future in futures:
+            future.result()
+        logger.info("🔥 Validator model warmed up.")
+
+    def close(self) -> None:
+        """Finishes queued prompts and stops the batch scheduler."""
+        self.scheduler.close()
+
     def _initialize_graph(self) -> StateGraph:
         """
         Defines the LangGraph workflow for validation only.
@@ -65,42 +172,181 @@ class LegalClauseValidator:
 
         if not retrieved_paragraphs:
             logger.warning(f"⚠️ No paragraphs retrieved for validation of '{clause_type}'.")
-            return {**state, "validated_paragraphs": []}
+            return {**state, "validated_paragraphs": [], "paragraph_scores": []}
 
         logger.info(f"🔍 Validating {len(retrieved_paragraphs)} paragraphs for '{clause_type}'.")
 
-        # Batch process all paragraphs for better performance
-        batch_inputs = [
+        if self.validation_mode == "score":
+            probabilities = self.score_paragraphs(clause_type, retrieved_paragraphs)
+            accepted = [probability >= self.acceptance_threshold for probability in probabilities]
+        else:
+            probabilities = [None] * len(retrieved_paragraphs)
+            accepted = self._generate_answers(clause_type, retrieved_paragraphs)
+
+        validated_paragraphs = [para for para, ok in zip(retrieved_paragraphs, accepted) if ok]
+        paragraph_scores = [
+            {"paragraph": para, "probability": probability, "valid": ok}
+            for para, probability, ok in zip(retrieved_paragraphs, probabilities, accepted)
+        ]
+        if self.validation_mode == "score":
+            paragraph_scores.sort(key=lambda item: -item["probability"])
+
+        logger.info(f"✅ {len(validated_paragraphs)} paragraphs validated for '{clause_type}'.")
+        logger.info(f"❌ {len(retrieved_paragraphs) - len(validated_paragraphs)} paragraphs rejected for '{clause_type}'.")
+
+        return {**state, "validated_paragraphs": validated_paragraphs, "paragraph_scores": paragraph_scores}
+
+    @staticmethod
+    def _build_prompts(clause_type: str, paragraphs: List[str]) -> List[str]:
+        return [
             f"Does this paragraph correspond to a '{clause_type}'?\n\nParagraph:\n{p}\n\nAnswer with 'Yes' or 'No'."
-            for p in retrieved_paragraphs
+            for p in paragraphs
+        ]
+
+    def _run_prompts(self, task: str, clause_type: str, paragraphs: List[str]) -> List[float]:
+        """
+        Model output per paragraph for `task`: cached verdicts where available,
+        the rest (each distinct paragraph once) through the batch scheduler.
+        """
+        if self.verdict_cache is None:
+            return self._wait(self._submit_prompts(task, clause_type, paragraphs))
+
+        keys = [
+            VerdictCache.key(self.model_variant, PROMPT_VERSION, task, clause_type, paragraph) for paragraph in paragraphs
         ]
+        verdicts = self.verdict_cache.get_many(keys)
 
-        inputs = self.tokenizer(batch_inputs, return_tensors="pt", padding=True, truncation=True, max_length=1024)
+        misses = {key: paragraph for key, paragraph in zip(keys, paragraphs) if key not in verdicts}
+        if misses:
+            futures = self._submit_prompts(task, clause_type, list(misses.values()))
+            computed = [(key, float(result)) for key, result in zip(misses, self._wait(futures))]
+            self.verdict_cache.put_many(computed)
+            verdicts.update(computed)
+
+        return [verdicts[key] for key in keys]
+
+    @staticmethod
+    def _wait(futures: List[Future]) -> List[Any]:
+        """Results of submitted prompts; the wait (queueing plus model time) goes to Server-Timing."""
+        start = time.perf_counter()
+        results = [future.result() for future in futures]
+        record_timing("validator_model", time.perf_counter() - start)
+        return results
+
+    def _submit_prompts(self, task: str, clause_type: str, paragraphs: List[str]) -> List[Future]:
+        """Tokenizes prompts on the caller's thread and queues them for the shared batches."""
+        encoded = self.tokenizer(
+            self._build_prompts(clause_type, paragraphs), truncation=True, max_length=self.max_input_length
+        )
+        return [self.scheduler.submit((task, input_ids), len(input_ids)) for input_ids in encoded["input_ids"]]
+
+    def _run_batch(self, batch: List[Tuple[str, List[int]]]) -> List[Any]:
+        """
+        Runs one scheduler batch of (task, input_ids): "score" items get their
+        yes/no margin, "generate" items whether the decoded answer is yes.
+        """
+        results: List[Any] = [None] * len(batch)
+        for task, run in (("score", self._forward_margins), ("generate", self._forward_answers)):
+            rows = [i for i, (item_task, _) in enumerate(batch) if item_task == task]
+            if rows:
+                inputs = self.tokenizer.pad({"input_ids": [batch[i][1] for i in rows]}, return_tensors="pt")
+                VALIDATOR_BATCH_SIZE.observe(len(rows), task=task)
+                VALIDATOR_BATCH_TOKENS.observe(inputs["input_ids"].numel(), task=task)
+                with VALIDATOR_BATCH_SECONDS.time(task=task):
+                    outputs = run(inputs)
+                for i, result in zip(rows, outputs):
+                    results[i] = result
+        return results
+
+    def _generate_answers(self, clause_type: str, paragraphs: List[str]) -> List[bool]:
+        """
+        Decodes a short answer per paragraph and accepts answers starting with
+        "yes" (so "Yes." counts).
+        """
+        return [bool(answer) for answer in self._run_prompts("generate", clause_type, paragraphs)]
+
+    def _forward_answers(self, inputs) -> List[bool]:
         with torch.no_grad():
-            outputs = self.llm_model.generate(inputs["input_ids"], max_new_tokens=3)
+            outputs = self.llm_model.generate(
+                inputs["input_ids"], attention_mask=inputs["attention_mask"], max_new_tokens=3
+            )
 
-        validated_paragraphs = []
-        rejected_paragraphs = []
+        answers = [self.tokenizer.decode(output, skip_special_tokens=True).strip().lower() for output in outputs]
+        return [answer.startswith("yes") for answer in answers]
 
-        for para, output in zip(retrieved_paragraphs, outputs):
-            answer = self.tokenizer.decode(output, skip_special_tokens=True).lower()
-            if answer == "yes":
-                validated_paragraphs.append(para)
-            else:
-                rejected_paragraphs.append(para)
+    def score_paragraphs(self, clause_type: str, paragraphs: List[str]) -> List[float]:
+        """
+        Probability that each paragraph is a `clause_type`, from a single
+        encoder pass and one decoder step.
 
-        logger.info(f"✅ {len(validated_paragraphs)} paragraphs validated for '{clause_type}'.")
-        logger.info(f"❌ {len(rejected_paragraphs)} paragraphs rejected for '{clause_type}'.")
+        Returns:
+            List[float]: Calibrated probability per paragraph.
+        """
+        margins = self.score_margins(clause_type, paragraphs)
+        return torch.sigmoid(margins / self.calibration_temperature + self.calibration_bias).tolist()
+
+    def score_margins(self, clause_type: str, paragraphs: List[str]) -> torch.Tensor:
+        """Uncalibrated yes/no logit margin per paragraph."""
+        return torch.tensor(self._run_prompts("score", clause_type, paragraphs))
+
+    def _forward_margins(self, inputs) -> List[float]:
+        decoder_input_ids = torch.full(
+            (inputs["input_ids"].shape[0], 1), self.llm_model.config.decoder_start_token_id, dtype=torch.long
+        )
+        with torch.no_grad():
+            logits = self.llm_model(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                decoder_input_ids=decoder_input_ids,
+            ).logits[:, 0, :]
+
+        return self.logit_margins(logits).tolist()
+
+    def logit_margins(self, logits: torch.Tensor) -> torch.Tensor:
+        """log P(yes) - log P(no) from first-step decoder logits, pooling each answer's spellings."""
+        yes = torch.logsumexp(logits[:, self.yes_token_ids], dim=-1)
+        no = torch.logsumexp(logits[:, self.no_token_ids], dim=-1)
+        return yes - no
 
-        return {**state, "validated_paragraphs": validated_paragraphs}
+    def _first_token_ids(self, answers: Tuple[str, ...]) -> List[int]:
+        """Distinct ids of the first token of each answer spelling."""
+        ids = [self.tokenizer(answer, add_special_tokens=False).input_ids[0] for answer in answers]
+        return list(dict.fromkeys(ids))
+
+    @property
+    def model_variant(self) -> str:
+        """Model name plus the settings that change its outputs, for cache keys."""
+        variant = f"{self.model_name}|max_input_length={self.max_input_length}"
+        return f"{variant}|int8" if self.quantize else variant
+
+    @staticmethod
+    def _configure_threads(num_threads: int, num_interop_threads: int) -> None:
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+        if num_interop_threads > 0:
+            try:
+                torch.set_num_interop_threads(num_interop_threads)
+            except RuntimeError as e:
+                # Only settable before torch starts any inter-op parallel work
+                logger.warning(f"⚠️ Could not set inter-op threads: {e}")
 
     def _load_llm_model(self, model_name: str) -> Tuple[T5Tokenizer, T5ForConditionalGeneration]:
         """
-        Loads the pre-trained LLM model and tokenizer.
+        Loads the pre-trained LLM model and tokenizer, applying the configured
+        quantization and compilation.
         """
         logger.info(f"🔄 Loading LLM model: {model_name}")
         tokenizer = T5Tokenizer.from_pretrained(model_name)
-        model = T5ForConditionalGeneration.from_pretrained(model_name)
+        # Loads weights straight into place (memory-mapped from safetensors) instead
+        # of initializing a random model first and copying them over
+        model = T5ForConditionalGeneration.from_pretrained(model_name, low_cpu_mem_usage=True)
         model.eval()
-        logger.info(f"✅ Model '{model_name}' loaded successfully.")
+        if self.quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            logger.info("⚙️ Quantized linear layers to int8.")
+        if self.compile_model:
+            # Only the forward pass is compiled; generate() drives it step by step
+            model.forward = torch.compile(model.forward, dynamic=True)
+            logger.info("⚙️ Compiled the model forward pass with torch.compile.")
+        logger.info(f"✅ Model '{model_name}' loaded successfully ({torch.get_num_threads()} threads).")
         return tokenizer, model
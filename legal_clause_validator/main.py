@@ -1,36 +1,112 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Dict, List
 import logging
 import os
+from contextlib import asynccontextmanager
 
 from legal_clause_validator import LegalClauseValidator
+from common.instrumentation import instrument
+from common.readiness import Readiness
+from verdict_cache import VerdictCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the model after startup and stop the batch scheduler on shutdown (hooks defined below)."""
+    start_loading()
+    yield
+    shutdown_validator()
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Request ids, Server-Timing headers and /metrics; PROFILING_ENABLED lets
+# requests sent with "X-Profile: 1" be profiled into PROFILE_DIR
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+instrument(app, profiling_enabled=PROFILING_ENABLED, profile_dir=PROFILE_DIR)
 
 # Load Model Name from Env (Defaults to FLAN-T5)
 MODEL_NAME = os.getenv("LLM_MODEL", "google/flan-t5-large")
 
-# Initialize Legal Clause Validator
-clause_validator = LegalClauseValidator(llm_model=MODEL_NAME)
+# "score" (one forward pass, yes/no logits) or "generate" (decoded answer)
+VALIDATION_MODE = os.getenv("VALIDATION_MODE", "score")
+# Score mode: acceptance threshold and Platt scaling fitted with calibrate_validator.py
+ACCEPTANCE_THRESHOLD = float(os.getenv("VALIDATOR_ACCEPTANCE_THRESHOLD", "0.5"))
+CALIBRATION_TEMPERATURE = float(os.getenv("VALIDATOR_CALIBRATION_TEMPERATURE", "1.0"))
+CALIBRATION_BIAS = float(os.getenv("VALIDATOR_CALIBRATION_BIAS", "0.0"))
+# Cross-request micro-batching: prompts per model batch and how long to wait to fill one
+MAX_BATCH_SIZE = int(os.getenv("VALIDATOR_MAX_BATCH_SIZE", "32"))
+MAX_BATCH_WAIT_MS = float(os.getenv("VALIDATOR_MAX_BATCH_WAIT_MS", "10"))
+
+# CPU inference: prompt truncation (tokens; 512 is an opt-in speed-up, check it with
+# check_validator_accuracy.py), int8 linear layers, torch.compile, thread counts (0 = torch default)
+MAX_INPUT_TOKENS = int(os.getenv("VALIDATOR_MAX_INPUT_TOKENS", "1024"))
+QUANTIZE = os.getenv("VALIDATOR_QUANTIZE", "false").lower() == "true"
+COMPILE_MODEL = os.getenv("VALIDATOR_COMPILE", "false").lower() == "true"
+NUM_THREADS = int(os.getenv("VALIDATOR_THREADS", "0"))
+NUM_INTEROP_THREADS = int(os.getenv("VALIDATOR_INTEROP_THREADS", "0"))
+
+# Verdict cache: in-memory LRU in front of a local SQLite store
+VERDICT_CACHE_ENABLED = os.getenv("VERDICT_CACHE_ENABLED", "true").lower() == "true"
+VERDICT_CACHE_PATH = os.getenv("VERDICT_CACHE_PATH", "./verdict_cache.sqlite3")
+VERDICT_CACHE_MEMORY_ENTRIES = int(os.getenv("VERDICT_CACHE_MEMORY_ENTRIES", "10000"))
+verdict_cache = (
+    VerdictCache(VERDICT_CACHE_PATH, max_memory_entries=VERDICT_CACHE_MEMORY_ENTRIES) if VERDICT_CACHE_ENABLED else None
+)
+
+# The model is loaded and warmed up in the background after startup so the
+# process answers /livez at once; /readyz turns 200 once it can serve
+clause_validator: LegalClauseValidator = None
+readiness = Readiness("Legal Clause Validator", retry_after_seconds=os.getenv("VALIDATOR_RETRY_AFTER_SECONDS", "10"))
+
+def load_validator():
+    """Initialize Legal Clause Validator"""
+    global clause_validator
+    clause_validator = LegalClauseValidator(
+        llm_model=MODEL_NAME,
+        validation_mode=VALIDATION_MODE,
+        acceptance_threshold=ACCEPTANCE_THRESHOLD,
+        calibration_temperature=CALIBRATION_TEMPERATURE,
+        calibration_bias=CALIBRATION_BIAS,
+        max_batch_size=MAX_BATCH_SIZE,
+        max_batch_wait_ms=MAX_BATCH_WAIT_MS,
+        verdict_cache=verdict_cache,
+        max_input_length=MAX_INPUT_TOKENS,
+        quantize=QUANTIZE,
+        compile_model=COMPILE_MODEL,
+        num_threads=NUM_THREADS,
+        num_interop_threads=NUM_INTEROP_THREADS,
+    )
+
+def start_loading():
+    """Load and warm up the validator model in the background."""
+    readiness.start([("load", load_validator), ("warmup", lambda: clause_validator.warmup())])
+
+def shutdown_validator():
+    """Finish queued prompts and stop the batch scheduler."""
+    if clause_validator is not None:
+        clause_validator.close()
 
 # Request Model
 class ClauseValidationRequest(BaseModel):
     clauses: Dict[str, List[str]]  # Mapping: Clause Type → List of Retrieved Paragraphs
+    include_scores: bool = False  # Return every paragraph with its probability, best first
 
 @app.post("/validate_clauses")
 def validate_clauses(request: ClauseValidationRequest):
     """
     API endpoint to validate clauses in legal documents.
     """
+    readiness.require()
     try:
         logger.info(f"🔍 Validating clauses for: {list(request.clauses.keys())}")
-        validation_results = clause_validator.validate_clauses(request.clauses)
+        validation_results = clause_validator.validate_clauses(request.clauses, request.include_scores)
 
         return {"validated_clauses": validation_results}
 
@@ -39,6 +115,36 @@ def validate_clauses(request: ClauseValidationRequest):
         raise HTTPException(status_code=500, detail="Internal validation error")
 
 
+@app.get("/batch-stats")
+def batch_stats():
+    """Micro-batching queue depth, batch sizes, queueing delay and padding overhead."""
+    readiness.require()
+    return clause_validator.scheduler.stats()
+
+
+@app.get("/verdict-cache-stats")
+def verdict_cache_stats():
+    """Verdict cache hit rate per tier."""
+    if verdict_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **verdict_cache.stats()}
+
+
+@app.get("/livez")
+def liveness_check():
+    """Liveness: the process is up, even while the model is still loading."""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+def readiness_check():
+    """Readiness: 200 once the model is loaded and warmed up, 503 (with startup progress) before."""
+    report = readiness.report()
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
+
 @app.get("/")
 def health_check():
     """Simple health check endpoint"""
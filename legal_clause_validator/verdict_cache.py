@@ -0,0 +1,115 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+SQLITE_MAX_PARAMS = 500
+
+
+def normalize_paragraph(text: str) -> str:
+    """Collapses whitespace so re-extracted copies of the same boilerplate share a verdict."""
+    return " ".join(text.split())
+
+
+class VerdictCache:
+    """
+    Two-tier cache of model verdicts for (clause type, paragraph) prompts.
+
+    Keys hash the model name, prompt template version, task, clause type and
+    normalized paragraph. The raw model output is stored (the yes/no logit
+    margin, or 1.0/0.0 for a generated yes/no), so calibration and threshold
+    changes don't invalidate entries. A bounded in-memory LRU sits in front
+    of a SQLite table that persists across restarts.
+    """
+
+    def __init__(self, path: str = "./verdict_cache.sqlite3", max_memory_entries: int = 10000):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, value REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key(model_name: str, prompt_version: str, task: str, clause_type: str, paragraph: str) -> str:
+        """Stable key of one prompt's verdict."""
+        payload = json.dumps(
+            {
+                "model": model_name,
+                "prompt_version": prompt_version,
+                "task": task,
+                "clause_type": clause_type,
+                "paragraph": hashlib.sha256(normalize_paragraph(paragraph).encode()).hexdigest(),
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, float]:
+        """Cached verdicts for `keys`, checking memory first and then SQLite."""
+        found: Dict[str, float] = {}
+        missing: List[str] = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+
+            disk_hits = 0
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(missing), SQLITE_MAX_PARAMS):
+                chunk = missing[start : start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM verdicts WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, value in rows:
+                    found[key] = value
+                    self._remember(key, value)
+                disk_hits += len(rows)
+            self.disk_hits += disk_hits
+            self.misses += len(missing) - disk_hits
+        return found
+
+    def put_many(self, verdicts: Iterable[Tuple[str, float]]) -> None:
+        """Stores verdicts in both tiers."""
+        verdicts = list(verdicts)
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO verdicts (key, value) VALUES (?, ?)", verdicts)
+            self._conn.commit()
+            for key, value in verdicts:
+                self._remember(key, value)
+
+    def _remember(self, key: str, value: float) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters per tier and store sizes."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            stored = self._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_memory_entries": self.max_memory_entries,
+                "stored_verdicts": stored,
+            }
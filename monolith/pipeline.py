@@ -0,0 +1,123 @@
+"""
+In-process pipeline: OCR, vector store and clause validator wired together
+through direct Python calls, with no HTTP hops or JSON encoding between the
+stages. Meant for bulk back-office runs (see process_documents.py); the
+services themselves are unchanged.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+# The services use flat imports within their own directories, plus the shared
+# `common` package at the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICE_DIRS = ("ocr_service", "vector_database_service", "legal_clause_validator")
+for path in [REPO_ROOT] + [os.path.join(REPO_ROOT, service_dir) for service_dir in SERVICE_DIRS]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from bulk_ingest import Paragraph
+from chroma_service import ChromaService
+from ocr import OCRProcessor
+
+if TYPE_CHECKING:
+    # Imported for real by the caller only when validating (torch, langgraph)
+    from legal_clause_validator import LegalClauseValidator
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("ocr", "store", "retrieve", "validate")
+
+
+class DocumentPipeline:
+    """
+    Runs the gateway's flow for one document in-process: OCR, storage,
+    retrieval of the paragraphs matching each clause and, if a validator is
+    given, validation of those paragraphs.
+
+    Each stage holds one of its `stage_limits` slots while it runs, so
+    several documents can be processed concurrently (e.g. a few in OCR while
+    another is embedded and one more is validated) without oversubscribing
+    any stage. Per-stage call counts and time are kept for reporting.
+    """
+
+    def __init__(
+        self,
+        ocr_processor: OCRProcessor,
+        chroma_service: ChromaService,
+        clause_validator: Optional["LegalClauseValidator"] = None,
+        top_k: int = 10,
+        stage_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.ocr_processor = ocr_processor
+        self.chroma_service = chroma_service
+        self.clause_validator = clause_validator  # Imported by the caller only when validating (torch, langgraph)
+        self.top_k = top_k
+        limits = {"ocr": 1, "store": 1, "retrieve": 1, "validate": 1, **(stage_limits or {})}
+        self._slots = {stage: threading.BoundedSemaphore(max(1, limits[stage])) for stage in STAGES}
+        self._stats = {stage: {"calls": 0, "seconds": 0.0} for stage in STAGES}
+        self._stats_lock = threading.Lock()
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        with self._slots[name]:
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                with self._stats_lock:
+                    self._stats[name]["calls"] += 1
+                    self._stats[name]["seconds"] += time.perf_counter() - start
+
+    def process(self, filename: str, pdf_bytes: bytes, clauses: List[str]) -> Dict:
+        """
+        Processes one PDF.
+
+        Returns:
+            Dict: Page and paragraph counts, ingestion summary, retrieved
+            paragraphs per clause and, with a validator, validated clauses.
+        """
+        with self._stage("ocr"):
+            pages = self.ocr_processor.process_pdf_pages(pdf_bytes)
+        paragraphs = [
+            Paragraph(text, filename, page_number, para_number)
+            for page_number, para_number, text in self.ocr_processor.flatten_pages(pages)
+        ]
+        result = {"filename": filename, "pages": len(pages), "paragraphs": len(paragraphs)}
+        if not paragraphs:
+            result["clauses"] = {}
+            return result
+
+        # Without an ingest id the document is stored as a whole: paragraphs
+        # from an earlier version of the file are deleted
+        with self._stage("store"):
+            result["ingest"] = self.chroma_service.add_documents(paragraphs)
+
+        with self._stage("retrieve"):
+            matches = self.chroma_service.retrieve_documents_batch(
+                clauses, top_k=self.top_k, metadata_filter={"filename": filename}
+            )
+        clause_paragraph_map = {
+            clause: [match["text"] for match in clause_matches] for clause, clause_matches in matches.items() if clause_matches
+        }
+        result["clauses"] = clause_paragraph_map
+
+        if self.clause_validator is not None and clause_paragraph_map:
+            with self._stage("validate"):
+                result["validated_clauses"] = self.clause_validator.validate_clauses(clause_paragraph_map)
+        return result
+
+    def stats(self) -> Dict:
+        """Calls and total seconds per stage."""
+        with self._stats_lock:
+            return {stage: dict(stats) for stage, stats in self._stats.items()}
+
+    def close(self) -> None:
+        """Stops the OCR worker pool and the validator's batch scheduler."""
+        self.ocr_processor.close()
+        if self.clause_validator is not None:
+            self.clause_validator.close()
@@ -0,0 +1,171 @@
+"""
+Bulk clause extraction over a directory of PDFs, in one process.
+
+Usage:
+    python process_documents.py ./contracts --clauses-file clauses.txt --output results.jsonl
+    python process_documents.py ./contracts --clause "Governing Law Clause" --clause "Termination Clause" --validate
+
+Every PDF under the directory goes through OCR, storage, retrieval and
+(with --validate) validation via DocumentPipeline, several documents at a
+time with per-stage concurrency limits. One JSON line per document is
+appended to --output as soon as it finishes, so an interrupted run resumes
+where it stopped: documents already in the output with status "succeeded"
+are skipped and failed ones are retried. Throughput is logged as documents
+and pages per minute, and a JSON summary is printed at the end.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set
+
+# pipeline puts the service directories on sys.path, so it is imported first
+from pipeline import DocumentPipeline
+from chroma_service import ChromaService
+from ocr import OCRProcessor
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Progress is logged every this many finished documents
+LOG_EVERY = 10
+
+
+def completed_documents(output_path: str) -> Set[str]:
+    """Documents recorded as succeeded in an existing output file (a torn last line is ignored)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "succeeded":
+                done.add(record["filename"])
+    return done
+
+
+def load_clauses(args) -> List[str]:
+    clauses = list(args.clause or [])
+    if args.clauses_file:
+        with open(args.clauses_file) as f:
+            clauses.extend(line.strip() for line in f if line.strip())
+    return list(dict.fromkeys(clauses))
+
+
+def throughput(documents: int, pages: int, seconds: float) -> Dict:
+    minutes = seconds / 60 if seconds else 0.0
+    return {
+        "documents_per_minute": documents / minutes if minutes else 0.0,
+        "pages_per_minute": pages / minutes if minutes else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Extract clauses from a directory of PDFs in one process.")
+    parser.add_argument("directory", help="Directory searched recursively for PDFs")
+    parser.add_argument("--output", default="results.jsonl")
+    parser.add_argument("--clause", action="append", help="Clause to look for (repeatable)")
+    parser.add_argument("--clauses-file", help="File with one clause per line")
+    parser.add_argument("--collection", default="legal_docs")
+    parser.add_argument("--top-k", type=int, default=10, help="Paragraphs retrieved per clause")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--ocr-workers", type=int, default=os.cpu_count() or 1, help="OCR processes shared by all documents")
+    parser.add_argument("--ocr-concurrency", type=int, default=2, help="Documents in OCR at once")
+    parser.add_argument("--store-concurrency", type=int, default=1, help="Documents being embedded and stored at once")
+    parser.add_argument("--retrieve-concurrency", type=int, default=2, help="Documents in retrieval at once")
+    parser.add_argument("--embedding-backend", default="torch", help="torch, onnx or onnx-int8")
+    parser.add_argument("--validate", action="store_true", help="Validate retrieved paragraphs with the LLM")
+    parser.add_argument("--validate-concurrency", type=int, default=4, help="Documents in validation at once")
+    parser.add_argument("--model", default="google/flan-t5-large", help="Validator model")
+    args = parser.parse_args()
+
+    clauses = load_clauses(args)
+    if not clauses:
+        parser.error("no clauses given (use --clause or --clauses-file)")
+
+    paths = sorted(glob.glob(os.path.join(args.directory, "**", "*.pdf"), recursive=True))
+    done = completed_documents(args.output)
+    pending = [path for path in paths if os.path.relpath(path, args.directory) not in done]
+    logger.info(f"📂 {len(paths)} PDFs found, {len(paths) - len(pending)} already done, {len(pending)} to process")
+
+    clause_validator = None
+    if args.validate:
+        from legal_clause_validator import LegalClauseValidator
+
+        clause_validator = LegalClauseValidator(args.model)
+
+    pipeline = DocumentPipeline(
+        OCRProcessor(dpi=args.dpi, max_workers=args.ocr_workers),
+        ChromaService(collection_name=args.collection, embedding_backend=args.embedding_backend),
+        clause_validator,
+        top_k=args.top_k,
+        stage_limits={
+            "ocr": args.ocr_concurrency,
+            "store": args.store_concurrency,
+            "retrieve": args.retrieve_concurrency,
+            "validate": args.validate_concurrency,
+        },
+    )
+
+    def _process(path: str) -> Dict:
+        document = os.path.relpath(path, args.directory)
+        start = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                result = pipeline.process(document, f.read(), clauses)
+            record = {"status": "succeeded", **result}
+        except Exception as e:
+            logger.error(f"❌ Failed to process {document}: {e}")
+            record = {"filename": document, "status": "failed", "error": str(e)}
+        record["seconds"] = time.perf_counter() - start
+        return record
+
+    # Enough documents in flight to keep every stage busy
+    workers = args.ocr_concurrency + args.store_concurrency + args.retrieve_concurrency
+    if args.validate:
+        workers += args.validate_concurrency
+
+    counts = {"succeeded": 0, "failed": 0, "pages": 0}
+    start = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="document")
+    try:
+        with open(args.output, "a") as output:
+            futures = [pool.submit(_process, path) for path in pending]
+            for finished, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                counts[record["status"]] += 1
+                counts["pages"] += record.get("pages", 0)
+
+                if finished % LOG_EVERY == 0 or finished == len(futures):
+                    rates = throughput(finished, counts["pages"], time.perf_counter() - start)
+                    logger.info(
+                        f"⏱️ {finished}/{len(futures)} documents, "
+                        f"{rates['documents_per_minute']:.1f} docs/min, {rates['pages_per_minute']:.1f} pages/min"
+                    )
+    finally:
+        # On interruption, documents not yet started are dropped; the next run picks them up
+        pool.shutdown(wait=True, cancel_futures=True)
+        pipeline.close()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "documents": len(paths),
+        "skipped": len(paths) - len(pending),
+        **counts,
+        "seconds": elapsed,
+        **throughput(counts["succeeded"] + counts["failed"], counts["pages"], elapsed),
+        "stages": pipeline.stats(),
+    }
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares the OCR backends on the same rasterized pages.
+
+Usage:
+    python benchmark_ocr_backends.py contract.pdf --pages 5 --repeat 3
+"""
+import argparse
+import difflib
+import json
+import time
+
+from pdf2image import convert_from_path
+
+from ocr import OCR_BACKENDS, OCRProcessor
+
+
+def benchmark_backend(backend: str, images, repeat: int) -> dict:
+    """Times image_to_data per page; the first page is OCR'd once untimed to load the engine."""
+    processor = OCRProcessor(ocr_backend=backend)
+    processor.image_to_data(images[0])
+
+    timings, words = [], []
+    for image in images:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ocr_data = processor.image_to_data(image)
+            timings.append(time.perf_counter() - start)
+        words.append([text for *_, text in processor.extract_word_bboxes(ocr_data)])
+    processor.close()
+
+    return {
+        "backend": backend,
+        "pages": len(images),
+        "mean_seconds_per_page": sum(timings) / len(timings),
+        "min_seconds_per_page": min(timings),
+        "words": words,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_path")
+    parser.add_argument("--pages", type=int, default=5, help="Number of leading pages to OCR")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per page")
+    parser.add_argument("--dpi", type=int, default=200)
+    args = parser.parse_args()
+
+    images = convert_from_path(args.pdf_path, dpi=args.dpi, first_page=1, last_page=args.pages)
+
+    results = []
+    for backend in OCR_BACKENDS:
+        try:
+            results.append(benchmark_backend(backend, images, args.repeat))
+        except ImportError as e:
+            print(f"Skipping {backend}: {e}")
+
+    # Word-level agreement of each backend with the pytesseract baseline
+    baseline = results[0]["words"]
+    for result in results:
+        ratios = [
+            difflib.SequenceMatcher(a=expected, b=actual).ratio()
+            for expected, actual in zip(baseline, result.pop("words"))
+        ]
+        result["word_agreement"] = sum(ratios) / len(ratios)
+        result["speedup"] = results[0]["mean_seconds_per_page"] / result["mean_seconds_per_page"]
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
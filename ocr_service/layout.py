@@ -0,0 +1,98 @@
+import numpy as np
+from typing import Dict, List, NamedTuple, Tuple
+
+
+class WordBoxes(NamedTuple):
+    """Struct-of-arrays word boxes, sorted top-to-bottom then left-to-right."""
+
+    x: np.ndarray
+    y: np.ndarray
+    w: np.ndarray
+    h: np.ndarray
+    text: List[str]
+
+
+def word_boxes_from_ocr_data(ocr_data: Dict) -> WordBoxes:
+    """Vectorized equivalent of OCRProcessor.extract_word_bboxes."""
+    texts = [text.strip() for text in ocr_data["text"]]
+    # int(conf) > 0 truncates toward zero, so it is conf >= 1 for any float
+    conf = np.asarray(ocr_data["conf"], dtype=np.float64)
+    keep = np.flatnonzero((conf >= 1) & np.fromiter((bool(t) for t in texts), bool, len(texts)))
+
+    x = np.asarray(ocr_data["left"], dtype=np.int64)[keep]
+    y = np.asarray(ocr_data["top"], dtype=np.int64)[keep]
+    # lexsort is stable, like sorted() on the (top, left) key
+    order = np.lexsort((x, y))
+    return WordBoxes(
+        x=x[order],
+        y=y[order],
+        w=np.asarray(ocr_data["width"], dtype=np.int64)[keep][order],
+        h=np.asarray(ocr_data["height"], dtype=np.int64)[keep][order],
+        text=[texts[i] for i in keep[order]],
+    )
+
+
+def word_boxes_from_tuples(word_bboxes: List[Tuple[int, int, int, int, str]]) -> WordBoxes:
+    """Struct-of-arrays view of already sorted (x, y, w, h, text) tuples."""
+    if not word_bboxes:
+        empty = np.zeros(0, dtype=np.int64)
+        return WordBoxes(empty, empty, empty, empty, [])
+    coords = np.array([b[:4] for b in word_bboxes], dtype=np.int64)
+    return WordBoxes(coords[:, 0], coords[:, 1], coords[:, 2], coords[:, 3], [b[4] for b in word_bboxes])
+
+
+def _segment_bboxes(
+    starts: np.ndarray, x: np.ndarray, y: np.ndarray, w: np.ndarray, h: np.ndarray
+) -> np.ndarray:
+    """(x, y, w, h) rows enclosing each contiguous segment beginning at `starts`."""
+    min_x = np.minimum.reduceat(x, starts)
+    min_y = np.minimum.reduceat(y, starts)
+    max_x = np.maximum.reduceat(x + w, starts)
+    max_y = np.maximum.reduceat(y + h, starts)
+    return np.stack([min_x, min_y, max_x - min_x, max_y - min_y], axis=1)
+
+
+def group_words_into_lines(
+    words: WordBoxes, overlap_ratio: float = 0.6
+) -> Tuple[List[str], np.ndarray]:
+    """Vectorized equivalent of OCRProcessor.group_words_into_lines."""
+    if not words.text:
+        return [], np.zeros((0, 4), dtype=np.int64)
+
+    # A word starts a new line when it is too far below the previous word
+    breaks = np.abs(np.diff(words.y)) >= words.h[1:] * overlap_ratio
+    line_ids = np.concatenate(([0], np.cumsum(breaks)))
+    starts = np.concatenate(([0], np.flatnonzero(breaks) + 1))
+
+    # Order words left-to-right within each line (stable, like list.sort)
+    order = np.lexsort((words.x, line_ids))
+    ends = np.append(starts[1:], len(order))
+    line_texts = [
+        " ".join(words.text[i] for i in order[start:end])
+        for start, end in zip(starts.tolist(), ends.tolist())
+    ]
+    return line_texts, _segment_bboxes(starts, words.x, words.y, words.w, words.h)
+
+
+def group_lines_into_paragraphs(
+    line_texts: List[str], line_bboxes: np.ndarray, spacing_multiplier: float = 0.5
+) -> Tuple[List[str], np.ndarray]:
+    """Vectorized equivalent of OCRProcessor.group_lines_into_paragraphs."""
+    if not line_texts:
+        return [], np.zeros((0, 4), dtype=np.int64)
+
+    x, y, w, h = line_bboxes.T
+    line_gaps = np.diff(y)
+    median_line_spacing = (
+        float(np.median(line_gaps)) * spacing_multiplier if len(line_gaps) else 10
+    )
+
+    # A line starts a new paragraph when its gap to the previous line is too wide
+    breaks = (y[1:] - (y[:-1] + h[:-1])) >= median_line_spacing
+    starts = np.concatenate(([0], np.flatnonzero(breaks) + 1))
+    ends = np.append(starts[1:], len(line_texts))
+    paragraph_texts = [
+        " ".join(line_texts[start:end])
+        for start, end in zip(starts.tolist(), ends.tolist())
+    ]
+    return paragraph_texts, _segment_bboxes(starts, x, y, w, h)
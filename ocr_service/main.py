@@ -1,41 +1,206 @@
-import tempfile
 import os
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 import logging
-from ocr import OCRProcessor  # Import OCRProcessor class
+from contextlib import asynccontextmanager
+from ocr import OCRProcessor, PAGE_SOURCE_TEXT_LAYER  # Import OCRProcessor class
+from ocr_cache import OCRCache
+from ocr_executor import OCRExecutor, OCROverloadedError
+from common.instrumentation import instrument
+from common.readiness import Readiness
+from common.wire_format import MSGPACK_MEDIA_TYPE, accepts_msgpack, negotiated_response, pack_columns, stream_record
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
-ocr_processor = OCRProcessor()  # Initialize OCR Processor
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up after startup and stop the OCR pool on shutdown (hooks defined below)."""
+    start_warmup()
+    yield
+    shutdown_ocr_pool()
+
+app = FastAPI(lifespan=lifespan)
+
+# Request ids, Server-Timing headers and /metrics; PROFILING_ENABLED lets
+# requests sent with "X-Profile: 1" be profiled into PROFILE_DIR
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+instrument(app, profiling_enabled=PROFILING_ENABLED, profile_dir=PROFILE_DIR)
+
+# Responses are JSON unless the client accepts msgpack, and compressed
+# (zstd or gzip, as accepted) from COMPRESS_MIN_BYTES
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "16384"))
+
+# OCR settings from Env. OCR runs in-process by default; OCR_MAX_WORKERS > 1 opts
+# in to a process pool of that many workers (one pool per uvicorn worker process)
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS", "1"))
+OCR_PAGES_PER_WINDOW = int(os.getenv("OCR_PAGES_PER_WINDOW", "2"))
+OCR_USE_TEXT_LAYER = os.getenv("OCR_USE_TEXT_LAYER", "true").lower() == "true"
+OCR_MIN_TEXT_LAYER_WORDS = int(os.getenv("OCR_MIN_TEXT_LAYER_WORDS", "5"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_BACKEND = os.getenv("OCR_BACKEND", "pytesseract")  # "pytesseract" or "tesserocr"
+OCR_LAYOUT_ENGINE = os.getenv("OCR_LAYOUT_ENGINE", "numpy")  # "numpy" or "python"
+
+# Extraction result cache (disable with OCR_CACHE_ENABLED=false)
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "./ocr_cache.sqlite3")
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", "512"))
+ocr_cache = OCRCache(OCR_CACHE_PATH, max_bytes=OCR_CACHE_MAX_MB * 1024 * 1024) if OCR_CACHE_ENABLED else None
+
+# Initialize OCR Processor
+ocr_processor = OCRProcessor(
+    dpi=OCR_DPI,
+    max_workers=OCR_MAX_WORKERS,
+    pages_per_window=OCR_PAGES_PER_WINDOW,
+    use_text_layer=OCR_USE_TEXT_LAYER,
+    min_text_layer_words=OCR_MIN_TEXT_LAYER_WORDS,
+    lang=OCR_LANG,
+    ocr_backend=OCR_BACKEND,
+    layout_engine=OCR_LAYOUT_ENGINE,
+    cache=ocr_cache,
+)
+
+# OCR runs on a bounded executor so it never blocks the event loop; requests
+# beyond OCR_MAX_CONCURRENCY running + OCR_MAX_QUEUE waiting are rejected
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", "2"))
+OCR_MAX_QUEUE = int(os.getenv("OCR_MAX_QUEUE", "8"))
+OCR_RETRY_AFTER_SECONDS = os.getenv("OCR_RETRY_AFTER_SECONDS", "5")
+ocr_executor = OCRExecutor(max_concurrency=OCR_MAX_CONCURRENCY, max_queue=OCR_MAX_QUEUE)
+
+def overloaded() -> HTTPException:
+    """503 response for requests rejected by admission control."""
+    logger.warning(f"⚠️ Rejecting OCR request, executor at capacity: {ocr_executor.stats()}")
+    return HTTPException(
+        status_code=503,
+        detail="OCR service is at capacity, retry later.",
+        headers={"Retry-After": OCR_RETRY_AFTER_SECONDS},
+    )
+
+# The OCR engine and worker pool are warmed up in the background after startup;
+# /readyz turns 200 (and OCR endpoints accept requests) only once that is done
+readiness = Readiness("OCR Service", retry_after_seconds=OCR_RETRY_AFTER_SECONDS)
+
+def start_warmup():
+    """Warm up the OCR engine and worker pool in the background."""
+    readiness.start([("warmup", ocr_processor.warmup)])
+
+def shutdown_ocr_pool():
+    """Stop the OCR executor and worker pool."""
+    ocr_executor.shutdown()
+    ocr_processor.close()
 
 @app.post("/extract-text")
-async def extract_text(file: UploadFile = File(...)):
-    """Process PDF and return extracted text with page numbers (No Storage)."""
+async def extract_text(request: Request, file: UploadFile = File(...)):
+    """
+    Process PDF and return extracted text with page numbers (No Storage).
+
+    msgpack clients get `ocr_text` as a columnar table of page, para and
+    text columns (see common.wire_format.pack_columns) instead of [page, para, text] rows.
+    """
+    readiness.require()
+    # The upload is rasterized straight from memory; nothing is written to disk
+    pdf_bytes = await file.read()
     try:
-        # Use a temporary directory (Cross-platform compatibility)
-        with tempfile.TemporaryDirectory() as temp_dir:
-            pdf_path = os.path.join(temp_dir, file.filename)
-
-            # Save the uploaded file to the temporary path
-            with open(pdf_path, "wb") as f:
-                f.write(await file.read())
-
-            # Extract text from the PDF
-            ocr_text = ocr_processor.process_pdf(pdf_path)
-
-        if not ocr_text:
-            raise HTTPException(status_code=400, detail="No text extracted from PDF.")        
-        
-        return {"ocr_text": ocr_text}
-    
+        # Extract text from the PDF (text layer where present, OCR otherwise)
+        pages = await ocr_executor.run(ocr_processor.process_pdf_pages, pdf_bytes)
+    except OCROverloadedError:
+        raise overloaded()
     except Exception as e:
         logger.error(f"Error extracting text: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+    ocr_text = ocr_processor.flatten_pages(pages)
+    if not ocr_text:
+        raise HTTPException(status_code=400, detail="No text extracted from PDF.")
+
+    page_sources = {page.page_number: page.source for page in pages}
+    text_layer_pages = sum(1 for source in page_sources.values() if source == PAGE_SOURCE_TEXT_LAYER)
+    logger.info(f"📄 {text_layer_pages}/{len(page_sources)} pages read from the text layer")
+
+    content = {
+        "ocr_text": ocr_text,
+        "paragraph_bboxes": ocr_processor.flatten_page_bboxes(pages),
+        "page_sources": page_sources,
+    }
+
+    def _columnar():
+        page_numbers, para_numbers, texts = (list(values) for values in zip(*ocr_text))
+        columns = {"page": page_numbers, "para": para_numbers, "text": texts}
+        return {**content, "ocr_text": pack_columns(columns, len(ocr_text))}
+
+    return negotiated_response(request, content, _columnar, COMPRESS_MIN_BYTES)
+
+@app.post("/extract-text-stream")
+async def extract_text_stream(request: Request, file: UploadFile = File(...)):
+    """
+    Process PDF and stream extracted paragraphs as newline-delimited JSON.
+
+    Each line is {"page", "para", "text", "bbox"}, written as soon as its page
+    is finished. A failure after streaming has started is reported as a final
+    {"error": ...} line, since the status code has already been sent.
+
+    Clients accepting msgpack get one msgpack object per page instead,
+    {"page", "text": [...], "bbox": [...]}, with paragraphs numbered by position.
+    """
+    readiness.require()
+    pdf_bytes = await file.read()
+    binary = accepts_msgpack(request)
+
+    def _records():
+        try:
+            for page in ocr_processor.iter_pdf_pages(pdf_bytes):
+                if binary:
+                    yield stream_record(
+                        {"page": page.page_number, "text": page.paragraph_texts, "bbox": page.paragraph_bboxes}, binary
+                    )
+                    continue
+                yield b"".join(
+                    stream_record({"page": page.page_number, "para": para_number, "text": text, "bbox": bbox}, binary)
+                    for para_number, (text, bbox) in enumerate(zip(page.paragraph_texts, page.paragraph_bboxes))
+                )
+        except Exception as e:
+            logger.error(f"Error streaming text: {str(e)}")
+            yield stream_record({"error": "Internal Server Error"}, binary)
+
+    # Each page is produced on the OCR executor, off the event loop; the first
+    # one before the response starts, so a full executor still gets a 503
+    try:
+        records = await ocr_executor.stream(_records())
+    except OCROverloadedError:
+        raise overloaded()
+    return StreamingResponse(
+        records, media_type=MSGPACK_MEDIA_TYPE if binary else "application/x-ndjson", headers={"Vary": "Accept"}
+    )
+
+@app.get("/cache-stats")
+def cache_stats():
+    """OCR result cache hit/miss counters."""
+    if ocr_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **ocr_cache.stats()}
+
+@app.get("/executor-stats")
+def executor_stats():
+    """OCR executor load against its concurrency and queue limits."""
+    return ocr_executor.stats()
+
+@app.get("/livez")
+async def liveness_check():
+    """Liveness: the process is up, even while still warming up."""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_check():
+    """Readiness: 200 once warmed up, 503 (with startup progress) before."""
+    report = readiness.report()
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
 @app.get("/")
-def health_check():
+async def health_check():
     """Health check endpoint."""
     return {"message": "OCR Service is running"}
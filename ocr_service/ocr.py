@@ -1,13 +1,156 @@
+import html
+import logging
+import multiprocessing
+import re
 import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import shared_memory
 import pytesseract
-from pdf2image import convert_from_path
-from typing import List, Tuple, Dict
+from pdf2image.parsers import parse_buffer_to_ppm
+from PIL import Image, ImageDraw
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Dict
+import layout
+from common.instrumentation import METRICS, capture_observations, record_timing
+from ocr_cache import OCRCache
+
+try:
+    import tesserocr
+except ImportError:  # Optional: only needed for the "tesserocr" backend
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+# "pytesseract" runs the tesseract CLI per page; "tesserocr" keeps an
+# in-process engine per worker thread and passes images from memory.
+OCR_BACKENDS = ("pytesseract", "tesserocr")
+
+# "python" is the reference tuple-based layout; "numpy" is the array-backed
+# equivalent in layout.py, which produces the same paragraphs faster.
+LAYOUT_ENGINES = ("python", "numpy")
+
+# Where a page's text came from
+PAGE_SOURCE_TEXT_LAYER = "text_layer"
+PAGE_SOURCE_OCR = "ocr"
+
+# Poppler utilities read the PDF from stdin when given this file name, so
+# uploads are never written to disk
+_POPPLER_STDIN = "fd://0"
+
+# `pdftotext -bbox` output: one <page> element per page, one <word> per word
+_PAGE_PATTERN = re.compile(r"<page\b[^>]*>(.*?)</page>", re.S)
+_WORD_PATTERN = re.compile(
+    r'<word xMin="([\d.]+)" yMin="([\d.]+)" xMax="([\d.]+)" yMax="([\d.]+)">(.*?)</word>',
+    re.S,
+)
+
+
+# Per-page time by stage; work done per window or run of pages is split evenly over its pages
+OCR_PAGE_SECONDS = METRICS.histogram(
+    "ocr_page_stage_seconds", "OCR time per page by stage (text_layer, rasterize, tesseract, layout).", labelnames=("stage",)
+)
+
+
+class PageResult(NamedTuple):
+    """Extraction result for one page."""
+
+    page_number: int
+    source: str
+    paragraph_texts: List[str]
+    paragraph_bboxes: List[Tuple[int, int, int, int]]
 
 
 class OCRProcessor:
-    def __init__(self):
-        """Initialize the OCR processor."""
-        pass
+    def __init__(
+        self,
+        dpi: int = 200,
+        max_workers: int = 1,
+        pages_per_window: int = 2,
+        use_text_layer: bool = True,
+        min_text_layer_words: int = 5,
+        lang: str = "eng",
+        line_overlap_ratio: float = 0.6,
+        spacing_multiplier: float = 0.5,
+        cache: Optional[OCRCache] = None,
+        ocr_backend: str = "pytesseract",
+        layout_engine: str = "numpy",
+    ):
+        """Initialize the OCR processor.
+
+        Pages are rasterized `pages_per_window` at a time, so peak memory is a
+        few page images per worker. With `max_workers` > 1 the windows are
+        rasterized and OCR'd in a process pool; results keep page order.
+        Workers are started with forkserver (spawn where unavailable), never
+        forked from the threaded server process.
+
+        With `use_text_layer`, pages whose embedded text layer has at least
+        `min_text_layer_words` words skip rasterization and tesseract.
+
+        With a `cache`, pages already extracted from the same PDF bytes under
+        the same settings are served from it and only missing pages are OCR'd.
+
+        `ocr_backend` is one of OCR_BACKENDS and `layout_engine` one of
+        LAYOUT_ENGINES.
+        """
+        if ocr_backend not in OCR_BACKENDS:
+            raise ValueError(f"Unknown OCR backend '{ocr_backend}', expected one of {OCR_BACKENDS}")
+        if ocr_backend == "tesserocr" and tesserocr is None:
+            raise ImportError(
+                "The 'tesserocr' OCR backend requires the tesserocr package (requirements-tesserocr.txt)"
+            )
+        if layout_engine not in LAYOUT_ENGINES:
+            raise ValueError(f"Unknown layout engine '{layout_engine}', expected one of {LAYOUT_ENGINES}")
+
+        self.dpi = dpi
+        self.max_workers = max(1, max_workers)
+        self.pages_per_window = max(1, pages_per_window)
+        self.use_text_layer = use_text_layer
+        self.min_text_layer_words = min_text_layer_words
+        self.lang = lang
+        self.line_overlap_ratio = line_overlap_ratio
+        self.spacing_multiplier = spacing_multiplier
+        self.cache = cache
+        self.ocr_backend = ocr_backend
+        self.layout_engine = layout_engine
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._engine_local = threading.local()
+        self._engines = []
+        self._engines_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Shut down the worker pool and any in-process tesseract engines."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        with self._engines_lock:
+            for engine in self._engines:
+                engine.End()
+            self._engines = []
+        self._engine_local = threading.local()
+
+    def cache_settings(self) -> Dict:
+        """Settings that change extraction output, and so key the result cache."""
+        return {
+            "dpi": self.dpi,
+            "use_text_layer": self.use_text_layer,
+            "min_text_layer_words": self.min_text_layer_words,
+            "lang": self.lang,
+            "line_overlap_ratio": self.line_overlap_ratio,
+            "spacing_multiplier": self.spacing_multiplier,
+            "ocr_backend": self.ocr_backend,
+        }
+
+    def _worker_config(self) -> Dict:
+        """Settings a worker process needs to build its own processor."""
+        return {
+            **self.cache_settings(),
+            "pages_per_window": self.pages_per_window,
+            "layout_engine": self.layout_engine,
+        }
 
     def extract_word_bboxes(
         self, ocr_data: Dict
@@ -29,7 +172,9 @@ class OCRProcessor:
         )
 
     def group_words_into_lines(
-        self, word_bboxes: List[Tuple[int, int, int, int, str]]
+        self,
+        word_bboxes: List[Tuple[int, int, int, int, str]],
+        overlap_ratio: float = 0.6,
     ) -> Tuple[List[str], List[Tuple[int, int, int, int]]]:
         """Group words into lines based on Y-coordinates."""
         line_bboxes, line_texts, current_line = [], [], []
@@ -48,7 +193,7 @@ class OCRProcessor:
             current_line = []
 
         for x, y, w, h, text in word_bboxes:
-            if not current_line or abs(y - current_line[-1][1]) < h * 0.6:
+            if not current_line or abs(y - current_line[-1][1]) < h * overlap_ratio:
                 current_line.append((x, y, w, h, text))
             else:
                 _store_line()
@@ -105,31 +250,371 @@ class OCRProcessor:
 
         return paragraph_texts, paragraph_bboxes
 
-    def process_pdf(
-        self, pdf_path: str, page_range: Tuple[int, int] = None
-    ) -> List[Tuple[int, int , str]]:
-        """Convert PDF to images, extract text, and return with page numbers."""
-        images = convert_from_path(pdf_path)
-        extracted_texts = []
+    def page_count(self, pdf_bytes: bytes) -> int:
+        """Number of pages in the PDF, from pdfinfo."""
+        info = subprocess.run(
+            ["pdfinfo", _POPPLER_STDIN], input=pdf_bytes, capture_output=True, check=True
+        ).stdout.decode("utf-8", errors="replace")
+        for line in info.splitlines():
+            key, _, value = line.partition(":")
+            if key == "Pages":
+                return int(value)
+        raise ValueError("pdfinfo did not report a page count")
 
-        start_page = page_range[0] - 1 if page_range else 0
-        end_page = page_range[1] if page_range else len(images)
+    def rasterize(self, pdf_bytes: bytes, first_page: int, last_page: int) -> List:
+        """Render pages `first_page`..`last_page` to PIL images at `self.dpi`."""
+        ppm_data = subprocess.run(
+            ["pdftoppm", "-r", str(self.dpi), "-f", str(first_page), "-l", str(last_page), _POPPLER_STDIN],
+            input=pdf_bytes,
+            capture_output=True,
+            check=True,
+        ).stdout
+        return parse_buffer_to_ppm(ppm_data)
 
-        for i in range(start_page, end_page):
-            image = images[i]
+    def extract_text_layer_bboxes(
+        self, pdf_bytes: bytes, first_page: int, last_page: int
+    ) -> Dict[int, List[Tuple[int, int, int, int, str]]]:
+        """Read word bounding boxes from the PDF's embedded text layer.
 
-            # OCR Extraction
-            ocr_data = pytesseract.image_to_data(
-                image, output_type=pytesseract.Output.DICT
-            )
-            word_bboxes = self.extract_word_bboxes(ocr_data)
-            line_texts, line_bboxes = self.group_words_into_lines(word_bboxes)
-            paragraph_texts, _ = self.group_lines_into_paragraphs(
-                line_texts, line_bboxes
+        Coordinates are scaled from PDF points to pixels at `self.dpi`, so the
+        layout thresholds behave as they do on rasterized pages. Returns an
+        empty dict if poppler cannot read the text layer.
+        """
+        try:
+            result = subprocess.run(
+                ["pdftotext", "-bbox", "-f", str(first_page), "-l", str(last_page), _POPPLER_STDIN, "-"],
+                input=pdf_bytes,
+                capture_output=True,
+                check=True,
             )
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"Text layer unavailable for pages {first_page}-{last_page}: {e}")
+            return {}
+
+        scale = self.dpi / 72.0
+        pages = {}
+        page_xml = result.stdout.decode("utf-8", errors="replace")
+        for offset, page_match in enumerate(_PAGE_PATTERN.finditer(page_xml)):
+            word_bboxes = []
+            for x_min, y_min, x_max, y_max, text in _WORD_PATTERN.findall(page_match.group(1)):
+                text = html.unescape(text).strip()
+                if not text:
+                    continue
+                x, y = round(float(x_min) * scale), round(float(y_min) * scale)
+                w = round(float(x_max) * scale) - x
+                h = round(float(y_max) * scale) - y
+                word_bboxes.append((x, y, w, h, text))
+            pages[first_page + offset] = sorted(word_bboxes, key=lambda b: (b[1], b[0]))
+        return pages
+
+    def _layout_word_boxes(
+        self, words: layout.WordBoxes
+    ) -> Tuple[List[str], List[Tuple[int, int, int, int]]]:
+        """Array-backed line and paragraph grouping."""
+        line_texts, line_bboxes = layout.group_words_into_lines(
+            words, self.line_overlap_ratio
+        )
+        paragraph_texts, paragraph_bboxes = layout.group_lines_into_paragraphs(
+            line_texts, line_bboxes, self.spacing_multiplier
+        )
+        return paragraph_texts, [tuple(bbox) for bbox in paragraph_bboxes.tolist()]
+
+    def layout_paragraphs(
+        self, word_bboxes: List[Tuple[int, int, int, int, str]]
+    ) -> Tuple[List[str], List[Tuple[int, int, int, int]]]:
+        """Group sorted word boxes into lines and lines into paragraphs.
+
+        Returns the paragraph texts and their (x, y, w, h) bounding boxes.
+        """
+        if self.layout_engine == "numpy":
+            return self._layout_word_boxes(layout.word_boxes_from_tuples(word_bboxes))
+
+        line_texts, line_bboxes = self.group_words_into_lines(
+            word_bboxes, self.line_overlap_ratio
+        )
+        return self.group_lines_into_paragraphs(
+            line_texts, line_bboxes, self.spacing_multiplier
+        )
+
+    def layout_ocr_data(
+        self, ocr_data: Dict
+    ) -> Tuple[List[str], List[Tuple[int, int, int, int]]]:
+        """Filter OCR words and group them into paragraphs with bounding boxes."""
+        if self.layout_engine == "numpy":
+            return self._layout_word_boxes(layout.word_boxes_from_ocr_data(ocr_data))
+        return self.layout_paragraphs(self.extract_word_bboxes(ocr_data))
+
+    def _tesserocr_engine(self):
+        """This thread's long-lived tesseract engine, created on first use."""
+        engine = getattr(self._engine_local, "engine", None)
+        if engine is None:
+            engine = tesserocr.PyTessBaseAPI(lang=self.lang)
+            self._engine_local.engine = engine
+            with self._engines_lock:
+                self._engines.append(engine)
+        return engine
+
+    def _tesserocr_image_to_data(self, image) -> Dict[str, List]:
+        """Word-level OCR data from the in-process engine, shaped like pytesseract's DICT output."""
+        engine = self._tesserocr_engine()
+        engine.SetImage(image)
+        engine.Recognize()
 
+        ocr_data = {"left": [], "top": [], "width": [], "height": [], "text": [], "conf": []}
+        level = tesserocr.RIL.WORD
+        for word in tesserocr.iterate_level(engine.GetIterator(), level):
+            bbox = word.BoundingBox(level)
+            text = word.GetUTF8Text(level)
+            if bbox is None or text is None:
+                continue
+            x1, y1, x2, y2 = bbox
+            ocr_data["left"].append(x1)
+            ocr_data["top"].append(y1)
+            ocr_data["width"].append(x2 - x1)
+            ocr_data["height"].append(y2 - y1)
+            ocr_data["text"].append(text)
+            ocr_data["conf"].append(word.Confidence(level))
+        engine.Clear()
+        return ocr_data
+
+    def image_to_data(self, image) -> Dict[str, List]:
+        """Run the configured OCR backend on a page image."""
+        if self.ocr_backend == "tesserocr":
+            return self._tesserocr_image_to_data(image)
+        return pytesseract.image_to_data(
+            image, lang=self.lang, output_type=pytesseract.Output.DICT
+        )
+
+    def process_image(
+        self, image
+    ) -> Tuple[List[str], List[Tuple[int, int, int, int]]]:
+        """Run OCR and layout analysis on a single page image."""
+        with OCR_PAGE_SECONDS.time("ocr_tesseract", stage="tesseract"):
+            ocr_data = self.image_to_data(image)
+        with OCR_PAGE_SECONDS.time("ocr_layout", stage="layout"):
+            return self.layout_ocr_data(ocr_data)
+
+    def ocr_window(
+        self, pdf_bytes: bytes, first_page: int, last_page: int
+    ) -> List[PageResult]:
+        """Extract pages `first_page`..`last_page` (1-based, inclusive).
+
+        Pages with a usable text layer are laid out from their embedded word
+        boxes; only the remaining pages are rasterized and OCR'd.
+        """
+        text_layer = {}
+        if self.use_text_layer:
+            start = time.perf_counter()
+            text_layer = self.extract_text_layer_bboxes(pdf_bytes, first_page, last_page)
+            _observe_pages("text_layer", time.perf_counter() - start, last_page - first_page + 1)
+
+        pages = {}
+        scanned_pages = []
+        for page_number in range(first_page, last_page + 1):
+            word_bboxes = text_layer.get(page_number, [])
+            if len(word_bboxes) >= self.min_text_layer_words:
+                with OCR_PAGE_SECONDS.time("ocr_layout", stage="layout"):
+                    paragraphs = self.layout_paragraphs(word_bboxes)
+                pages[page_number] = PageResult(page_number, PAGE_SOURCE_TEXT_LAYER, *paragraphs)
+            else:
+                scanned_pages.append(page_number)
+
+        for run_first, run_last in _contiguous_runs(scanned_pages):
+            start = time.perf_counter()
+            images = self.rasterize(pdf_bytes, run_first, run_last)
+            _observe_pages("rasterize", time.perf_counter() - start, run_last - run_first + 1)
+            for offset, image in enumerate(images):
+                page_number = run_first + offset
+                pages[page_number] = PageResult(
+                    page_number, PAGE_SOURCE_OCR, *self.process_image(image)
+                )
+
+        return [pages[page_number] for page_number in sorted(pages)]
+
+    def _resolve_page_range(
+        self, page_count: int, page_range: Tuple[int, int] = None
+    ) -> Tuple[int, int]:
+        """Clamp the requested 1-based page range to the pages in the PDF."""
+        first_page = max(1, page_range[0]) if page_range else 1
+        last_page = min(page_count, page_range[1]) if page_range else page_count
+        return first_page, last_page
+
+    def _page_windows(self, page_numbers: List[int]) -> List[Tuple[int, int]]:
+        """Split sorted page numbers into windows of at most `pages_per_window` consecutive pages."""
+        return [
+            (start, min(start + self.pages_per_window - 1, run_last))
+            for run_first, run_last in _contiguous_runs(page_numbers)
+            for start in range(run_first, run_last + 1, self.pages_per_window)
+        ]
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        """The worker pool, started on first use."""
+        with self._executor_lock:
+            if self._executor is None:
+                start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(start_method),
+                    initializer=_init_worker,
+                    initargs=(self._worker_config(),),
+                )
+            return self._executor
+
+    def warmup(self) -> None:
+        """Load the OCR engine, and start and warm the worker pool, on a small synthetic page."""
+        self.process_image(_warmup_image())
+        if self.max_workers > 1:
+            list(self._process_pool().map(_warm_up_worker, range(self.max_workers)))
+
+    def _ocr_windows(
+        self, pdf_bytes: bytes, windows: List[Tuple[int, int]]
+    ) -> Iterator[PageResult]:
+        """Yield the result for every page, in page order."""
+        if self.max_workers == 1 or len(windows) <= 1:
+            for first_page, last_page in windows:
+                yield from self.ocr_window(pdf_bytes, first_page, last_page)
+            return
+
+        # The PDF is shared with the workers through shared memory and they
+        # rasterize their own windows, so only text crosses the pool boundary;
+        # map() returns results in submission (page) order.
+        pdf_buffer = shared_memory.SharedMemory(create=True, size=max(1, len(pdf_bytes)))
+        try:
+            pdf_buffer.buf[: len(pdf_bytes)] = pdf_bytes
+            for window_result in self._process_pool().map(
+                _ocr_window_in_worker,
+                repeat(pdf_buffer.name),
+                repeat(len(pdf_bytes)),
+                [first_page for first_page, _ in windows],
+                [last_page for _, last_page in windows],
+            ):
+                window_result, captured = window_result
+                METRICS.replay(captured)
+                yield from window_result
+        finally:
+            pdf_buffer.close()
+            pdf_buffer.unlink()
+
+    def iter_pdf_pages(
+        self, pdf_bytes: bytes, page_range: Tuple[int, int] = None
+    ) -> Iterator[PageResult]:
+        """Extract the PDF window by window, yielding each page in order as soon as it is ready."""
+        pdf_hash = settings_key = page_count = None
+        if self.cache is not None:
+            pdf_hash = self.cache.hash_bytes(pdf_bytes)
+            settings_key = self.cache.settings_key(self.cache_settings())
+            page_count = self.cache.get_page_count(pdf_hash)
+
+        if page_count is None:
+            page_count = self.page_count(pdf_bytes)
+            if self.cache is not None:
+                self.cache.put_page_count(pdf_hash, page_count)
+
+        first_page, last_page = self._resolve_page_range(page_count, page_range)
+        cached_pages = {}
+        if self.cache is not None and first_page <= last_page:
+            cached_pages = self.cache.get_pages(pdf_hash, settings_key, first_page, last_page)
+        cached = [
+            PageResult(page_number, *cached_pages[page_number])
+            for page_number in sorted(cached_pages)
+        ]
+
+        # Only pages missing from the cache are extracted; cached pages are
+        # merged in ahead of the first extracted page that follows them
+        missing_pages = [p for p in range(first_page, last_page + 1) if p not in cached_pages]
+        windows = self._page_windows(missing_pages)
+        next_cached = 0
+        for page in self._ocr_windows(pdf_bytes, windows):
+            while next_cached < len(cached) and cached[next_cached].page_number < page.page_number:
+                yield cached[next_cached]
+                next_cached += 1
+            if self.cache is not None:
+                self.cache.put_page(pdf_hash, settings_key, *page)
+            yield page
+        yield from cached[next_cached:]
+
+    def process_pdf_pages(
+        self, pdf_bytes: bytes, page_range: Tuple[int, int] = None
+    ) -> List[PageResult]:
+        """Extract the PDF window by window and return per-page results in page order."""
+        return list(self.iter_pdf_pages(pdf_bytes, page_range))
+
+    @staticmethod
+    def flatten_pages(pages: List[PageResult]) -> List[Tuple[int, int, str]]:
+        """Turn per-page results into (page_number, para_number, text) rows."""
+        extracted_texts = []
+        for page_number, _, paragraph_texts, _ in pages:
             # Store extracted text with page number
             for para_number, para_text in enumerate(paragraph_texts):
-                extracted_texts.append((i + 1, para_number, para_text))
+                extracted_texts.append((page_number, para_number, para_text))
+        return extracted_texts
+
+    @staticmethod
+    def flatten_page_bboxes(pages: List[PageResult]) -> List[Tuple[int, int, int, int]]:
+        """Paragraph (x, y, w, h) boxes, aligned with the rows of flatten_pages."""
+        return [bbox for page in pages for bbox in page.paragraph_bboxes]
+
+    def process_pdf(
+        self, pdf_path: str, page_range: Tuple[int, int] = None
+    ) -> List[Tuple[int, int , str]]:
+        """Extract text from the PDF and return it with page numbers."""
+        with open(pdf_path, "rb") as f:
+            pages = self.process_pdf_pages(f.read(), page_range)
+        return self.flatten_pages(pages)  # Returns list of (page_number, para_number, text)
+
+
+def _observe_pages(stage: str, seconds: float, page_count: int) -> None:
+    """Records work done for `page_count` pages at once as an equal share per page."""
+    for _ in range(page_count):
+        OCR_PAGE_SECONDS.observe(seconds / page_count, stage=stage)
+    record_timing(f"ocr_{stage}", seconds)
+
+
+def _contiguous_runs(page_numbers: List[int]) -> List[Tuple[int, int]]:
+    """Collapse sorted page numbers into (first, last) runs of consecutive pages."""
+    runs = []
+    for page_number in page_numbers:
+        if runs and runs[-1][1] == page_number - 1:
+            runs[-1] = (runs[-1][0], page_number)
+        else:
+            runs.append((page_number, page_number))
+    return runs
+
+
+# Per-process processor used by the OCR worker pool
+_worker_processor: Optional[OCRProcessor] = None
+
+
+def _init_worker(config: Dict) -> None:
+    """Build the processor a pool worker reuses for every window it handles."""
+    global _worker_processor
+    _worker_processor = OCRProcessor(**config)
+
+
+def _warmup_image():
+    """A one-line page image, enough to load the tesseract model."""
+    image = Image.new("L", (800, 100), 255)
+    ImageDraw.Draw(image).text((20, 40), "This Agreement shall be governed by the laws of England.", fill=0)
+    return image
+
+
+def _warm_up_worker(_: int) -> None:
+    """Pool entry point: runs the worker's OCR engine once."""
+    _worker_processor.process_image(_warmup_image())
+
 
-        return extracted_texts  # Returns list of (page_number, text)
+def _ocr_window_in_worker(
+    buffer_name: str, size: int, first_page: int, last_page: int
+) -> Tuple[List[PageResult], Dict]:
+    """
+    Pool entry point: OCR one page window of the PDF held in shared memory.
+    Stage timings are returned with the pages, for the parent's metrics.
+    """
+    pdf_buffer = shared_memory.SharedMemory(name=buffer_name)
+    try:
+        pdf_bytes = bytes(pdf_buffer.buf[:size])
+    finally:
+        pdf_buffer.close()
+    with capture_observations() as captured:
+        pages = _worker_processor.ocr_window(pdf_bytes, first_page, last_page)
+    return pages, captured
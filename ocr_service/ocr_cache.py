@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the extraction output for the same settings changes shape or content
+OCR_CACHE_VERSION = 2
+
+
+class OCRCache:
+    """
+    Content-addressed, size-bounded cache of per-page extraction results.
+
+    Entries are keyed by a hash of the PDF bytes plus a hash of the OCR
+    settings, and stored one row per page in SQLite so that a partially
+    cached document only needs its missing pages OCR'd. The least recently
+    used pages are evicted once the stored text exceeds `max_bytes`.
+    """
+
+    def __init__(self, path: str = "./ocr_cache.sqlite3", max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.page_hits = 0
+        self.page_misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS ocr_pages (
+                pdf_hash TEXT NOT NULL,
+                settings_key TEXT NOT NULL,
+                page_number INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                paragraphs TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (pdf_hash, settings_key, page_number)
+            );
+            CREATE INDEX IF NOT EXISTS ocr_pages_last_access ON ocr_pages (last_access);
+            CREATE TABLE IF NOT EXISTS ocr_documents (
+                pdf_hash TEXT PRIMARY KEY,
+                page_count INTEGER NOT NULL
+            );
+            """
+        )
+        self._size_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM ocr_pages"
+        ).fetchone()[0]
+
+    @staticmethod
+    def hash_bytes(pdf_bytes: bytes) -> str:
+        """SHA-256 of the PDF bytes."""
+        return hashlib.sha256(pdf_bytes).hexdigest()
+
+    @staticmethod
+    def settings_key(settings: Dict) -> str:
+        """Stable hash of the OCR settings that affect extraction output."""
+        payload = json.dumps({"version": OCR_CACHE_VERSION, **settings}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_page_count(self, pdf_hash: str) -> Optional[int]:
+        """Page count recorded for a PDF, if it has been seen before."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_count FROM ocr_documents WHERE pdf_hash = ?", (pdf_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_page_count(self, pdf_hash: str, page_count: int) -> None:
+        """Record the page count of a PDF."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_documents (pdf_hash, page_count) VALUES (?, ?)",
+                (pdf_hash, page_count),
+            )
+            self._conn.commit()
+
+    def get_pages(
+        self, pdf_hash: str, settings_key: str, first_page: int, last_page: int
+    ) -> Dict[int, Tuple[str, List[str], List[Tuple[int, int, int, int]]]]:
+        """
+        Returns cached pages in `first_page`..`last_page` as
+        {page_number: (source, paragraph_texts, paragraph_bboxes)} and marks
+        them recently used.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page_number, source, paragraphs FROM ocr_pages "
+                "WHERE pdf_hash = ? AND settings_key = ? AND page_number BETWEEN ? AND ?",
+                (pdf_hash, settings_key, first_page, last_page),
+            ).fetchall()
+            if rows:
+                self._conn.execute(
+                    "UPDATE ocr_pages SET last_access = ? "
+                    "WHERE pdf_hash = ? AND settings_key = ? AND page_number BETWEEN ? AND ?",
+                    (time.time(), pdf_hash, settings_key, first_page, last_page),
+                )
+                self._conn.commit()
+            self.page_hits += len(rows)
+            self.page_misses += (last_page - first_page + 1) - len(rows)
+        pages = {}
+        for page_number, source, paragraphs in rows:
+            paragraphs = json.loads(paragraphs)
+            pages[page_number] = (
+                source,
+                paragraphs["texts"],
+                [tuple(bbox) for bbox in paragraphs["bboxes"]],
+            )
+        return pages
+
+    def put_page(
+        self,
+        pdf_hash: str,
+        settings_key: str,
+        page_number: int,
+        source: str,
+        paragraph_texts: List[str],
+        paragraph_bboxes: List[Tuple[int, int, int, int]],
+    ) -> None:
+        """Stores one page's result, evicting least recently used pages if over budget."""
+        paragraphs = json.dumps({"texts": paragraph_texts, "bboxes": paragraph_bboxes})
+        size = len(paragraphs.encode())
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM ocr_pages WHERE pdf_hash = ? AND settings_key = ? AND page_number = ?",
+                (pdf_hash, settings_key, page_number),
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_pages "
+                "(pdf_hash, settings_key, page_number, source, paragraphs, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (pdf_hash, settings_key, page_number, source, paragraphs, size, time.time()),
+            )
+            self._size_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Deletes least recently used pages until the store fits `max_bytes`."""
+        evicted = 0
+        while self._size_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT pdf_hash, settings_key, page_number, size FROM ocr_pages "
+                "ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for pdf_hash, settings_key, page_number, size in rows:
+                if self._size_bytes <= self.max_bytes:
+                    break
+                self._conn.execute(
+                    "DELETE FROM ocr_pages WHERE pdf_hash = ? AND settings_key = ? AND page_number = ?",
+                    (pdf_hash, settings_key, page_number),
+                )
+                self._size_bytes -= size
+                evicted += 1
+
+        if evicted:
+            self._conn.execute(
+                "DELETE FROM ocr_documents WHERE pdf_hash NOT IN (SELECT pdf_hash FROM ocr_pages)"
+            )
+            self.evictions += evicted
+            logger.info(f"🧹 Evicted {evicted} pages from the OCR cache.")
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current store size."""
+        with self._lock:
+            lookups = self.page_hits + self.page_misses
+            return {
+                "page_hits": self.page_hits,
+                "page_misses": self.page_misses,
+                "hit_rate": self.page_hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size_bytes": self._size_bytes,
+                "max_bytes": self.max_bytes,
+            }
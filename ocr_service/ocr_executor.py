@@ -0,0 +1,122 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Returned by next() once a streamed iterator is exhausted
+_EXHAUSTED = object()
+
+
+class OCROverloadedError(Exception):
+    """Raised when every running and queued OCR slot is taken."""
+
+
+class OCRExecutor:
+    """
+    Runs CPU-bound OCR jobs off the event loop with admission control.
+
+    At most `max_concurrency` jobs run at once and at most `max_queue` more
+    wait for a thread; anything beyond that is rejected immediately with
+    OCROverloadedError instead of piling up.
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 8):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="ocr")
+        self._slots = threading.BoundedSemaphore(self.max_concurrency + self.max_queue)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            raise OCROverloadedError("OCR capacity exhausted")
+        with self._lock:
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Runs `fn(*args)` on an OCR thread, or raises OCROverloadedError."""
+        self._acquire()
+        # The request's context (request id, Server-Timing) carries over to the thread
+        context = contextvars.copy_context()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, context.run, fn, *args)
+        finally:
+            self._release()
+
+    def _close(self, iterator: Iterator) -> None:
+        """Closes a streaming job's iterator and frees its slot."""
+        try:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._release()
+
+    async def _iterate(self, iterator: Iterator[T]) -> AsyncIterator[T]:
+        self._acquire()
+        context = contextvars.copy_context()
+        pending = None
+        try:
+            while True:
+                pending = self._executor.submit(context.run, next, iterator, _EXHAUSTED)
+                item = await asyncio.wrap_future(pending)
+                if item is _EXHAUSTED:
+                    break
+                yield item
+        finally:
+            if pending is not None and not pending.done():
+                # Closed mid-item: the OCR thread still owns the iterator until it returns
+                pending.add_done_callback(lambda _: self._close(iterator))
+            else:
+                self._close(iterator)
+
+    async def stream(self, iterator: Iterator[T]) -> AsyncIterator[T]:
+        """
+        Admits a streaming job (raising OCROverloadedError if full) and returns
+        an async iterator that advances `iterator` on OCR threads.
+
+        The slot is taken and the first item produced before returning, so a
+        full executor can still be answered with 503. The slot is released and
+        `iterator` closed once iteration ends or the returned iterator is closed
+        (or garbage collected unfinished).
+        """
+        items = self._iterate(iterator)
+        try:
+            first = await items.__anext__()
+        except StopAsyncIteration:
+            return items
+
+        async def _items() -> AsyncIterator[T]:
+            try:
+                yield first
+                async for item in items:
+                    yield item
+            finally:
+                await items.aclose()
+
+        return _items()
+
+    def stats(self) -> dict:
+        """Current load against the configured limits."""
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            "in_flight": in_flight,
+            "running": min(in_flight, self.max_concurrency),
+            "queued": max(0, in_flight - self.max_concurrency),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+    def shutdown(self) -> None:
+        """Stop accepting work; running jobs finish in the background."""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,98 @@
+"""
+Compares the embedding backends on the same paragraphs and queries.
+
+Usage:
+    python benchmark_embeddings.py paragraphs.txt clause_queries.txt --threads 4 --top-k 10
+
+Both files have one text per line. For each backend this reports embedding
+throughput, cosine similarity to the torch embeddings (checked against
+embedding_backends.COSINE_TOLERANCE) and the overlap of its exact top-k
+retrieval with the torch top-k.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from document_index import DocumentIndex
+from embedding_backends import COSINE_TOLERANCE, EMBEDDING_BACKENDS, create_embedding_function
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def benchmark_backend(backend: str, paragraphs, queries, threads: int, batch_size: int, repeat: int) -> dict:
+    """Embeds everything `repeat` times after one untimed warm-up batch."""
+    embedding_function = create_embedding_function(MODEL_NAME, backend, num_threads=threads, batch_size=batch_size)
+    embedding_function(paragraphs[:batch_size])
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        paragraph_embeddings = np.asarray(embedding_function(paragraphs), dtype=np.float32)
+        timings.append(time.perf_counter() - start)
+    query_embeddings = np.asarray(embedding_function(queries), dtype=np.float32)
+
+    return {
+        "backend": backend,
+        "paragraphs": len(paragraphs),
+        "paragraphs_per_second": len(paragraphs) / min(timings),
+        "paragraph_embeddings": paragraph_embeddings,
+        "query_embeddings": query_embeddings,
+    }
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity."""
+    return np.einsum("ij,ij->i", a, b) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def top_k_ids(paragraph_embeddings, query_embeddings, top_k: int):
+    """Exact top-k paragraph rows per query."""
+    ids = [str(i) for i in range(len(paragraph_embeddings))]
+    index = DocumentIndex(ids, paragraph_embeddings, ids, [{}] * len(ids))
+    return index.search(query_embeddings, top_k)["ids"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paragraphs", help="Text file with one paragraph per line")
+    parser.add_argument("queries", help="Text file with one query per line")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads per backend (0 = library default)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs over all paragraphs")
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.paragraphs) as f:
+        paragraphs = [line.strip() for line in f if line.strip()]
+    with open(args.queries) as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    results = [
+        benchmark_backend(backend, paragraphs, queries, args.threads, args.batch_size, args.repeat)
+        for backend in EMBEDDING_BACKENDS
+    ]
+
+    baseline = results[0]
+    baseline_embeddings = baseline["paragraph_embeddings"]
+    baseline_top_k = top_k_ids(baseline_embeddings, baseline["query_embeddings"], args.top_k)
+    for result in results:
+        paragraph_embeddings = result.pop("paragraph_embeddings")
+        query_embeddings = result.pop("query_embeddings")
+        similarities = cosine(paragraph_embeddings, baseline_embeddings)
+        result_top_k = top_k_ids(paragraph_embeddings, query_embeddings, args.top_k)
+
+        result["mean_cosine_to_torch"] = float(similarities.mean())
+        result["min_cosine_to_torch"] = float(similarities.min())
+        result["within_tolerance"] = bool(1 - similarities.min() <= COSINE_TOLERANCE[result["backend"]] + 1e-6)
+        result[f"top{args.top_k}_agreement"] = float(
+            np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(baseline_top_k, result_top_k) if a])
+        )
+        result["speedup"] = result["paragraphs_per_second"] / baseline["paragraphs_per_second"]
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
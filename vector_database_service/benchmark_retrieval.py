@@ -0,0 +1,91 @@
+"""
+Compares dense, lexical (BM25) and hybrid retrieval on an existing collection.
+
+Usage:
+    python benchmark_retrieval.py clause_queries.txt --filename contract.pdf --top-k 10 --repeat 3
+    python benchmark_retrieval.py clause_queries.txt --relevant relevant.json
+
+The query file has one query per line. Latency is per single-query call with
+the query embedding cache disabled, so dense timings include the model.
+Recall is measured against the dense top-k, and also against labelled
+paragraph ids ({query: [id, ...]}, ids as returned by /retrieve-text-batch)
+when --relevant is given.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from chroma_service import RETRIEVAL_MODES, ChromaService
+
+
+def benchmark_mode(service: ChromaService, mode: str, queries, top_k: int, metadata_filter, repeat: int) -> dict:
+    """Times one query at a time; a first untimed pass builds indexes and loads the model."""
+    service.retrieve_documents_batch(queries, top_k, metadata_filter, mode)
+
+    timings, ranked_ids = [], {}
+    for query in queries:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            matches = service.retrieve_documents_batch([query], top_k, metadata_filter, mode)[query]
+            timings.append(time.perf_counter() - start)
+        ranked_ids[query] = [match["id"] for match in matches]
+
+    timings.sort()
+    return {
+        "mode": mode,
+        "queries": len(queries),
+        "mean_ms": 1000 * statistics.mean(timings),
+        "p50_ms": 1000 * timings[len(timings) // 2],
+        "p95_ms": 1000 * timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "ranked_ids": ranked_ids,
+    }
+
+
+def mean_recall(ranked_ids: dict, relevant_ids: dict) -> float:
+    """Mean fraction of each query's relevant ids found in its ranking."""
+    recalls = [
+        len(set(ranked_ids.get(query, [])) & set(relevant)) / len(relevant)
+        for query, relevant in relevant_ids.items()
+        if relevant
+    ]
+    return statistics.mean(recalls) if recalls else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("queries", help="Text file with one query per line")
+    parser.add_argument("--collection", default="legal_docs")
+    parser.add_argument("--filename", help="Restrict retrieval to one document")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query")
+    parser.add_argument("--relevant", help="JSON file mapping queries to relevant paragraph ids")
+    args = parser.parse_args()
+
+    with open(args.queries) as f:
+        queries = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+    relevant_ids = None
+    if args.relevant:
+        with open(args.relevant) as f:
+            relevant_ids = json.load(f)
+
+    service = ChromaService(collection_name=args.collection, query_cache_size=0)
+    metadata_filter = {"filename": args.filename} if args.filename else None
+
+    results = [
+        benchmark_mode(service, mode, queries, args.top_k, metadata_filter, args.repeat) for mode in RETRIEVAL_MODES
+    ]
+
+    dense_ids = results[0]["ranked_ids"]
+    for result in results:
+        ranked_ids = result.pop("ranked_ids")
+        result[f"recall_vs_dense@{args.top_k}"] = mean_recall(ranked_ids, dense_ids)
+        if relevant_ids is not None:
+            result[f"recall@{args.top_k}"] = mean_recall(ranked_ids, relevant_ids)
+        result["speedup_vs_dense"] = results[0]["mean_ms"] / result["mean_ms"]
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
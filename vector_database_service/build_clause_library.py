@@ -0,0 +1,36 @@
+"""
+Precomputes embeddings for a clause catalog so queries for known clause types
+skip the embedding model.
+
+Usage:
+    python build_clause_library.py clause_catalog.txt clause_library --backend onnx
+    CLAUSE_LIBRARY_PATH=clause_library EMBEDDING_BACKEND=onnx uvicorn main:app ...
+
+The catalog has one clause type per line (e.g. "Indemnification Clause"). The
+service only loads a library built with its own EMBEDDING_BACKEND.
+"""
+import argparse
+
+from embedding_backends import EMBEDDING_BACKENDS, create_embedding_function
+from query_embeddings import ClauseLibrary, normalize_query
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("catalog", help="Text file with one clause type per line")
+    parser.add_argument("prefix", help="Output path prefix for the .npy and .json files")
+    parser.add_argument("--backend", choices=EMBEDDING_BACKENDS, default="torch", help="Embedding backend of the service")
+    args = parser.parse_args()
+
+    with open(args.catalog) as f:
+        texts = list(dict.fromkeys(normalize_query(line) for line in f if line.strip()))
+
+    embedding_function = create_embedding_function(MODEL_NAME, args.backend)
+    ClauseLibrary.save(args.prefix, MODEL_NAME, args.backend, texts, embedding_function(texts))
+    print(f"Saved {len(texts)} clause embeddings to {args.prefix}.npy / {args.prefix}.json")
+
+
+if __name__ == "__main__":
+    main()
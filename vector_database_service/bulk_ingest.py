@@ -0,0 +1,226 @@
+"""
+Chunked, batched bulk ingestion into the vector store.
+
+Also usable as a back-fill CLI over a directory of pre-extracted OCR JSON
+files (the /extract-text response, {"ocr_text": [[page, para, text], ...]},
+optionally with a "filename" key; otherwise the file name minus ".json"):
+
+    python bulk_ingest.py ./ocr_json --chunk-size 512 --batch-size 64 --processes 4
+
+The embedding backend, partitioning and retrieval mode default to the
+service's EMBEDDING_BACKEND, PARTITIONING and RETRIEVAL_MODE, so a back-fill
+writes embeddings the running service can search alongside its own.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, NamedTuple
+
+from chroma_service import EMBED_BATCH_SECONDS, EMBED_BATCH_SIZE, PARTITIONING_MODES, RETRIEVAL_MODES, ChromaService
+from embedding_backends import EMBEDDING_BACKENDS
+
+if TYPE_CHECKING:
+    # Only the torch backend needs sentence-transformers (and torch)
+    from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+
+class Paragraph(NamedTuple):
+    """One paragraph to ingest, shaped like the /store-text DocumentItem."""
+
+    text: str
+    filename: str
+    page_number: int
+    para_number: int
+
+
+class BulkIngestor:
+    """
+    Ingests documents in fixed-size chunks with explicit embedding batches.
+
+    Each chunk is diffed against the collection like `add_documents`, so only
+    new or changed paragraphs are embedded. Embedding runs on this thread (or
+    a multi-process encoding pool when `num_processes` > 1) while the previous
+    chunk is written by a writer thread, so chunk N+1 embeds while chunk N is
+    stored. Without an ingest id every filename seen is treated as a complete
+    document: paragraphs it no longer contains are deleted at the end. With
+    one, the upload may span several calls and the caller finalizes it
+    (ChromaService.finalize_ingest, /finalize-ingest).
+    """
+
+    def __init__(self, chroma_service: ChromaService, chunk_size: int = 512, embed_batch_size: int = 64, num_processes: int = 1):
+        self.chroma_service = chroma_service
+        self.chunk_size = max(1, chunk_size)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.num_processes = max(1, num_processes)
+        self._pool = None
+
+    def _encoder(self) -> "SentenceTransformer":
+        """The ChromaService's embedding model, starting the encoding pool on first use."""
+        model = self.chroma_service.sentence_transformer()
+        if self.num_processes > 1 and self._pool is None:
+            self._pool = model.start_multi_process_pool(target_devices=["cpu"] * self.num_processes)
+        return model
+
+    def embed(self, texts: List[str]) -> List:
+        """
+        Embeds texts in batches of `embed_batch_size`, across processes if
+        configured. Non-torch embedding backends run in-process on their own
+        thread pool.
+        """
+        if self.chroma_service.embedding_backend != "torch":
+            return self.chroma_service.embed(texts, "bulk")
+        model = self._encoder()
+        EMBED_BATCH_SIZE.observe(len(texts), purpose="bulk")
+        with EMBED_BATCH_SECONDS.time("embed_bulk", purpose="bulk"):
+            if self._pool is not None:
+                embeddings = model.encode_multi_process(texts, self._pool, batch_size=self.embed_batch_size)
+            else:
+                embeddings = model.encode(texts, batch_size=self.embed_batch_size, convert_to_numpy=True)
+        return list(embeddings)
+
+    def ingest(self, documents: Iterable, ingest_id: str = None) -> Dict:
+        """
+        Ingests an iterable of paragraphs (anything with text, filename,
+        page_number and para_number) chunk by chunk. Stale paragraphs are
+        only deleted here when no `ingest_id` is given.
+
+        Returns:
+            Dict: Added/updated/unchanged/deleted counts, elapsed seconds and paragraphs per second.
+        """
+        # A caller-supplied ingest id may continue in later calls, so finalizing is left to the caller
+        finalize = ingest_id is None
+        ingest_id = ingest_id or uuid.uuid4().hex
+        totals = {"added": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+        filenames = set()
+        processed = 0
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma-writer") as writer:
+            pending_write = None
+            for chunk in _chunks(documents, self.chunk_size):
+                paragraphs = self.chroma_service.prepare_paragraphs(chunk, ingest_id)
+                new_ids, changed_ids, unchanged_ids = self.chroma_service.diff_paragraphs(paragraphs)
+                upsert_ids = new_ids + changed_ids
+                embeddings = self.embed([paragraphs[i][0] for i in upsert_ids]) if upsert_ids else None
+
+                # Wait for the previous chunk's write only after this chunk is embedded
+                if pending_write is not None:
+                    pending_write.result()
+                pending_write = writer.submit(
+                    self.chroma_service.write_paragraphs, paragraphs, upsert_ids, unchanged_ids, ingest_id, embeddings
+                )
+
+                totals["added"] += len(new_ids)
+                totals["updated"] += len(changed_ids)
+                totals["unchanged"] += len(unchanged_ids)
+                filenames.update(metadata["filename"] for _, metadata in paragraphs.values())
+                processed += len(paragraphs)
+
+            if pending_write is not None:
+                pending_write.result()
+
+        if finalize:
+            for filename in filenames:
+                totals["deleted"] += self.chroma_service.finalize_ingest(filename, ingest_id)
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            **totals,
+            "paragraphs": processed,
+            "seconds": elapsed,
+            "paragraphs_per_second": processed / elapsed if elapsed else 0.0,
+        }
+        logger.info(f"✅ Bulk ingested {processed} paras at {summary['paragraphs_per_second']:.1f} paras/s: {totals}")
+        return summary
+
+    def close(self) -> None:
+        """Stops the multi-process encoding pool, if one was started."""
+        if self._pool is not None:
+            from sentence_transformers import SentenceTransformer
+
+            SentenceTransformer.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    """Yields lists of up to `size` items without materializing the iterable."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_ocr_json_documents(directory: str) -> Iterator[Paragraph]:
+    """Yields paragraphs from every OCR JSON file in `directory`, one file at a time."""
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path) as f:
+            payload = json.load(f)
+        filename = payload.get("filename") or os.path.basename(path)[: -len(".json")]
+        for page_number, para_number, text in payload.get("ocr_text", []):
+            yield Paragraph(text, filename, page_number, para_number)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Back-fill the vector store from OCR JSON files.")
+    parser.add_argument("directory", help="Directory of OCR JSON files")
+    parser.add_argument("--collection", default="legal_docs")
+    parser.add_argument("--chunk-size", type=int, default=512, help="Paragraphs per write")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per embedding batch")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Embedding processes")
+    # Defaults match the service's environment, so back-filled embeddings come from the same backend
+    parser.add_argument(
+        "--backend",
+        choices=EMBEDDING_BACKENDS,
+        default=os.getenv("EMBEDDING_BACKEND", "torch"),
+        help="Embedding backend (EMBEDDING_BACKEND)",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=int(os.getenv("EMBEDDING_THREADS", "0")), help="Embedding CPU threads (EMBEDDING_THREADS)"
+    )
+    parser.add_argument(
+        "--partitioning",
+        choices=PARTITIONING_MODES,
+        default=os.getenv("PARTITIONING", "document"),
+        help="Per-document or global index (PARTITIONING)",
+    )
+    parser.add_argument(
+        "--retrieval-mode",
+        choices=RETRIEVAL_MODES,
+        default=os.getenv("RETRIEVAL_MODE", "dense"),
+        help="Default ranking (RETRIEVAL_MODE)",
+    )
+    args = parser.parse_args()
+
+    chroma_service = ChromaService(
+        collection_name=args.collection,
+        partitioning=args.partitioning,
+        retrieval_mode=args.retrieval_mode,
+        embedding_backend=args.backend,
+        embedding_threads=args.threads,
+        embedding_batch_size=args.batch_size,
+    )
+    ingestor = BulkIngestor(
+        chroma_service,
+        chunk_size=args.chunk_size,
+        embed_batch_size=args.batch_size,
+        num_processes=args.processes,
+    )
+    try:
+        summary = ingestor.ingest(iter_ocr_json_documents(args.directory))
+    finally:
+        ingestor.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,471 @@
 import chromadb
-from chromadb.utils import embedding_functions
 import logging
 import hashlib
+import threading
+from query_embeddings import ClauseLibrary, QueryEmbeddingCache
+from document_index import DocumentIndex, DocumentIndexCache
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from embedding_backends import create_embedding_function
+from common.instrumentation import METRICS, SIZE_BUCKETS
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# "global": every query is a (filtered) search of the whole collection.
+# "document": queries restricted to one filename run an exact search over that
+# document's cached embeddings; other queries still search the whole collection.
+PARTITIONING_MODES = ("global", "document")
+
+# "dense": embedding search. "lexical": BM25 only, no embedding model.
+# "hybrid": dense and BM25 candidates fused by reciprocal rank.
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+
+# Paragraphs read per page when building the lexical index from the collection
+LEXICAL_LOAD_PAGE_SIZE = 5000
+
+EMBED_BATCH_SECONDS = METRICS.histogram(
+    "embedding_batch_seconds", "Embedding model time per call.", labelnames=("purpose",)
+)
+EMBED_BATCH_SIZE = METRICS.histogram(
+    "embedding_batch_size", "Texts per embedding model call.", SIZE_BUCKETS, labelnames=("purpose",)
+)
+SEARCH_SECONDS = METRICS.histogram(
+    "vector_search_seconds", "Ranking time per retrieval call (excluding query embedding).", labelnames=("mode",)
+)
+
+# Representative paragraph and query lengths used to warm up the embedding model
+WARMUP_TEXTS = [
+    "Indemnification Clause",
+    "This Agreement shall be governed by and construed in accordance with the laws of the State of New York.",
+    "The Supplier shall indemnify, defend and hold harmless the Customer and its officers, directors and "
+    "employees from and against any and all losses, damages, liabilities, costs and expenses arising out of "
+    "any breach of this Agreement by the Supplier or any negligent act or omission of its personnel.",
+]
+
 class ChromaService:
     """
     Manages ChromaDB for vector storage and retrieval.
     """
-    def __init__(self, collection_name="legal_docs"):
+    def __init__(
+        self,
+        collection_name="legal_docs",
+        query_cache_size=1024,
+        clause_library_path=None,
+        partitioning="document",
+        document_index_size=256,
+        retrieval_mode="dense",
+        hybrid_candidates=50,
+        embedding_backend="torch",
+        embedding_threads=0,
+        embedding_batch_size=64,
+    ):
         """
         Initializes ChromaDB with a given collection name.
+
+        Query embeddings are served from a bounded LRU cache of
+        `query_cache_size` entries and, if `clause_library_path` is given,
+        from a precomputed clause embedding library.
+
+        With `partitioning="document"`, single-document queries are answered
+        from per-document exact indexes (up to `document_index_size` kept in
+        memory) instead of a filtered search of the global HNSW index.
+
+        `retrieval_mode` is the default ranking for queries that don't pick
+        one; hybrid ranking fuses the top `hybrid_candidates` of each side.
+        The BM25 index is built from the collection on first lexical use
+        (at startup unless the default mode is dense) and then kept in step
+        with every write.
+
+        `embedding_backend` picks how the embedding model runs (see
+        embedding_backends.EMBEDDING_BACKENDS), with `embedding_threads` CPU
+        threads (0 for the library default). The service always passes
+        embeddings to the collection explicitly, so backends can be switched
+        on an existing collection.
         """
+        if partitioning not in PARTITIONING_MODES:
+            raise ValueError(f"Unknown partitioning mode '{partitioning}', expected one of {PARTITIONING_MODES}")
+        self._check_retrieval_mode(retrieval_mode)
+        self.partitioning = partitioning
+        self.document_index = DocumentIndexCache(max_documents=document_index_size)
+        self.retrieval_mode = retrieval_mode
+        self.hybrid_candidates = hybrid_candidates
+        self.lexical_index = BM25Index()
+        self._lexical_loaded = False
+        self._lexical_lock = threading.Lock()
+
         self.client = chromadb.PersistentClient(path="./chroma_db")  # Persistent storage
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction("all-MiniLM-L6-v2")
-        
-        # Create or get the collection
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name, embedding_function=self.embedding_function
+        self.embedding_model_name = "all-MiniLM-L6-v2"
+        self.embedding_backend = embedding_backend
+
+        # A clause library built for another model or backend is rejected before the model loads
+        clause_library = ClauseLibrary.load(clause_library_path) if clause_library_path else None
+        self.query_embedding_cache = QueryEmbeddingCache(
+            self.embedding_model_name, embedding_backend, max_entries=query_cache_size, library=clause_library
         )
 
+        self.embedding_function = create_embedding_function(
+            self.embedding_model_name, embedding_backend, num_threads=embedding_threads, batch_size=embedding_batch_size
+        )
+        
+        # Create or get the collection; embeddings are always computed by the service
+        self.collection = self.client.get_or_create_collection(name=collection_name, embedding_function=None)
+
+        if retrieval_mode != "dense":
+            self._lexical()
     
 
-    def add_documents(self, documents):
+    def add_documents(self, documents, ingest_id=None):
         """
         Adds texts to ChromaDB with metadata (filename, page number, para number).
-        
+
+        Ingestion is incremental: ids and content hashes are checked in bulk
+        against the collection and only new or changed paragraphs are embedded
+        and upserted.
+
+        Without an `ingest_id` the request is taken to hold the complete
+        document, and stored paragraphs of its filenames that are missing from
+        the request are deleted. With an `ingest_id` (a document sent in
+        several batches) paragraphs are tagged with it instead, and stale ones
+        are removed by `finalize_ingest` once the last batch is stored.
+
         Args:
             documents (List[dict{text, filename, page_number, para_number}]): List of document texts.
+            ingest_id (str, optional): Identifier shared by all batches of one upload.
+
+        Returns:
+            Dict[str, int]: Counts of added, updated, unchanged and deleted paragraphs.
         """
-        
-        texts, metadatas = [], []
+        paragraphs = self.prepare_paragraphs(documents, ingest_id)
+        new_ids, changed_ids, unchanged_ids = self.diff_paragraphs(paragraphs)
+        self.write_paragraphs(paragraphs, new_ids + changed_ids, unchanged_ids, ingest_id)
+
+        deleted = 0
+        if not ingest_id:
+            for filename in {metadata["filename"] for _, metadata in paragraphs.values()}:
+                deleted += self._delete_paragraphs(
+                    filename, lambda paragraph_id, metadata: paragraph_id not in paragraphs
+                )
+
+        summary = {
+            "added": len(new_ids),
+            "updated": len(changed_ids),
+            "unchanged": len(unchanged_ids),
+            "deleted": deleted,
+        }
+        logger.info(f"✅ Ingested {len(paragraphs)} paras into ChromaDB: {summary}")
+        return summary
+
+    def prepare_paragraphs(self, documents, ingest_id=None):
+        """
+        Builds ids and metadata (including a content hash) for documents.
+
+        Returns:
+            Dict[str, Tuple[str, dict]]: id → (text, metadata); a paragraph
+            repeated within `documents` is kept once.
+        """
+        paragraphs = {}
 
         for doc in documents:
-            texts.append(doc.text)
-            metadatas.append({"filename": doc.filename, "page_number": doc.page_number, "para_number": doc.para_number})
+            metadata = {
+                "filename": doc.filename,
+                "page_number": doc.page_number,
+                "para_number": doc.para_number,
+                "content_hash": hashlib.md5(doc.text.encode()).hexdigest(),
+            }
+            if ingest_id:
+                metadata["ingest_id"] = ingest_id
+            paragraph_id = hashlib.md5(
+                f"{metadata['filename']}_{metadata['page_number']}_{metadata['para_number']}".encode()
+            ).hexdigest()
+            paragraphs[paragraph_id] = (doc.text, metadata)
 
-        
-        ids = [
-            hashlib.md5(f"{meta['filename']}_{meta['page_number']}_{meta['para_number']}".encode()).hexdigest()
-            for meta in metadatas
+        return paragraphs
+
+    def diff_paragraphs(self, paragraphs):
+        """
+        Compares prepared paragraphs with the collection in one bulk lookup.
+
+        Returns:
+            Tuple[List[str], List[str], List[str]]: New, changed and unchanged ids.
+        """
+        ids = list(paragraphs)
+        existing = self.collection.get(ids=ids, include=["metadatas"])
+        stored_hashes = {
+            paragraph_id: (metadata or {}).get("content_hash")
+            for paragraph_id, metadata in zip(existing["ids"], existing["metadatas"])
+        }
+
+        new_ids = [i for i in ids if i not in stored_hashes]
+        changed_ids = [
+            i for i in ids if i in stored_hashes and stored_hashes[i] != paragraphs[i][1]["content_hash"]
         ]
+        unchanged_ids = [
+            i for i in ids if i in stored_hashes and stored_hashes[i] == paragraphs[i][1]["content_hash"]
+        ]
+        return new_ids, changed_ids, unchanged_ids
 
-        self.collection.add(ids=ids, documents=texts, metadatas=metadatas)
-        
-        logger.info(f"✅ Added {len(texts)} paras to ChromaDB.")
+    def write_paragraphs(self, paragraphs, upsert_ids, unchanged_ids, ingest_id=None, embeddings=None):
+        """
+        Upserts new/changed paragraphs and refreshes the ingest tag of unchanged ones.
+
+        Only `upsert_ids` go through the embedding model, and not even those
+        when precomputed `embeddings` (aligned with `upsert_ids`) are given.
+        """
+        if upsert_ids:
+            texts = [paragraphs[i][0] for i in upsert_ids]
+            self.collection.upsert(
+                ids=upsert_ids,
+                documents=texts,
+                metadatas=[paragraphs[i][1] for i in upsert_ids],
+                embeddings=embeddings if embeddings is not None else self.embed(texts, "document"),
+            )
+            self._update_lexical(
+                lambda: self.lexical_index.add(
+                    (i, paragraphs[i][0], paragraphs[i][1]["filename"]) for i in upsert_ids
+                )
+            )
+
+        # Unchanged paragraphs only need their ingest tag refreshed (no embedding)
+        if ingest_id and unchanged_ids:
+            self.collection.update(ids=unchanged_ids, metadatas=[paragraphs[i][1] for i in unchanged_ids])
+            upsert_ids = upsert_ids + unchanged_ids
+
+        for filename in {paragraphs[i][1]["filename"] for i in upsert_ids}:
+            self.document_index.invalidate(filename)
+
+    def finalize_ingest(self, filename, ingest_id):
+        """
+        Deletes paragraphs of `filename` that were not stored by the upload `ingest_id`.
+
+        Returns:
+            int: Number of paragraphs deleted.
+        """
+        deleted = self._delete_paragraphs(
+            filename, lambda paragraph_id, metadata: metadata.get("ingest_id") != ingest_id
+        )
+        logger.info(f"🧹 Deleted {deleted} stale paras of '{filename}'.")
+        return deleted
+
+    def _delete_paragraphs(self, filename, is_stale):
+        """
+        Deletes the stored paragraphs of `filename` for which `is_stale(id, metadata)` is true.
+        """
+        stored = self.collection.get(where={"filename": filename}, include=["metadatas"])
+        stale_ids = [
+            paragraph_id
+            for paragraph_id, metadata in zip(stored["ids"], stored["metadatas"])
+            if is_stale(paragraph_id, metadata or {})
+        ]
+        if stale_ids:
+            self.collection.delete(ids=stale_ids)
+            self.document_index.invalidate(filename)
+            self._update_lexical(lambda: self.lexical_index.remove(stale_ids))
+        return len(stale_ids)
+
+
+    def embed_queries(self, queries):
+        """
+        Embeds query texts, skipping the model for cached and precomputed queries.
+
+        Args:
+            queries (List[str]): Query texts.
+
+        Returns:
+            List[np.ndarray]: One embedding per query.
+        """
+        return self.query_embedding_cache.embed(queries, lambda texts: self.embed(texts, "query"))
 
+    def embed(self, texts, purpose):
+        """
+        Runs the embedding model on `texts`, recording the call's batch size and time.
 
-    def retrieve_documents(self, query, top_k=5, metadata_filter=None):
+        Args:
+            texts (List[str]): Texts to embed.
+            purpose (str): Metrics label ("document", "query", "bulk", ...).
+        """
+        EMBED_BATCH_SIZE.observe(len(texts), purpose=purpose)
+        with EMBED_BATCH_SECONDS.time(f"embed_{purpose}", purpose=purpose):
+            return self.embedding_function(texts)
+
+    def sentence_transformer(self):
+        """The torch backend's loaded SentenceTransformer, for encoding outside the embedding function."""
+        if self.embedding_backend != "torch":
+            raise ValueError(f"The {self.embedding_backend} embedding backend has no SentenceTransformer")
+        return self.embedding_function._model
+
+    def warmup(self):
+        """Runs the embedding model and one search on representative texts, bypassing the query cache."""
+        embeddings = self.embedding_function(WARMUP_TEXTS)
+        if self.collection.count():
+            self._query(embeddings[:1], 1)
+
+    @staticmethod
+    def _single_filename(metadata_filter):
+        """The filename a filter restricts results to, if that is all it does."""
+        if not metadata_filter or list(metadata_filter) != ["filename"]:
+            return None
+        value = metadata_filter["filename"]
+        if isinstance(value, dict):
+            value = value.get("$eq") if list(value) == ["$eq"] else None
+        return value if isinstance(value, str) else None
+
+    def _distance_space(self):
+        """
+        The collection's distance function, from its configuration (chromadb 1.x)
+        or, for older clients, its "hnsw:space" metadata.
+        """
+        configuration = getattr(self.collection, "configuration", None)
+        if isinstance(configuration, dict):
+            for index in ("hnsw", "spann"):
+                space = (configuration.get(index) or {}).get("space")
+                if space:
+                    return space
+        return (self.collection.metadata or {}).get("hnsw:space", "l2")
+
+    def _load_document_index(self, filename):
+        """Builds the exact index of one document from its stored embeddings."""
+        stored = self.collection.get(where={"filename": filename}, include=["embeddings", "documents", "metadatas"])
+        space = self._distance_space()
+        logger.info(f"📇 Indexed {len(stored['ids'])} paras of '{filename}' for exact search.")
+        return DocumentIndex(stored["ids"], stored["embeddings"], stored["documents"], stored["metadatas"], space)
+
+    @staticmethod
+    def _check_retrieval_mode(mode):
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{mode}', expected one of {RETRIEVAL_MODES}")
+
+    def _lexical(self):
+        """The BM25 index, built from every stored paragraph on first use."""
+        with self._lexical_lock:
+            if not self._lexical_loaded:
+                offset = 0
+                while True:
+                    page = self.collection.get(
+                        include=["documents", "metadatas"], limit=LEXICAL_LOAD_PAGE_SIZE, offset=offset
+                    )
+                    if not page["ids"]:
+                        break
+                    self.lexical_index.add(
+                        (paragraph_id, text, (metadata or {}).get("filename"))
+                        for paragraph_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"])
+                    )
+                    offset += len(page["ids"])
+                self._lexical_loaded = True
+                logger.info(f"🔤 Built BM25 index over {len(self.lexical_index)} paras.")
+        return self.lexical_index
+
+    def _update_lexical(self, update):
+        """
+        Applies a write to the BM25 index once it is built. Writes that land
+        while it is being built wait for the build and are applied after it.
+        """
+        with self._lexical_lock:
+            if self._lexical_loaded:
+                update()
+
+    def _query(self, query_embeddings, top_k, metadata_filter=None):
+        """
+        Searches for the nearest paragraphs of each query embedding.
+
+        Returns:
+            Dict[str, List[List]]: Chroma query() results (ids, documents, distances, metadatas).
+        """
+        filename = self._single_filename(metadata_filter) if self.partitioning == "document" else None
+        if filename is not None:
+            index = self.document_index.get(filename, lambda: self._load_document_index(filename))
+            return index.search(query_embeddings, top_k)
+
+        query_params = {
+            "query_embeddings": query_embeddings,
+            "n_results": top_k,
+            "include": ["documents", "distances", "metadatas"],
+        }
+
+        if metadata_filter:
+            query_params["where"] = metadata_filter  # Apply metadata filtering
+
+        return self.collection.query(**query_params)
+
+    def _dense_matches(self, queries, top_k, metadata_filter=None):
+        """Embedding search; one list of {id, text, distance, metadata} per query."""
+        query_embeddings = self.embed_queries(queries)
+        with SEARCH_SECONDS.time("search_dense", mode="dense"):
+            results = self._query(query_embeddings, top_k, metadata_filter)
+        return [
+            [
+                {"id": paragraph_id, "text": text, "distance": distance, "metadata": metadata}
+                for paragraph_id, text, distance, metadata in zip(ids, documents, distances, metadatas)
+            ]
+            for ids, documents, distances, metadatas in zip(
+                results["ids"], results["documents"], results["distances"], results["metadatas"]
+            )
+        ]
+
+    def _lexical_matches(self, queries, top_k, filename=None):
+        """BM25 search; one list of {id, text, distance, score, metadata} per query."""
+        index = self._lexical()
+        with SEARCH_SECONDS.time("search_lexical", mode="lexical"):
+            rankings = [index.search(query, top_k, filename) for query in queries]
+
+        ids = list(dict.fromkeys(paragraph_id for ranking in rankings for paragraph_id, _ in ranking))
+        stored = self.collection.get(ids=ids, include=["documents", "metadatas"]) if ids else {"ids": []}
+        paragraphs = {
+            paragraph_id: (text, metadata)
+            for paragraph_id, text, metadata in zip(stored["ids"], stored.get("documents", []), stored.get("metadatas", []))
+        }
+
+        return [
+            [
+                {
+                    "id": paragraph_id,
+                    "text": paragraphs[paragraph_id][0],
+                    "distance": None,
+                    "score": score,
+                    "metadata": paragraphs[paragraph_id][1],
+                }
+                for paragraph_id, score in ranking
+                if paragraph_id in paragraphs
+            ]
+            for ranking in rankings
+        ]
+
+    def _hybrid_matches(self, queries, top_k, metadata_filter=None):
+        """Dense and BM25 candidates fused by reciprocal rank; score is the fused score."""
+        candidates = max(top_k, self.hybrid_candidates)
+        dense = self._dense_matches(queries, candidates, metadata_filter)
+        lexical = self._lexical_matches(queries, candidates, self._single_filename(metadata_filter))
+
+        fused_matches = []
+        for dense_matches, lexical_matches in zip(dense, lexical):
+            by_id = {match["id"]: match for match in lexical_matches}
+            by_id.update({match["id"]: match for match in dense_matches})
+            fused = reciprocal_rank_fusion(
+                [[match["id"] for match in dense_matches], [match["id"] for match in lexical_matches]]
+            )
+            fused_matches.append([{**by_id[paragraph_id], "score": score} for paragraph_id, score in fused[:top_k]])
+        return fused_matches
+
+    def _search(self, queries, top_k, metadata_filter=None, mode=None):
+        """
+        Ranks paragraphs for each query with the given retrieval mode.
+
+        BM25 ranking can only apply a single-filename filter; queries with any
+        other filter fall back to dense search.
+        """
+        mode = mode or self.retrieval_mode
+        self._check_retrieval_mode(mode)
+        if mode != "dense" and metadata_filter and self._single_filename(metadata_filter) is None:
+            logger.info(f"ℹ️ Filter {metadata_filter} is not supported by {mode} retrieval, using dense.")
+            mode = "dense"
+
+        if mode == "lexical":
+            return self._lexical_matches(queries, top_k, self._single_filename(metadata_filter))
+        if mode == "hybrid":
+            return self._hybrid_matches(queries, top_k, metadata_filter)
+        return self._dense_matches(queries, top_k, metadata_filter)
+
+    def retrieve_documents(self, query, top_k=5, metadata_filter=None, mode=None):
         """
         Retrieves relevant documents based on a query and optional metadata filter.
 
@@ -58,22 +473,33 @@ class ChromaService:
             query (str): Query text.
             top_k (int): Number of documents to retrieve.
             metadata_filter (Dict[str, Any], optional): Filter for metadata (e.g., {"filename": "contract1.pdf"}).
+            mode (str, optional): "dense", "lexical" or "hybrid"; defaults to `retrieval_mode`.
 
         Returns:
             List[str]: Retrieved document texts.
         """
-        query_params = {
-            "query_texts": [query],
-            "n_results": top_k
-        }
+        return [match["text"] for match in self._search([query], top_k, metadata_filter, mode)[0]]
 
-        if metadata_filter:
-            query_params["where"] = metadata_filter  # Apply metadata filtering
+    def retrieve_documents_batch(self, queries, top_k=5, metadata_filter=None, mode=None):
+        """
+        Retrieves relevant documents for several queries at once.
 
-        results = self.collection.query(**query_params)
-        retrieved_docs = []
+        Queries missing from the embedding cache are embedded in one batched
+        forward pass, and all queries are searched with a single collection
+        query (or one matrix product against a cached document index).
 
-        if results and "documents" in results and results["documents"][0]:
-            retrieved_docs = results["documents"][0]  # Extract only text content
+        Args:
+            queries (List[str]): Query texts.
+            top_k (int): Number of documents to retrieve per query.
+            metadata_filter (Dict[str, Any], optional): Filter shared by all queries.
+            mode (str, optional): "dense", "lexical" or "hybrid"; defaults to `retrieval_mode`.
+
+        Returns:
+            Dict[str, List[dict{id, text, distance, metadata}]]: Matches keyed by
+            query; lexical and hybrid matches also carry a `score`.
+        """
+        unique_queries = list(dict.fromkeys(queries))
+        if not unique_queries:
+            return {}
 
-        return retrieved_docs
+        return dict(zip(unique_queries, self._search(unique_queries, top_k, metadata_filter, mode)))
@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+class DocumentIndex:
+    """
+    Exact nearest-neighbour index over one document's paragraph embeddings.
+
+    Distances follow the collection's space ("l2" is squared L2, "cosine" and
+    "ip" are 1 - similarity), so results rank and read like Chroma's.
+    """
+
+    def __init__(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict], space: str = "l2"):
+        self.ids = ids
+        if documents:
+            self.embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(documents), -1)
+        else:
+            self.embeddings = np.zeros((0, 0), dtype=np.float32)
+        self.documents = documents
+        self.metadatas = metadatas
+        self.space = space
+        if space == "cosine":
+            norms = np.linalg.norm(self.embeddings, axis=1, keepdims=True)
+            self.embeddings = self.embeddings / np.where(norms == 0, 1, norms)
+        self._squared_norms = np.einsum("ij,ij->i", self.embeddings, self.embeddings)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query_embeddings, top_k: int) -> Dict[str, List[List]]:
+        """Top `top_k` paragraphs per query, in Chroma's query() result layout."""
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        results = {"ids": [], "documents": [], "distances": [], "metadatas": []}
+        if not len(self):
+            for _ in range(len(queries)):
+                results["ids"].append([])
+                results["documents"].append([])
+                results["distances"].append([])
+                results["metadatas"].append([])
+            return results
+
+        if self.space == "cosine":
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            queries = queries / np.where(norms == 0, 1, norms)
+        similarities = queries @ self.embeddings.T
+        if self.space == "l2":
+            distances = (
+                np.einsum("ij,ij->i", queries, queries)[:, None] - 2 * similarities + self._squared_norms[None, :]
+            )
+        else:
+            distances = 1 - similarities
+
+        k = min(top_k, len(self))
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        for row, candidates in zip(distances, nearest):
+            ranked = candidates[np.argsort(row[candidates], kind="stable")]
+            results["ids"].append([self.ids[i] for i in ranked])
+            results["documents"].append([self.documents[i] for i in ranked])
+            results["distances"].append([float(row[i]) for i in ranked])
+            results["metadatas"].append([self.metadatas[i] for i in ranked])
+        return results
+
+
+class DocumentIndexCache:
+    """
+    Bounded LRU of per-document exact indexes, keyed by filename.
+
+    Indexes are built on first query from the collection and dropped whenever
+    the document is written, so a single-document query costs time
+    proportional to that document rather than the whole corpus. The cache is
+    per process.
+    """
+
+    def __init__(self, max_documents: int = 256):
+        self.max_documents = max_documents
+        self._indexes: "OrderedDict[str, DocumentIndex]" = OrderedDict()
+        # Bumped on every invalidation, so an index loaded concurrently with a write is not cached
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, filename: str, loader: Callable[[], DocumentIndex]) -> DocumentIndex:
+        """The cached index for `filename`, built with `loader` on a miss."""
+        with self._lock:
+            index = self._indexes.get(filename)
+            if index is not None:
+                self._indexes.move_to_end(filename)
+                self.hits += 1
+                return index
+            self.misses += 1
+            generation = self._generations.get(filename, 0)
+
+        index = loader()
+        with self._lock:
+            if self._generations.get(filename, 0) != generation:
+                return index
+            self._indexes[filename] = index
+            self._indexes.move_to_end(filename)
+            while len(self._indexes) > self.max_documents:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, filename: str) -> None:
+        """Drops the index of a document whose paragraphs changed."""
+        with self._lock:
+            self._indexes.pop(filename, None)
+            self._generations[filename] = self._generations.get(filename, 0) + 1
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and cached document count."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "documents": len(self._indexes),
+                "max_documents": self.max_documents,
+            }
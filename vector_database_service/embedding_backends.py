@@ -0,0 +1,191 @@
+"""
+Pluggable embedding backends for the sentence-transformers model.
+
+"torch" is the sentence-transformers model as before. "onnx" runs an ONNX
+export of the same transformer through ONNX Runtime, and "onnx-int8" the
+same export with dynamically quantized int8 weights. The ONNX backends need
+only onnxruntime and tokenizers at runtime; the one-off export (done on first
+use, or ahead of time with `python embedding_backends.py`) needs torch and
+transformers.
+"""
+import argparse
+import logging
+import os
+from typing import List
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction
+from chromadb.utils import embedding_functions
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Largest accepted 1 - cosine(backend, torch) per embedding. fp32 ONNX only
+# differs by float reordering; int8 weights cost about a percent.
+COSINE_TOLERANCE = {"torch": 0.0, "onnx": 1e-4, "onnx-int8": 2e-2}
+
+# all-MiniLM-L6-v2 truncates inputs to 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+
+def _model_repo(model_name: str) -> str:
+    """Hugging Face repo of a sentence-transformers model name."""
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def export_onnx(model_name: str, model_dir: str = "./onnx_models", quantize: bool = True) -> str:
+    """
+    Exports the model's transformer to ONNX (and an int8 copy) unless already done.
+
+    Returns:
+        str: Directory holding model.onnx, model.int8.onnx and tokenizer.json.
+    """
+    repo = _model_repo(model_name)
+    export_dir = os.path.join(model_dir, repo.replace("/", "__"))
+    fp32_path = os.path.join(export_dir, "model.onnx")
+    int8_path = os.path.join(export_dir, "model.int8.onnx")
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        os.makedirs(export_dir, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(repo)
+        model = AutoModel.from_pretrained(repo).eval()
+        sample = tokenizer(["export"], return_tensors="pt")
+        input_names = ["input_ids", "attention_mask", "token_type_ids"]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+        tmp_path = f"{fp32_path}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                tmp_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        tokenizer.save_pretrained(export_dir)
+        os.replace(tmp_path, fp32_path)
+        logger.info(f"📦 Exported {repo} to {fp32_path}")
+
+    if quantize and not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp_path = f"{int8_path}.tmp"
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+        logger.info(f"📦 Quantized {fp32_path} to int8")
+
+    return export_dir
+
+
+class OnnxEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Mean-pooled, L2-normalized sentence embeddings from an ONNX export,
+    matching the sentence-transformers pipeline of all-MiniLM-L6-v2.
+
+    Texts are sorted by length before batching and each batch is padded only
+    to its longest sequence.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        quantize: bool = True,
+        num_threads: int = 0,
+        batch_size: int = 64,
+        model_dir: str = "./onnx_models",
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        export_dir = export_onnx(model_name, model_dir, quantize)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads  # 0 lets ONNX Runtime use every core
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_path = os.path.join(export_dir, "model.int8.onnx" if quantize else "model.onnx")
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(export_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()  # pads to the longest sequence of each batch
+        self.batch_size = max(1, batch_size)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def __call__(self, input: Documents) -> List[np.ndarray]:
+        order = sorted(range(len(input)), key=lambda i: len(input[i]))
+        embeddings: List[np.ndarray] = [None] * len(input)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start : start + self.batch_size]
+            for i, embedding in zip(batch, self._embed_batch([input[i] for i in batch])):
+                embeddings[i] = embedding.astype(np.float32)
+        return embeddings
+
+
+def create_embedding_function(
+    model_name: str,
+    backend: str = "torch",
+    num_threads: int = 0,
+    batch_size: int = 64,
+    model_dir: str = "./onnx_models",
+) -> EmbeddingFunction:
+    """
+    Builds the embedding function for `backend`.
+
+    Args:
+        model_name (str): sentence-transformers model name.
+        backend (str): One of EMBEDDING_BACKENDS.
+        num_threads (int): Intra-op CPU threads; 0 keeps the library default.
+        batch_size (int): Texts per forward pass (ONNX backends).
+        model_dir (str): Where ONNX exports are written and loaded from.
+
+    Returns:
+        EmbeddingFunction: Callable mapping texts to embeddings.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+
+    if backend == "torch":
+        if num_threads > 0:
+            import torch
+
+            torch.set_num_threads(num_threads)
+        return embedding_functions.SentenceTransformerEmbeddingFunction(model_name)
+
+    logger.info(f"⚙️ Using the {backend} embedding backend for {model_name}")
+    return OnnxEmbeddingFunction(
+        model_name,
+        quantize=backend == "onnx-int8",
+        num_threads=num_threads,
+        batch_size=batch_size,
+        model_dir=model_dir,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX ahead of time.")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--model-dir", default="./onnx_models")
+    args = parser.parse_args()
+    print(export_onnx(args.model, args.model_dir, quantize=True))
+
+
+if __name__ == "__main__":
+    main()
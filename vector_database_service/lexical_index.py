@@ -0,0 +1,137 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric terms; no stemming, so exact legal phrasing is kept."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over paragraphs, updated incrementally.
+
+    Only term frequencies, paragraph lengths and filenames are kept; texts
+    and metadata stay in the collection. Paragraph ids are mapped to small
+    integers so postings are compact. Postings are kept per filename, so a
+    query restricted to one file only scores that file's paragraphs, while
+    document frequencies (and so idf) stay corpus-wide.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, Dict[int, int]]] = {}  # filename -> term -> {key: count}
+        self._doc_freq: Dict[str, int] = {}
+        self._keys: Dict[str, int] = {}
+        self._ids: Dict[int, str] = {}
+        self._lengths: Dict[int, int] = {}
+        self._terms: Dict[int, Tuple[str, ...]] = {}
+        self._filenames: Dict[int, str] = {}
+        self._total_length = 0
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, paragraphs: Iterable[Tuple[str, str, str]]) -> None:
+        """Adds or replaces (paragraph_id, text, filename) entries."""
+        with self._lock:
+            for paragraph_id, text, filename in paragraphs:
+                self._remove(paragraph_id)
+                key = self._next_key
+                self._next_key += 1
+                term_counts = Counter(tokenize(text))
+                file_postings = self._postings.setdefault(filename, {})
+                for term, count in term_counts.items():
+                    file_postings.setdefault(term, {})[key] = count
+                    self._doc_freq[term] = self._doc_freq.get(term, 0) + 1
+                length = sum(term_counts.values())
+                self._keys[paragraph_id] = key
+                self._ids[key] = paragraph_id
+                self._lengths[key] = length
+                self._terms[key] = tuple(term_counts)
+                self._filenames[key] = filename
+                self._total_length += length
+
+    def remove(self, paragraph_ids: Iterable[str]) -> None:
+        """Drops paragraphs from the index; unknown ids are ignored."""
+        with self._lock:
+            for paragraph_id in paragraph_ids:
+                self._remove(paragraph_id)
+
+    def _remove(self, paragraph_id: str) -> None:
+        key = self._keys.pop(paragraph_id, None)
+        if key is None:
+            return
+        filename = self._filenames.pop(key)
+        file_postings = self._postings[filename]
+        for term in self._terms.pop(key):
+            postings = file_postings[term]
+            del postings[key]
+            if not postings:
+                del file_postings[term]
+            self._doc_freq[term] -= 1
+            if not self._doc_freq[term]:
+                del self._doc_freq[term]
+        if not file_postings:
+            del self._postings[filename]
+        self._total_length -= self._lengths.pop(key)
+        del self._ids[key]
+
+    def search(self, query: str, top_k: int = 5, filename: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Ranks paragraphs for `query` by BM25.
+
+        Args:
+            query (str): Query text.
+            top_k (int): Number of paragraphs to return.
+            filename (str, optional): Only rank paragraphs of this file.
+
+        Returns:
+            List[Tuple[str, float]]: (paragraph_id, score), best first.
+        """
+        with self._lock:
+            if not self._lengths:
+                return []
+            num_paragraphs = len(self._lengths)
+            mean_length = self._total_length / num_paragraphs
+            # A filtered query walks only that file's postings
+            sources = [self._postings.get(filename, {})] if filename is not None else list(self._postings.values())
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                doc_freq = self._doc_freq.get(term)
+                if not doc_freq:
+                    continue
+                idf = math.log(1 + (num_paragraphs - doc_freq + 0.5) / (doc_freq + 0.5))
+                for file_postings in sources:
+                    for key, count in file_postings.get(term, {}).items():
+                        norm = self.k1 * (1 - self.b + self.b * self._lengths[key] / mean_length)
+                        scores[key] = scores.get(key, 0.0) + idf * count * (self.k1 + 1) / (count + norm)
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+            return [(self._ids[key], score) for key, score in ranked]
+
+    def stats(self) -> Dict:
+        """Index size counters."""
+        with self._lock:
+            return {
+                "paragraphs": len(self._lengths),
+                "terms": len(self._doc_freq),
+                "files": len(self._postings),
+                "postings": sum(self._doc_freq.values()),
+            }
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuses ranked id lists by summing 1 / (k + rank); best first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, paragraph_id in enumerate(ranking, start=1):
+            scores[paragraph_id] = scores.get(paragraph_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
@@ -1,18 +1,96 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from typing import List, Dict, Any, Literal, Optional, Tuple
 import logging
+import os
+from contextlib import asynccontextmanager
 from chroma_service import ChromaService
+from bulk_ingest import BulkIngestor, Paragraph
+from common.instrumentation import instrument
+from common.readiness import Readiness
+from common.wire_format import column, negotiated_response, read_payload, to_columns
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the services after startup and stop the bulk ingestor on shutdown (hooks defined below)."""
+    start_loading()
+    yield
+    shutdown_bulk_ingestor()
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Request ids, Server-Timing headers and /metrics; PROFILING_ENABLED lets
+# requests sent with "X-Profile: 1" be profiled into PROFILE_DIR
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+instrument(app, profiling_enabled=PROFILING_ENABLED, profile_dir=PROFILE_DIR)
+
+# Request bodies may be JSON or msgpack, optionally gzip/zstd compressed; responses
+# are JSON unless the client accepts msgpack, compressed from COMPRESS_MIN_BYTES
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "16384"))
+
+# Query embedding cache size and optional precomputed clause library (path prefix of .npy/.json)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+CLAUSE_LIBRARY_PATH = os.getenv("CLAUSE_LIBRARY_PATH")
+
+# "document" serves single-file queries from per-document exact indexes; "global" always searches the full HNSW index
+PARTITIONING = os.getenv("PARTITIONING", "document")
+DOCUMENT_INDEX_SIZE = int(os.getenv("DOCUMENT_INDEX_SIZE", "256"))
+
+# Default ranking (dense, lexical BM25 or hybrid) and candidates per side fused in hybrid mode
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+
+# Embedding backend (torch, onnx or onnx-int8) and its CPU threads (0 = library default)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
 
-# Initialize ChromaDB Manager
-chroma_service = ChromaService()
+# Bulk ingestion pipeline (chunk size, encoding processes)
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "512"))
+EMBED_PROCESSES = int(os.getenv("EMBED_PROCESSES", "1"))
+
+# ChromaDB manager and bulk ingestor are built (loading the embedding model)
+# and warmed up in the background after startup; until then /readyz and the
+# data endpoints answer 503
+chroma_service: ChromaService = None
+bulk_ingestor: BulkIngestor = None
+readiness = Readiness("Vector Database Service")
+
+def load_services():
+    """Build the ChromaDB manager (embedding model, indexes) and bulk ingestor."""
+    global chroma_service, bulk_ingestor
+    chroma_service = ChromaService(
+        query_cache_size=QUERY_CACHE_SIZE,
+        clause_library_path=CLAUSE_LIBRARY_PATH,
+        partitioning=PARTITIONING,
+        document_index_size=DOCUMENT_INDEX_SIZE,
+        retrieval_mode=RETRIEVAL_MODE,
+        hybrid_candidates=HYBRID_CANDIDATES,
+        embedding_backend=EMBEDDING_BACKEND,
+        embedding_threads=EMBEDDING_THREADS,
+        embedding_batch_size=EMBED_BATCH_SIZE,
+    )
+    bulk_ingestor = BulkIngestor(
+        chroma_service, chunk_size=BULK_CHUNK_SIZE, embed_batch_size=EMBED_BATCH_SIZE, num_processes=EMBED_PROCESSES
+    )
+
+def start_loading():
+    """Load and warm up the embedding model in the background."""
+    readiness.start([("load", load_services), ("warmup", lambda: chroma_service.warmup())])
+
+def shutdown_bulk_ingestor():
+    """Stop the embedding process pool."""
+    if bulk_ingestor is not None:
+        bulk_ingestor.close()
 
 # Request models
 class DocumentItem(BaseModel):
@@ -23,40 +101,179 @@ class DocumentItem(BaseModel):
 
 class MultiDocumentRequest(BaseModel):
     documents: List[DocumentItem]  # Simplified structure
+    ingest_id: Optional[str] = None  # Set when one upload is stored in several batches
+
+# Column types of a columnar /store-text batch, validated a column at a time
+_TEXT_COLUMN = TypeAdapter(List[str])
+_NUMBER_COLUMN = TypeAdapter(List[int])
+_INGEST_ID = TypeAdapter(Optional[str])
+
+def parse_store_request(payload: Any) -> Tuple[List, Optional[str]]:
+    """
+    Documents and ingest id of a /store-text body. "documents" is either a
+    list of DocumentItem rows, validated item by item, or a columnar table
+    of the same fields (common.wire_format.to_columns, filename usually sent once)
+    whose columns are validated whole and turned straight into Paragraphs.
+    """
+    try:
+        if not isinstance(payload, dict) or not isinstance(payload.get("documents"), dict):
+            request = MultiDocumentRequest.model_validate(payload)
+            return request.documents, request.ingest_id
+
+        table = payload["documents"]
+        documents = [
+            Paragraph(*fields)
+            for fields in zip(
+                _TEXT_COLUMN.validate_python(column(table, "text")),
+                _TEXT_COLUMN.validate_python(column(table, "filename")),
+                _NUMBER_COLUMN.validate_python(column(table, "page_number")),
+                _NUMBER_COLUMN.validate_python(column(table, "para_number")),
+            )
+        ]
+        return documents, _INGEST_ID.validate_python(payload.get("ingest_id"))
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Malformed columnar documents: {e}")
+
+class FinalizeIngestRequest(BaseModel):
+    filename: str
+    ingest_id: str
 
 class QueryRequest(BaseModel):
     query: str
     top_k: int = 5
     metadata_filter: Dict[str, Any] = None
+    mode: Optional[Literal["dense", "lexical", "hybrid"]] = None  # Defaults to RETRIEVAL_MODE
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 5
+    metadata_filter: Dict[str, Any] = None
+    mode: Optional[Literal["dense", "lexical", "hybrid"]] = None  # Defaults to RETRIEVAL_MODE
 
 @app.post("/store-text")
-def store_text(request: MultiDocumentRequest):
+async def store_text(request: Request):
     """
     Stores multiple extracted OCR texts in ChromaDB with metadata.
+
+    The body is a MultiDocumentRequest, as JSON or msgpack (optionally
+    gzip/zstd compressed), with the documents as rows or as a columnar table
+    (see parse_store_request).
     """
+    readiness.require()
+    documents, ingest_id = parse_store_request(await read_payload(request))
     try:
-        if not request.documents:
+        if not documents:
             raise HTTPException(status_code=400, detail="No documents provided")
         
-        chroma_service.add_documents(request.documents)
+        summary = await run_in_threadpool(chroma_service.add_documents, documents, ingest_id)
+
+        return {"message": f"✅ Stored {len(documents)} documents successfully", **summary}
+    except Exception as e:
+        logger.error(f"Error storing text: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error storing text")
+
+@app.post("/store-text-bulk")
+async def store_text_bulk(request: Request):
+    """
+    Stores complete documents through the chunked, pipelined bulk ingestion path.
+    Accepts the same body formats as /store-text. Without an ingest_id stale
+    paragraphs are removed at once; with one, call /finalize-ingest when done.
+    """
+    readiness.require()
+    documents, ingest_id = parse_store_request(await read_payload(request))
+    try:
+        if not documents:
+            raise HTTPException(status_code=400, detail="No documents provided")
 
-        return {"message": f"✅ Stored {len(request.documents)} documents successfully"}
+        summary = await run_in_threadpool(bulk_ingestor.ingest, documents, ingest_id)
+
+        return {"message": f"✅ Stored {len(documents)} documents successfully", **summary}
     except Exception as e:
         logger.error(f"Error storing text: {str(e)}")
         raise HTTPException(status_code=500, detail="Error storing text")
 
+@app.post("/finalize-ingest")
+def finalize_ingest(request: FinalizeIngestRequest):
+    """
+    Removes paragraphs of a file that the given batched upload no longer contains.
+    """
+    readiness.require()
+    try:
+        deleted = chroma_service.finalize_ingest(request.filename, request.ingest_id)
+        return {"deleted": deleted}
+    except Exception as e:
+        logger.error(f"Error finalizing ingest: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error finalizing ingest")
+
 @app.post("/retrieve-text")
-def retrieve_text(request: QueryRequest):
+def retrieve_text(request: QueryRequest, http_request: Request):
     """
     Retrieves relevant documents based on query.
     """
+    readiness.require()
     try:
-        results = chroma_service.retrieve_documents(request.query, request.top_k, request.metadata_filter)
-        return {"documents": results}
+        results = chroma_service.retrieve_documents(
+            request.query, request.top_k, request.metadata_filter, request.mode
+        )
+        return negotiated_response(http_request, {"documents": results}, compress_min_bytes=COMPRESS_MIN_BYTES)
     except Exception as e:
         logger.error(f"Error retrieving documents: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving documents")
 
+@app.post("/retrieve-text-batch")
+def retrieve_text_batch(request: BatchQueryRequest, http_request: Request):
+    """
+    Retrieves relevant documents for several queries in one embedding pass and one search.
+    msgpack clients get each query's matches as a columnar table (common.wire_format.to_columns).
+    """
+    readiness.require()
+    try:
+        results = chroma_service.retrieve_documents_batch(
+            request.queries, request.top_k, request.metadata_filter, request.mode
+        )
+        return negotiated_response(
+            http_request,
+            {"results": results},
+            lambda: {"results": {query: to_columns(matches) for query, matches in results.items()}},
+            COMPRESS_MIN_BYTES,
+        )
+    except Exception as e:
+        logger.error(f"Error retrieving documents: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error retrieving documents")
+
+@app.get("/embedding-cache-stats")
+def embedding_cache_stats():
+    """Query embedding cache hit rate and estimated time saved."""
+    readiness.require()
+    return chroma_service.query_embedding_cache.stats()
+
+@app.get("/document-index-stats")
+def document_index_stats():
+    """Per-document exact index cache hit rate and size."""
+    readiness.require()
+    return {"partitioning": chroma_service.partitioning, **chroma_service.document_index.stats()}
+
+@app.get("/lexical-index-stats")
+def lexical_index_stats():
+    """BM25 index size."""
+    readiness.require()
+    return {"retrieval_mode": chroma_service.retrieval_mode, **chroma_service.lexical_index.stats()}
+
+@app.get("/livez")
+async def liveness_check():
+    """Liveness: the process is up, even while the model is still loading."""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_check():
+    """Readiness: 200 once the embedding model is loaded and warm, 503 (with startup progress) before."""
+    report = readiness.report()
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
 @app.get("/")
 def health_check():
     """Health check endpoint"""
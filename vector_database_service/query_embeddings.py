@@ -0,0 +1,137 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Collapses whitespace so trivially different spellings of a query share an entry."""
+    return " ".join(text.split())
+
+
+class ClauseLibrary:
+    """
+    Precomputed embeddings for a fixed clause catalog.
+
+    Stored as `<prefix>.npy` (float32 matrix, memory-mapped on load) plus
+    `<prefix>.json` ({"model": ..., "backend": ..., "texts": [...]}) mapping
+    rows to clause texts. Libraries without a "backend" were built with torch.
+    """
+
+    def __init__(self, model_name: str, backend: str, texts: List[str], embeddings: np.ndarray):
+        self.model_name = model_name
+        self.backend = backend
+        self.embeddings = embeddings
+        self.index = {normalize_query(text): row for row, text in enumerate(texts)}
+
+    @classmethod
+    def load(cls, prefix: str) -> "ClauseLibrary":
+        """Loads a library written by `save`, memory-mapping the embedding matrix."""
+        with open(f"{prefix}.json") as f:
+            index = json.load(f)
+        embeddings = np.load(f"{prefix}.npy", mmap_mode="r")
+        logger.info(f"📚 Loaded {len(index['texts'])} precomputed clause embeddings from {prefix}")
+        return cls(index["model"], index.get("backend", "torch"), index["texts"], embeddings)
+
+    @staticmethod
+    def save(prefix: str, model_name: str, backend: str, texts: List[str], embeddings) -> None:
+        """Writes clause texts and their embeddings under `prefix`."""
+        np.save(f"{prefix}.npy", np.asarray(embeddings, dtype=np.float32))
+        with open(f"{prefix}.json", "w") as f:
+            json.dump({"model": model_name, "backend": backend, "texts": texts}, f)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Precomputed embedding of `text`, if it is in the catalog."""
+        row = self.index.get(normalize_query(text))
+        return None if row is None else self.embeddings[row]
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings keyed by (model name, embedding
+    backend, normalized text), consulted after an optional precomputed
+    ClauseLibrary, which must have been built with the same model and backend.
+    """
+
+    def __init__(
+        self, model_name: str, backend: str, max_entries: int = 1024, library: Optional[ClauseLibrary] = None
+    ):
+        if library is not None and (library.model_name, library.backend) != (model_name, backend):
+            raise ValueError(
+                f"Clause library was built for {library.model_name} on the {library.backend} backend, "
+                f"not {model_name} on {backend}; rebuild it with build_clause_library.py --backend {backend}"
+            )
+        self.model_name = model_name
+        self.backend = backend
+        self.max_entries = max_entries
+        self.library = library
+        self._entries: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.library_hits = 0
+        self.misses = 0
+        self._embed_seconds = 0.0
+
+    def embed(self, queries: List[str], embed_fn: Callable[[List[str]], List]) -> List[np.ndarray]:
+        """Embeddings for `queries`; only cache misses go through `embed_fn`, in one batch."""
+        embeddings: List[Optional[np.ndarray]] = [None] * len(queries)
+        missing: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, query in enumerate(queries):
+                key = (self.model_name, self.backend, normalize_query(query))
+                library_embedding = self.library.get(key[2]) if self.library is not None else None
+                if library_embedding is not None:
+                    embeddings[i] = library_embedding
+                    self.library_hits += 1
+                elif key in self._entries:
+                    self._entries.move_to_end(key)
+                    embeddings[i] = self._entries[key]
+                    self.hits += 1
+                else:
+                    missing.setdefault(key[2], []).append(i)
+
+        if missing:
+            texts = list(missing)
+            start = time.perf_counter()
+            computed = embed_fn(texts)
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self.misses += len(texts)
+                self._embed_seconds += elapsed
+                for text, embedding in zip(texts, computed):
+                    embedding = np.asarray(embedding, dtype=np.float32)
+                    for i in missing[text]:
+                        embeddings[i] = embedding
+                    key = (self.model_name, self.backend, text)
+                    self._entries[key] = embedding
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return embeddings
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and an estimate of the embedding time saved."""
+        with self._lock:
+            served = self.hits + self.library_hits
+            lookups = served + self.misses
+            seconds_per_embedding = self._embed_seconds / self.misses if self.misses else 0.0
+            return {
+                "hits": self.hits,
+                "library_hits": self.library_hits,
+                "misses": self.misses,
+                "hit_rate": served / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "library_size": len(self.library.index) if self.library is not None else 0,
+                # Estimated from the mean time of embedding a missed query
+                "estimated_seconds_saved": served * seconds_per_embedding,
+            }